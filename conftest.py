@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(scope='session', autouse=True)
+def temporary_caches():
+    """ Тесты не трогают общий кэш сайта (core.testing). """
+    from core.testing import temporary_caches
+
+    with temporary_caches():
+        yield
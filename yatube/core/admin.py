@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'task',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+        'locked_by'
+    )
+    list_filter = ('status', 'task')
+    search_fields = ('task',)
+    readonly_fields = ('created', 'edited', 'last_error')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        """ Повторить упавшие задачи с начала. """
+        queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now()
+        )
+
+    retry.short_description = 'Повторить упавшие задачи'
@@ -0,0 +1,236 @@
+"""
+Замеры страниц тестовым клиентом Django.
+
+Каждый сценарий - запрос к одному адресу от имени пользователя.
+Сценарий повторяется repeat раз после warmup прогревочных запросов,
+по каждому запросу снимаются задержка, число и время SQL-запросов,
+время рендера шаблонов и размер ответа. Итог по сценарию - p50, p95 и
+p99 задержки и медианы остальных величин.
+
+Итоги сравниваются с сохраненным базовым JSON: лишний SQL-запрос или
+заметный рост задержки и размера - регрессия. Задержки зависят от
+машины и ее загрузки, поэтому в базу, которая хранится в репозитории,
+сохраняются только DETERMINISTIC величины, а задержки сравниваются с
+базой, снятой на той же машине.
+"""
+import json
+import math
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+from django.template.base import Template
+from django.test import Client
+
+# Величины, которые не зависят от машины
+DETERMINISTIC = ('queries', 'bytes')
+
+
+class Scenario:
+    def __init__(self, name, path, method='get', data=None, user=None,
+                 status=200):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+        self.user = user
+        self.status = status
+
+    def client(self):
+        client = Client()
+
+        if self.user is not None:
+            client.force_login(self.user)
+
+        return client
+
+
+class Probe:
+    """ Счетчики одного запроса: SQL и рендер шаблонов. """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.render = 0.0
+        self._depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def templates(self):
+        """ Время рендера шаблонов верхнего уровня, без вложенных. """
+        original = Template.render
+        probe = self
+
+        def render(template, context):
+            probe._depth += 1
+            started = time.perf_counter()
+
+            try:
+                return original(template, context)
+            finally:
+                probe._depth -= 1
+
+                if not probe._depth:
+                    probe.render += time.perf_counter() - started
+
+        Template.render = render
+
+        try:
+            yield
+        finally:
+            Template.render = original
+
+
+def measure(client, scenario):
+    """ Один запрос сценария. Время в миллисекундах. """
+    probe = Probe()
+
+    with connection.execute_wrapper(probe), probe.templates():
+        started = time.perf_counter()
+        response = getattr(client, scenario.method)(
+            scenario.path, scenario.data
+        )
+        latency = time.perf_counter() - started
+
+    if response.status_code != scenario.status:
+        raise AssertionError(
+            f'{scenario.name}: ответ {response.status_code}, '
+            f'ожидался {scenario.status}'
+        )
+
+    return {
+        'latency': latency * 1000,
+        'queries': probe.queries,
+        'sql': probe.sql * 1000,
+        # В рендер входят и запросы, которые выполняет шаблон
+        'render': probe.render * 1000,
+        'bytes': len(response.content),
+    }
+
+
+def percentile(values, share):
+    """ Процентиль по ближайшему рангу. """
+    ordered = sorted(values)
+
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def summarize(samples):
+    latencies = [sample['latency'] for sample in samples]
+
+    summary = {
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+    }
+
+    for field in ('queries', 'sql', 'render', 'bytes'):
+        summary[field] = percentile(
+            [sample[field] for sample in samples], 0.5
+        )
+
+    return summary
+
+
+def run(scenarios, repeat=50, warmup=5, cold=False):
+    """ Итоги по сценариям: {имя: {p50, p95, p99, queries, ...}}. """
+    results = {}
+
+    for scenario in scenarios:
+        client = scenario.client()
+
+        for _ in range(warmup):
+            measure(client, scenario)
+
+        samples = []
+
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+
+            samples.append(measure(client, scenario))
+
+        results[scenario.name] = summarize(samples)
+
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, slack=2.0):
+    """
+    Регрессии относительно базовых итогов. Запросов не должно стать
+    больше, задержка и размер могут вырасти на долю tolerance, но к
+    задержке прибавляется slack миллисекунд на шум. Величины, которых
+    нет в базе, не сравниваются.
+    """
+    regressions = []
+
+    for name, summary in results.items():
+        base = baseline.get(name)
+
+        if base is None:
+            continue
+
+        if summary['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: SQL-запросов {summary["queries"]}, '
+                f'было {base["queries"]}'
+            )
+
+        for field, extra in (('p95', slack), ('bytes', 0)):
+            if field not in base:
+                continue
+
+            limit = base[field] * (1 + tolerance) + extra
+
+            if summary[field] > limit:
+                regressions.append(
+                    f'{name}: {field} {summary[field]:.1f}, '
+                    f'было {base[field]:.1f}'
+                )
+
+    return regressions
+
+
+def load(path):
+    with open(path, encoding='utf-8') as baseline:
+        return json.load(baseline)
+
+
+def save(path, results, fields=None):
+    """ Сохранить итоги, только величины fields, если они заданы. """
+    if fields is not None:
+        results = {
+            name: {field: summary[field] for field in fields}
+            for name, summary in results.items()
+        }
+
+    with open(path, 'w', encoding='utf-8') as baseline:
+        json.dump(results, baseline, indent=2, sort_keys=True)
+        baseline.write('\n')
+
+
+def table(results):
+    """ Итоги строками для вывода в консоль. """
+    lines = [
+        f'{"сценарий":<16}{"p50":>8}{"p95":>8}{"p99":>8}'
+        f'{"SQL":>6}{"SQL мс":>8}{"рендер":>8}{"байт":>9}'
+    ]
+
+    for name, summary in results.items():
+        lines.append(
+            f'{name:<16}{summary["p50"]:>8.1f}{summary["p95"]:>8.1f}'
+            f'{summary["p99"]:>8.1f}{summary["queries"]:>6}'
+            f'{summary["sql"]:>8.1f}{summary["render"]:>8.1f}'
+            f'{summary["bytes"]:>9}'
+        )
+
+    return lines
@@ -0,0 +1,48 @@
+from django.test import TestCase
+
+from core.benchmark import harness
+
+
+class TestingBenchmarkHarness(TestCase):
+    def test_percentiles(self):
+        """ Процентили по ближайшему рангу. """
+        values = list(range(1, 101))
+
+        self.assertEqual(harness.percentile(values, 0.5), 50)
+        self.assertEqual(harness.percentile(values, 0.99), 99)
+        self.assertEqual(harness.percentile([7], 0.95), 7)
+
+    def test_measure_counts_queries_and_bytes(self):
+        """ Замер запроса: SQL-запросы, размер ответа, статус. """
+        scenario = harness.Scenario('missing', '/missing/', status=404)
+
+        sample = harness.measure(scenario.client(), scenario)
+
+        self.assertGreater(sample['bytes'], 0)
+        self.assertGreaterEqual(sample['latency'], sample['sql'])
+
+        with self.assertRaises(AssertionError):
+            harness.measure(
+                scenario.client(), harness.Scenario('missing', '/missing/')
+            )
+
+    def test_regressions_found(self):
+        """ Лишний запрос и рост задержки сверх допуска - регрессии. """
+        base = {
+            'page': {'p95': 10.0, 'queries': 3, 'bytes': 1000},
+        }
+
+        same = {'page': {'p95': 11.0, 'queries': 3, 'bytes': 1000}}
+        worse = {'page': {'p95': 30.0, 'queries': 4, 'bytes': 1000}}
+
+        self.assertEqual(harness.compare(same, base), [])
+        self.assertEqual(len(harness.compare(worse, base)), 2)
+
+    def test_latency_skipped_without_baseline(self):
+        """ База без задержек сравнивает только запросы и размер. """
+        base = {'page': {'queries': 3, 'bytes': 1000}}
+        slow = {'page': {'p95': 300.0, 'queries': 3, 'bytes': 1000}}
+        bigger = {'page': {'p95': 1.0, 'queries': 3, 'bytes': 2000}}
+
+        self.assertEqual(harness.compare(slow, base), [])
+        self.assertEqual(len(harness.compare(bigger, base)), 1)
@@ -0,0 +1,444 @@
+"""
+Кэш в файле SQLite, общий для всех процессов на машине.
+
+LocMemCache у каждого воркера свой: сброс кэша в одном процессе не
+виден остальным, а память растет с числом воркеров. Этот бэкенд
+хранит записи в одном файле SQLite в режиме WAL: читатели не мешают
+писателю, и все процессы видят одни и те же данные.
+
+Объем кэша ограничен суммой размеров значений (OPTIONS['MAX_BYTES']).
+При переполнении сначала удаляются просроченные записи, затем давно
+не читанные (LRU). Сумма размеров ведется триггерами, поэтому не
+требует прохода по таблице.
+
+Целые числа хранятся как есть, остальные значения через pickle.
+Изменяющие операции идут в транзакции BEGIN IMMEDIATE, поэтому
+add, incr/decr и incr_version атомарны между процессами.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' size INTEGER NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ')',
+    'CREATE INDEX IF NOT EXISTS cache_accessed_idx ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires_idx ON cache (expires)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' bytes INTEGER NOT NULL,'
+    ' entries INTEGER NOT NULL'
+    ')',
+    'INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN'
+    ' UPDATE cache_stats'
+    ' SET bytes = bytes + new.size, entries = entries + 1;'
+    ' END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache'
+    ' BEGIN'
+    ' UPDATE cache_stats SET bytes = bytes - old.size + new.size;'
+    ' END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN'
+    ' UPDATE cache_stats'
+    ' SET bytes = bytes - old.size, entries = entries - 1;'
+    ' END',
+)
+
+# Время последнего чтения обновляется не чаще, чем раз в столько
+# секунд: иначе каждое чтение горячего ключа было бы записью
+ACCESS_RESOLUTION = 1
+
+# Сколько секунд отметка чтения ждет чужую запись. Чтение не должно
+# стоять BUSY_TIMEOUT ради LRU, поэтому при занятой базе отметка
+# пропускается
+ACCESS_BUSY_TIMEOUT = 0.01
+
+# Сколько ключей в одном запросе get_many/delete_many
+BATCH_SIZE = 500
+
+INTEGER_MIN, INTEGER_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def _encode(value):
+    """ Значение для колонки и его размер в байтах. """
+    # bool тоже int, но должен вернуться bool
+    if type(value) is int and INTEGER_MIN <= value <= INTEGER_MAX:
+        return value, 8
+
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    return data, len(data)
+
+
+def _decode(value):
+    if isinstance(value, int):
+        return value
+
+    return pickle.loads(value)
+
+
+def _expired(expires, now):
+    return expires is not None and expires <= now
+
+
+class SQLiteCache(BaseCache):
+    """
+    LOCATION - путь к файлу базы.
+    OPTIONS: MAX_BYTES - предел суммы размеров значений,
+    BUSY_TIMEOUT - сколько секунд ждать чужую запись,
+    CULL_FREQUENCY - при переполнении за раз удаляется
+    1/CULL_FREQUENCY записей.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+
+        options = params.get('OPTIONS', {})
+
+        self._path = location
+        self._max_bytes = int(options.get('MAX_BYTES', 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Соединение SQLite нельзя делить между потоками и
+        # процессами, поэтому у каждого потока после fork свое
+        local = self._local
+        pid = os.getpid()
+
+        if getattr(local, 'pid', None) != pid:
+            local.db = self._connect()
+            local.pid = pid
+
+        return local.db
+
+    def _connect(self):
+        directory = os.path.dirname(self._path)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        db = sqlite3.connect(
+            self._path,
+            timeout=self._busy_timeout,
+            isolation_level=None
+        )
+
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+
+        db.execute('BEGIN IMMEDIATE')
+
+        try:
+            for statement in SCHEMA:
+                db.execute(statement)
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+        db.execute('COMMIT')
+
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        """ Транзакция, которая сразу берет блокировку на запись. """
+        db = self._db
+
+        db.execute('BEGIN IMMEDIATE')
+
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+        db.execute('COMMIT')
+
+    def _key(self, key, version=None):
+        key = self.make_key(key, version=version)
+
+        self.validate_key(key)
+
+        return key
+
+    def _busy_timeout_ms(self, seconds):
+        self._db.execute(f'PRAGMA busy_timeout = {int(seconds * 1000)}')
+
+    def _touch_access(self, keys, now):
+        """ Отметить чтение для LRU. Потерять отметку не страшно. """
+        self._busy_timeout_ms(ACCESS_BUSY_TIMEOUT)
+
+        try:
+            with self._transaction() as db:
+                db.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?',
+                    ((now, key) for key in keys)
+                )
+        except sqlite3.OperationalError:
+            # Не удалась фиксация: транзакция еще открыта
+            if self._db.in_transaction:
+                self._db.execute('ROLLBACK')
+        finally:
+            self._busy_timeout_ms(self._busy_timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+
+        row = self._db.execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,)
+        ).fetchone()
+
+        if row is None or _expired(row[1], now):
+            return default
+
+        if now - row[2] > ACCESS_RESOLUTION:
+            self._touch_access((key,), now)
+
+        return _decode(row[0])
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        found = {}
+        touched = []
+        now = time.time()
+
+        cache_keys = list(names)
+
+        for start in range(0, len(cache_keys), BATCH_SIZE):
+            batch = cache_keys[start:start + BATCH_SIZE]
+
+            rows = self._db.execute(
+                'SELECT key, value, expires, accessed FROM cache '
+                'WHERE key IN (%s)' % ', '.join('?' * len(batch)),
+                batch
+            )
+
+            for key, value, expires, accessed in rows:
+                if _expired(expires, now):
+                    continue
+
+                found[names[key]] = _decode(value)
+
+                if now - accessed > ACCESS_RESOLUTION:
+                    touched.append(key)
+
+        if touched:
+            self._touch_access(touched, now)
+
+        return found
+
+    def _store(self, db, key, value, timeout, now, only_new=False):
+        value, size = _encode(value)
+        expires = self.get_backend_timeout(timeout)
+
+        if only_new:
+            row = db.execute(
+                'SELECT expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is not None and not _expired(row[0], now):
+                return False
+
+        if size > self._max_bytes:
+            # Не помещается совсем, старое значение тоже не нужно
+            db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+            return False
+
+        updated = db.execute(
+            'UPDATE cache SET value = ?, size = ?, expires = ?, accessed = ? '
+            'WHERE key = ?',
+            (value, size, expires, now, key)
+        ).rowcount
+
+        if not updated:
+            db.execute(
+                'INSERT INTO cache (key, value, size, expires, accessed) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, value, size, expires, now)
+            )
+
+        return True
+
+    def _cull(self, db, now):
+        """ Удалить записи сверх MAX_BYTES: просроченные, затем LRU. """
+        total, entries = db.execute(
+            'SELECT bytes, entries FROM cache_stats'
+        ).fetchone()
+
+        if total <= self._max_bytes:
+            return
+
+        db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+
+        total, entries = db.execute(
+            'SELECT bytes, entries FROM cache_stats'
+        ).fetchone()
+
+        if self._cull_frequency:
+            batch = max(1, entries // self._cull_frequency)
+        else:
+            batch = entries
+
+        while total > self._max_bytes:
+            db.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (batch,)
+            )
+
+            total, = db.execute('SELECT bytes FROM cache_stats').fetchone()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+
+        with self._transaction() as db:
+            added = self._store(db, key, value, timeout, now, only_new=True)
+
+            if added:
+                self._cull(db, now)
+
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+
+        with self._transaction() as db:
+            self._store(db, key, value, timeout, now)
+            self._cull(db, now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        items = [
+            (key, self._key(key, version), value)
+            for key, value in data.items()
+        ]
+        now = time.time()
+        failed = []
+
+        with self._transaction() as db:
+            for key, cache_key, value in items:
+                if not self._store(db, cache_key, value, timeout, now):
+                    failed.append(key)
+
+            self._cull(db, now)
+
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+
+        with self._transaction() as db:
+            touched = db.execute(
+                'UPDATE cache SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, now)
+            ).rowcount
+
+        return bool(touched)
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+
+        with self._transaction() as db:
+            deleted = db.execute(
+                'DELETE FROM cache WHERE key = ?', (key,)
+            ).rowcount
+
+        return bool(deleted)
+
+    def delete_many(self, keys, version=None):
+        cache_keys = [self._key(key, version) for key in keys]
+
+        with self._transaction() as db:
+            for start in range(0, len(cache_keys), BATCH_SIZE):
+                batch = cache_keys[start:start + BATCH_SIZE]
+
+                db.execute(
+                    'DELETE FROM cache WHERE key IN (%s)'
+                    % ', '.join('?' * len(batch)),
+                    batch
+                )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+
+        row = self._db.execute(
+            'SELECT expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+
+        return row is not None and not _expired(row[0], time.time())
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+
+        with self._transaction() as db:
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None or _expired(row[1], now):
+                raise ValueError("Key '%s' not found" % key)
+
+            value = _decode(row[0]) + delta
+            stored, size = _encode(value)
+
+            db.execute(
+                'UPDATE cache SET value = ?, size = ?, accessed = ? '
+                'WHERE key = ?',
+                (stored, size, now, key)
+            )
+
+        return value
+
+    def incr_version(self, key, delta=1, version=None):
+        """ Перенести запись на другую версию одним UPDATE. """
+        if version is None:
+            version = self.version
+
+        old_key = self._key(key, version)
+        new_key = self._key(key, version + delta)
+
+        with self._transaction() as db:
+            row = db.execute(
+                'SELECT expires FROM cache WHERE key = ?', (old_key,)
+            ).fetchone()
+
+            if row is None or _expired(row[0], time.time()):
+                raise ValueError("Key '%s' not found" % key)
+
+            db.execute('DELETE FROM cache WHERE key = ?', (new_key,))
+            db.execute(
+                'UPDATE cache SET key = ? WHERE key = ?', (new_key, old_key)
+            )
+
+        return version + delta
+
+    def clear(self):
+        with self._transaction() as db:
+            db.execute('DELETE FROM cache')
+
+    def stats(self):
+        """ Сумма размеров значений и число записей. """
+        total, entries = self._db.execute(
+            'SELECT bytes, entries FROM cache_stats'
+        ).fetchone()
+
+        return {'bytes': total, 'entries': entries}
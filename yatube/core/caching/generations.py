@@ -0,0 +1,45 @@
+"""
+Поколения кэша.
+
+Вместо того чтобы искать и удалять закэшированные фрагменты, в их
+ключ добавляется номер поколения данных. Изменение данных увеличивает
+номер, и следующий запрос строит фрагмент под новым ключом, а старые
+записи просто дожидаются вытеснения. Поэтому фрагменты можно хранить
+долго и при этом показывать изменения сразу.
+"""
+import time
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'generation:'
+
+
+def _fresh():
+    # Номер от времени не совпадет с номером, который был до вытеснения
+    return int(time.time() * 1000)
+
+
+def get_generations(*names):
+    """ Текущие номера поколений одной строкой для ключа кэша. """
+    keys = [KEY_PREFIX + name for name in names]
+
+    found = cache.get_many(keys)
+
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh(), timeout=None)
+            found[key] = cache.get(key)
+
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def bump(*names):
+    """ Данные изменились, начать новые поколения. """
+    for name in names:
+        key = KEY_PREFIX + name
+
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Номера еще нет или его вытеснили
+            cache.set(key, _fresh(), timeout=None)
@@ -0,0 +1,103 @@
+"""
+Кэш с защитой от одновременного пересчета (cache stampede).
+
+Запись хранится вместе со временем, до которого она свежая, и живет в
+кэше еще CACHE_STALE_GRACE секунд после него. Когда запись устарела,
+пересчитывает ее только тот запрос, который первым взял блокировку,
+остальные в это время получают устаревшее значение. Если записи нет
+совсем, остальные запросы недолго ждут результата первого.
+"""
+import functools
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.routing import router
+
+LOCK_PREFIX = 'lock:'
+
+# Как часто проверять, не посчитал ли значение другой запрос
+WAIT_STEP = 0.05
+
+
+def _wait_for(key):
+    """ Дождаться значения, которое считает другой запрос. """
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+
+        entry = cache.get(key)
+
+        if entry is not None:
+            return entry
+
+    return None
+
+
+def get_or_compute(key, compute, timeout, grace=None):
+    """
+    Значение из кэша по ключу key. Если его нет или оно устарело,
+    значение считает compute(), но только в одном запросе.
+    """
+    if grace is None:
+        grace = settings.CACHE_STALE_GRACE
+
+    lock_key = LOCK_PREFIX + key
+
+    entry = cache.get(key)
+
+    if entry is not None:
+        value, fresh_until = entry
+
+        if time.time() < fresh_until:
+            return value
+
+        if not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+            # Пересчитывает другой запрос, отдаем устаревшее
+            return value
+
+    elif not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        entry = _wait_for(key)
+
+        if entry is not None:
+            return entry[0]
+
+        # Не дождались, считаем сами, но без блокировки
+        return compute()
+
+    try:
+        # Значение живет в кэше дольше, чем отстает реплика, поэтому
+        # считается из основной базы
+        with router.primary():
+            value = compute()
+
+        cache.set(key, (value, time.time() + timeout), timeout + grace)
+    finally:
+        cache.delete(lock_key)
+
+    return value
+
+
+def cached(key, timeout=None, grace=None):
+    """
+    Декоратор cache-aside поверх get_or_compute.
+
+    key - функция от тех же аргументов, что и у декорируемой функции,
+    возвращает ключ кэша. timeout по умолчанию CACHE_DATA_TIMEOUT.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_compute(
+                f'cached:{func.__module__}.{func.__qualname__}:'
+                f'{key(*args, **kwargs)}',
+                lambda: func(*args, **kwargs),
+                timeout or settings.CACHE_DATA_TIMEOUT,
+                grace
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,82 @@
+import time
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from core.caching.singleflight import LOCK_PREFIX, cached, get_or_compute
+
+
+class TestingSingleFlight(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+
+        return f'значение {self.calls}'
+
+    def test_fresh_value_is_not_recomputed(self):
+        """ Свежее значение берется из кэша. """
+        get_or_compute('key', self.compute, 60)
+        value = get_or_compute('key', self.compute, 60)
+
+        self.assertEqual(value, 'значение 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_locked(self):
+        """ Пока другой запрос пересчитывает, отдается устаревшее. """
+        cache.set('key', ('старое', time.time() - 1), 60)
+        cache.add(LOCK_PREFIX + 'key', 1)
+
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'старое')
+        self.assertEqual(self.calls, 0)
+
+    def test_stale_value_recomputed_once(self):
+        """ Устаревшее значение пересчитывает тот, кто взял блокировку. """
+        cache.set('key', ('старое', time.time() - 1), 60)
+
+        self.assertEqual(
+            get_or_compute('key', self.compute, 60),
+            'значение 1'
+        )
+        self.assertIsNone(cache.get(LOCK_PREFIX + 'key'))
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'значение 1')
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_missing_value_computed_after_wait(self):
+        """ Если чужой пересчет не закончился, значение считается сразу. """
+        cache.add(LOCK_PREFIX + 'key', 1)
+
+        self.assertEqual(
+            get_or_compute('key', self.compute, 60),
+            'значение 1'
+        )
+
+    def test_cached_decorator(self):
+        """ Декоратор кэширует результат по ключу из аргументов. """
+        @cached(key=lambda number: number)
+        def square(number):
+            self.calls += 1
+
+            return number * number
+
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(3), 9)
+        self.assertEqual(square(4), 16)
+        self.assertEqual(self.calls, 2)
+
+    def test_template_tag(self):
+        """ Тег swrcache кэширует фрагмент как cache. """
+        template = Template(
+            '{% load swr_cache %}'
+            '{% swrcache 60 fragment name %}{{ value }}{% endswrcache %}'
+        )
+
+        first = template.render(Context({'name': 'a', 'value': 1}))
+        second = template.render(Context({'name': 'a', 'value': 2}))
+        other = template.render(Context({'name': 'b', 'value': 3}))
+
+        self.assertEqual((first, second, other), ('1', '1', '3'))
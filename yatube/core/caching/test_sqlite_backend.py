@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.caching.backends.sqlite import SQLiteCache
+
+
+def _increment(location):
+    cache = SQLiteCache(location, {})
+
+    for _ in range(50):
+        cache.incr('counter')
+
+
+class TestingSQLiteCache(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.open()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_values_round_trip(self):
+        """ Значения возвращаются того же типа. """
+        values = {
+            'int': 42,
+            'big': 2 ** 70,
+            'bool': True,
+            'text': 'Котики',
+            'list': [1, {'a': None}],
+        }
+
+        self.cache.set_many(values)
+
+        self.assertEqual(self.cache.get_many(list(values)), values)
+        self.assertIs(self.cache.get('bool'), True)
+
+    def test_expired_value_is_missing(self):
+        """ Просроченная запись не возвращается и не мешает add. """
+        self.cache.set('key', 'old', timeout=0)
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertFalse(self.cache.add('key', 'newer'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_shared_between_instances(self):
+        """ Другой экземпляр с тем же файлом видит те же данные. """
+        self.cache.set('key', 'value')
+
+        self.assertEqual(self.open().get('key'), 'value')
+
+    def test_incr_decr(self):
+        """ incr/decr меняют число, отсутствующий ключ - ошибка. """
+        self.cache.set('counter', 10)
+
+        self.assertEqual(self.cache.incr('counter', 5), 15)
+        self.assertEqual(self.cache.decr('counter'), 14)
+
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_atomic_between_processes(self):
+        """ Одновременные incr из разных процессов не теряются. """
+        self.cache.set('counter', 0)
+
+        workers = [
+            multiprocessing.Process(target=_increment, args=(self.location,))
+            for _ in range(4)
+        ]
+
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_incr_version(self):
+        """ Запись переносится на новую версию ключа. """
+        self.cache.set('key', 'value', version=1)
+
+        self.assertEqual(self.cache.incr_version('key', version=1), 2)
+        self.assertIsNone(self.cache.get('key', version=1))
+        self.assertEqual(self.cache.get('key', version=2), 'value')
+
+    def test_lru_eviction_by_bytes(self):
+        """ Сверх MAX_BYTES вытесняются давно не читанные записи. """
+        cache = self.open(MAX_BYTES=10000, CULL_FREQUENCY=10)
+        value = b'x' * 900
+
+        for number in range(10):
+            cache.set(f'key{number}', value)
+
+        # Первая запись прочитана последней, вытеснять ее рано
+        time.sleep(1.1)
+        cache.get('key0')
+
+        cache.set('key10', value)
+
+        self.assertLessEqual(cache.stats()['bytes'], 10000)
+        self.assertIsNotNone(cache.get('key0'))
+        self.assertIsNone(cache.get('key1'))
+        self.assertIsNotNone(cache.get('key10'))
+
+    def test_read_does_not_wait_for_writer(self):
+        """ Отметка чтения пропускается, пока базу держит писатель. """
+        self.cache.set('key', 'value')
+
+        writer = sqlite3.connect(self.location, isolation_level=None)
+        writer.execute('UPDATE cache SET accessed = 0')
+        writer.execute('BEGIN IMMEDIATE')
+
+        try:
+            started = time.monotonic()
+
+            self.assertEqual(self.cache.get('key'), 'value')
+            self.assertEqual(self.cache.get_many(['key']), {'key': 'value'})
+            self.assertLess(time.monotonic() - started, 1)
+        finally:
+            writer.execute('ROLLBACK')
+            writer.close()
+
+        self.assertEqual(
+            self.cache._db.execute('PRAGMA busy_timeout').fetchone(), (5000,)
+        )
+        self.assertTrue(self.cache.add('other', 'value'))
+
+    def test_too_large_value_is_not_stored(self):
+        """ Значение больше MAX_BYTES не сохраняется. """
+        cache = self.open(MAX_BYTES=100)
+
+        cache.set('key', 'small')
+        cache.set('key', 'x' * 1000)
+
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats(), {'bytes': 0, 'entries': 0})
+
+    def test_benchmark_command(self):
+        """ Бенчмарк сравнивает бэкенды и проверяет общий доступ. """
+        out = StringIO()
+
+        call_command(
+            'benchmark_cache', operations=10, processes=2, stdout=out
+        )
+
+        lines = out.getvalue().splitlines()
+
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith('locmem'))
+        self.assertTrue(lines[1].endswith('нет'))
+        self.assertTrue(lines[3].startswith('sqlite'))
+        self.assertTrue(lines[3].endswith('да'))
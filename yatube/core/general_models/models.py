@@ -7,3 +7,28 @@ class Date(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Counters(models.Model):
+    """
+    Модель со счетчиками, которые меняются через F().
+
+    save() существующей записи не перезаписывает счетчики значениями,
+    прочитанными вместе с объектом, иначе параллельные изменения
+    потеряются. Так же можно защитить любые поля, которые пишутся
+    только через update().
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+
+        super().save(*args, **kwargs)
@@ -0,0 +1,100 @@
+"""
+Отправка писем через очередь задач.
+
+QueuedEmailBackend подключается как EMAIL_BACKEND: письмо ставится в
+очередь, а отправляет его обработчик через JOBS_EMAIL_BACKEND. Запрос
+не ждет почтовый сервер, а временная ошибка отправки повторяется.
+"""
+import base64
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.conf import settings
+
+from .queue import task
+
+
+def _dump_attachment(attachment):
+    filename, content, mimetype = attachment
+
+    if isinstance(content, bytes):
+        return [filename, base64.b64encode(content).decode(), mimetype, True]
+
+    return [filename, content, mimetype, False]
+
+
+def _load_attachment(filename, content, mimetype, encoded):
+    if encoded:
+        content = base64.b64decode(content)
+
+    return filename, content, mimetype
+
+
+def dump_message(message):
+    """ Письмо в словарь для JSON. """
+    if any(not isinstance(item, tuple) for item in message.attachments):
+        # MIMEBase не сериализуется, такие письма шлем как есть
+        raise ValueError('Вложения MIMEBase не поддерживаются')
+
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': [
+            _dump_attachment(item) for item in message.attachments
+        ],
+    }
+
+
+def load_message(data, connection=None):
+    return EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+        attachments=[
+            _load_attachment(*item) for item in data['attachments']
+        ],
+        connection=connection,
+    )
+
+
+def _real_connection():
+    return get_connection(settings.JOBS_EMAIL_BACKEND)
+
+
+@task(priority=5)
+def send_email(data):
+    """ Отправить письмо настоящим бэкендом. """
+    _real_connection().send_messages([load_message(data)])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        queued = 0
+
+        for message in email_messages:
+            if not message.recipients():
+                continue
+
+            try:
+                data = dump_message(message)
+            except ValueError:
+                queued += _real_connection().send_messages([message]) or 0
+                continue
+
+            send_email.enqueue(data)
+            queued += 1
+
+        return queued
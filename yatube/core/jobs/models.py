@@ -0,0 +1,83 @@
+from django.db import models
+from django.utils import timezone
+
+from core.general_models.models import Date
+
+
+class Job(Date):
+    """ Фоновая задача в очереди core.jobs. """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    # Полное имя функции, например posts.thumbnails.generate
+    task = models.CharField(
+        max_length=200,
+        verbose_name='Задача'
+    )
+    # Аргументы вызова в JSON: {"args": [...], "kwargs": {...}}
+    arguments = models.TextField(
+        default='{}',
+        verbose_name='Аргументы'
+    )
+    # Больше - раньше
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name='Приоритет'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Когда выполнить'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Состояние'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток не больше'
+    )
+    # Кто взял задачу и до какого времени. Если обработчик упал,
+    # после locked_until задачу возьмет другой
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name='Обработчик'
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Занята до'
+    )
+    last_error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name='Последняя ошибка'
+    )
+
+    class Meta:
+        # Индекс повторяет порядок выборки очередной задачи
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='job_status_priority_idx'
+            ),
+        ]
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self) -> str:
+        return f'{self.task} ({self.status})'
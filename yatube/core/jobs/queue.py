@@ -0,0 +1,227 @@
+"""
+Очередь фоновых задач в таблице базы данных.
+
+Задача - обычная функция, помеченная @task. Вызов task.enqueue(...)
+записывает ее в core_job в текущей транзакции: если транзакция
+откатится, задачи не будет, а обработчик не увидит ее до фиксации.
+Аргументы передаются через JSON.
+
+Обработчики (manage.py runworker) забирают задачи по приоритету и
+времени запуска. Задачу берет тот, чей UPDATE ... WHERE status =
+'queued' изменил строку: SQLite выполняет записи по очереди, поэтому
+двое одну задачу не получат. Где база умеет SELECT ... FOR UPDATE
+SKIP LOCKED, используется он. Упавшая задача повторяется через
+JOBS_RETRY_DELAY, 2 * JOBS_RETRY_DELAY, ... секунд, после
+max_attempts попыток остается в таблице со статусом failed.
+Выполненные задачи удаляются.
+
+С JOBS_EAGER = True задачи выполняются в том же процессе сразу после
+фиксации транзакции, без обработчиков.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task(func=None, priority=0, max_attempts=None):
+    """
+    Пометить функцию как задачу очереди.
+
+    Функция остается обычной функцией, а func.enqueue(*args, **kwargs)
+    ставит ее вызов в очередь. Параметры постановки передаются
+    аргументами с подчеркиванием: _priority, _delay (секунды или
+    timedelta), _run_at, _max_attempts.
+    """
+    if func is None:
+        return lambda func: task(func, priority, max_attempts)
+
+    name = f'{func.__module__}.{func.__name__}'
+
+    def enqueue(*args, _priority=priority, _delay=None, _run_at=None,
+                _max_attempts=max_attempts, **kwargs):
+        return _enqueue(
+            name, args, kwargs, _priority, _delay, _run_at, _max_attempts
+        )
+
+    func.task_name = name
+    func.enqueue = enqueue
+
+    return func
+
+
+def _enqueue(name, args, kwargs, priority, delay, run_at, max_attempts):
+    arguments = json.dumps({'args': list(args), 'kwargs': kwargs})
+
+    if settings.JOBS_EAGER:
+        transaction.on_commit(
+            lambda: _call(name, json.loads(arguments))
+        )
+        return None
+
+    if run_at is None:
+        run_at = timezone.now()
+
+    if delay is not None:
+        if not isinstance(delay, timedelta):
+            delay = timedelta(seconds=delay)
+
+        run_at += delay
+
+    return Job.objects.create(
+        task=name,
+        arguments=arguments,
+        priority=priority,
+        run_at=run_at,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def _call(name, arguments):
+    """ Выполнить задачу сразу (JOBS_EAGER). Ошибка только в журнал. """
+    try:
+        _resolve(name)(*arguments['args'], **arguments['kwargs'])
+    except Exception:
+        logger.exception('Задача %s не выполнена', name)
+
+
+def _resolve(name):
+    func = import_string(name)
+
+    # В таблицу мог попасть любой путь, вызываем только задачи
+    if getattr(func, 'task_name', None) != name:
+        raise ImportError(f'{name} не помечена @task')
+
+    return func
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _due(now):
+    """ Задачи, которые пора выполнять, и брошенные упавшими. """
+    return (
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(worker):
+    """ Забрать очередную задачу или вернуть None. """
+    now = timezone.now()
+    lock = {
+        'status': Job.RUNNING,
+        'locked_by': worker,
+        'locked_until': now + timedelta(seconds=settings.JOBS_LEASE),
+    }
+
+    due = Job.objects.filter(_due(now)).order_by('-priority', 'run_at', 'pk')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = due.select_for_update(skip_locked=True).first()
+
+            if job is None:
+                return None
+
+            Job.objects.filter(pk=job.pk).update(
+                attempts=F('attempts') + 1, **lock
+            )
+
+        return Job.objects.get(pk=job.pk)
+
+    # Кандидатов несколько: пока выбирали, первых могли забрать другие
+    for pk in due.values_list('pk', flat=True)[:settings.JOBS_CLAIM_BATCH]:
+        claimed = Job.objects.filter(_due(now), pk=pk).update(
+            attempts=F('attempts') + 1, **lock
+        )
+
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+    return None
+
+
+def retry_delay(attempts):
+    """ Пауза перед следующей попыткой, с разбросом до четверти. """
+    delay = min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_MAX_DELAY
+    )
+
+    # Чтобы задачи, упавшие вместе, не повторялись одновременно
+    return timedelta(seconds=delay * random.uniform(1, 1.25))
+
+
+def execute(job):
+    """ Выполнить взятую задачу и записать результат. """
+    mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+
+    try:
+        arguments = json.loads(job.arguments)
+        _resolve(job.task)(*arguments['args'], **arguments['kwargs'])
+    except Exception:
+        logger.exception('Задача %s #%s не выполнена', job.task, job.pk)
+
+        if job.attempts >= job.max_attempts:
+            changes = {'status': Job.FAILED}
+        else:
+            changes = {
+                'status': Job.QUEUED,
+                'run_at': timezone.now() + retry_delay(job.attempts),
+            }
+
+        mine.update(
+            locked_by='',
+            locked_until=None,
+            last_error=traceback.format_exc(),
+            **changes
+        )
+
+        return False
+
+    mine.delete()
+
+    return True
+
+
+def work(worker=None, burst=False, stop=lambda: False):
+    """
+    Выполнять задачи, пока stop() не вернет True.
+    С burst=True вернуться, когда очередь опустеет.
+    Возвращает число выполненных задач.
+    """
+    worker = worker or worker_name()
+    done = 0
+
+    while not stop():
+        # Соединение живет долго, между задачами его проверяем
+        close_old_connections()
+
+        job = claim(worker)
+
+        if job is None:
+            if burst:
+                break
+
+            time.sleep(settings.JOBS_POLL_INTERVAL)
+            continue
+
+        done += execute(job)
+
+    return done
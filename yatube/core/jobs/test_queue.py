@@ -0,0 +1,125 @@
+from datetime import timedelta
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.jobs import queue
+from core.jobs.models import Job
+
+CALLS = []
+
+
+@queue.task
+def remember(value, suffix=''):
+    CALLS.append(value + suffix)
+
+
+@queue.task(max_attempts=2)
+def explode():
+    raise RuntimeError('Сломалось')
+
+
+def not_a_task():
+    CALLS.append('не задача')
+
+
+class TestingJobQueue(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_job_runs_once_and_removed(self):
+        """ Задачу забирает один обработчик, после выполнения ее нет. """
+        remember.enqueue('котик', suffix='!')
+
+        job = queue.claim('первый')
+
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(queue.claim('второй'))
+
+        self.assertTrue(queue.execute(job))
+        self.assertEqual(CALLS, ['котик!'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_priority_and_schedule(self):
+        """ Сначала важные задачи, отложенные ждут своего времени. """
+        remember.enqueue('обычная')
+        remember.enqueue('срочная', _priority=10)
+        remember.enqueue('потом', _priority=20, _delay=60)
+
+        self.assertEqual(queue.work(burst=True), 2)
+        self.assertEqual(CALLS, ['срочная', 'обычная'])
+        self.assertEqual(Job.objects.get().status, Job.QUEUED)
+
+    def test_failed_job_retried_with_backoff(self):
+        """ Упавшая задача откладывается, после всех попыток - failed. """
+        explode.enqueue()
+
+        started = timezone.now()
+
+        with self.assertLogs('core.jobs.queue', 'ERROR'):
+            self.assertFalse(queue.execute(queue.claim('worker')))
+
+        job = Job.objects.get()
+
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('Сломалось', job.last_error)
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=10))
+        self.assertIsNone(queue.claim('worker'))
+
+        Job.objects.update(run_at=timezone.now())
+
+        with self.assertLogs('core.jobs.queue', 'ERROR'):
+            queue.execute(queue.claim('worker'))
+
+        job = Job.objects.get()
+
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNone(queue.claim('worker'))
+
+    def test_abandoned_job_reclaimed(self):
+        """ Задачу упавшего обработчика берет другой после аренды. """
+        remember.enqueue('котик')
+
+        queue.claim('упавший')
+
+        Job.objects.update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        job = queue.claim('живой')
+
+        self.assertEqual((job.locked_by, job.attempts), ('живой', 2))
+
+    def test_only_tasks_called(self):
+        """ Функции без @task из таблицы не вызываются. """
+        Job.objects.create(
+            task='core.jobs.test_queue.not_a_task', max_attempts=1
+        )
+
+        with self.assertLogs('core.jobs.queue', 'ERROR'):
+            queue.work(burst=True)
+
+        self.assertEqual(CALLS, [])
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    @override_settings(
+        EMAIL_BACKEND='core.jobs.mail.QueuedEmailBackend',
+        JOBS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    )
+    def test_email_sent_by_worker(self):
+        """ Письмо уходит из очереди, а не из запроса. """
+        mail.send_mail(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            html_message='<p>Текст</p>'
+        )
+
+        self.assertEqual(mail.outbox, [])
+
+        queue.work(burst=True)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+        self.assertEqual(
+            mail.outbox[0].alternatives, [('<p>Текст</p>', 'text/html')]
+        )
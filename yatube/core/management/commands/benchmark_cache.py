@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'filebased': 'django.core.cache.backends.filebased.FileBasedCache',
+    'sqlite': 'core.caching.backends.sqlite.SQLiteCache',
+}
+
+PHASES = ('set', 'get', 'incr')
+
+
+def _location(name, directory):
+    if name == 'locmem':
+        return f'benchmark-{directory}'
+
+    if name == 'sqlite':
+        return os.path.join(directory, 'cache.sqlite3')
+
+    return os.path.join(directory, name)
+
+
+def _open(name, location, entries):
+    return import_string(BACKENDS[name])(location, {
+        'TIMEOUT': None,
+        # Чтобы файловый кэш и LocMem не вытесняли записи по дороге
+        'OPTIONS': {'MAX_ENTRIES': entries},
+    })
+
+
+def _workload(args):
+    """ Прогон одного процесса: секунды на каждую фазу. """
+    name, location, operations, value, worker = args
+
+    cache = _open(name, location, operations * 10)
+    keys = [f'bench:{worker}:{number}' for number in range(operations)]
+    timings = {}
+
+    started = time.perf_counter()
+    for key in keys:
+        cache.set(key, value)
+    timings['set'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for key in keys:
+        cache.get(key)
+    timings['get'] = time.perf_counter() - started
+
+    cache.set('bench:counter', 0)
+
+    started = time.perf_counter()
+    for _ in keys:
+        cache.incr('bench:counter')
+    timings['incr'] = time.perf_counter() - started
+
+    cache.set(f'bench:visible:{worker}', True)
+
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить бэкенды кэша: LocMem, файловый и общий SQLite. '
+        'Выводит число операций в секунду и видят ли процессы '
+        'записи друг друга.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--operations',
+            type=int,
+            default=5000,
+            help='Сколько операций каждой фазы в одном процессе.'
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Сколько процессов работают с кэшем одновременно.'
+        )
+        parser.add_argument(
+            '--value-size',
+            type=int,
+            default=1024,
+            help='Размер значения в байтах.'
+        )
+        parser.add_argument(
+            '--backend',
+            choices=BACKENDS,
+            action='append',
+            help='Проверить только эти бэкенды.'
+        )
+
+    def run(self, name, directory, options):
+        location = _location(name, directory)
+        processes = options['processes']
+        tasks = [
+            (
+                name,
+                location,
+                options['operations'],
+                b'x' * options['value_size'],
+                worker
+            )
+            for worker in range(processes)
+        ]
+
+        # Даже один воркер работает в отдельном процессе, чтобы
+        # проверить, видит ли родитель его записи
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_workload, tasks)
+
+        cache = _open(name, location, options['operations'] * 10)
+        shared = all(
+            cache.get(f'bench:visible:{worker}') is not None
+            for worker in range(processes)
+        )
+
+        total = options['operations'] * processes
+
+        return {
+            phase: total / max(max(r[phase] for r in results), 1e-9)
+            for phase in PHASES
+        }, shared
+
+    def handle(self, *args, **options):
+        header = ''.join(f'{phase:>12}' for phase in PHASES)
+
+        self.stdout.write(f'{"backend":<12}{header}{"shared":>10}')
+
+        for name in options['backend'] or BACKENDS:
+            with tempfile.TemporaryDirectory() as directory:
+                rates, shared = self.run(name, directory, options)
+
+            row = ''.join(f'{rates[phase]:>12.0f}' for phase in PHASES)
+            shared = 'да' if shared else 'нет'
+
+            self.stdout.write(f'{name:<12}{row}{shared:>10}')
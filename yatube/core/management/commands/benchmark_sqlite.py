@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite.connection import apply_pragmas
+
+# Как Django открывает SQLite без настроек: журнал отката, полная
+# синхронизация и таймаут sqlite3 по умолчанию
+PROFILES = {
+    'default': {},
+    'tuned': None,
+}
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+    'comments_count INTEGER NOT NULL DEFAULT 0)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'text TEXT, created REAL)',
+    'CREATE INDEX comment_post ON comment (post_id, created)',
+)
+
+
+def _pragmas(profile):
+    if PROFILES[profile] is None:
+        return settings.SQLITE_PRAGMAS
+
+    return PROFILES[profile]
+
+
+def _prepare(path, posts):
+    db = sqlite3.connect(path)
+
+    with db:
+        for statement in SCHEMA:
+            db.execute(statement)
+
+        db.executemany(
+            'INSERT INTO post (text) VALUES (?)',
+            (('x' * 400,) for _ in range(posts))
+        )
+
+    db.close()
+
+
+def _workload(args):
+    """ Смесь чтений ленты и комментариев, как в add_comment. """
+    path, pragmas, seconds, write_share, posts, worker = args
+
+    db = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(db, pragmas)
+
+    rng = random.Random(worker)
+    result = {'reads': 0, 'writes': 0, 'locked': 0, 'latencies': []}
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        post_id = rng.randint(1, posts)
+        started = time.perf_counter()
+
+        try:
+            if rng.random() < write_share:
+                db.execute('BEGIN')
+                db.execute(
+                    'INSERT INTO comment (post_id, text, created) '
+                    'VALUES (?, ?, ?)',
+                    (post_id, 'комментарий', time.time())
+                )
+                db.execute(
+                    'UPDATE post SET comments_count = comments_count + 1 '
+                    'WHERE id = ?', (post_id,)
+                )
+                db.execute('COMMIT')
+                result['writes'] += 1
+            else:
+                db.execute(
+                    'SELECT id, text, comments_count FROM post '
+                    'ORDER BY id DESC LIMIT 10'
+                ).fetchall()
+                db.execute(
+                    'SELECT text FROM comment WHERE post_id = ? '
+                    'ORDER BY created DESC LIMIT 20', (post_id,)
+                ).fetchall()
+                result['reads'] += 1
+        except sqlite3.OperationalError as error:
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+
+            if 'locked' not in str(error):
+                raise
+
+            result['locked'] += 1
+            continue
+
+        result['latencies'].append(time.perf_counter() - started)
+
+    db.close()
+
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить SQLite без настроек и с SQLITE_PRAGMAS под '
+        'конкурентной нагрузкой: несколько процессов читают ленту и '
+        'пишут комментарии в один файл.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=8,
+            help='Сколько процессов работают одновременно.'
+        )
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=5,
+            help='Сколько секунд длится прогон каждого профиля.'
+        )
+        parser.add_argument(
+            '--write-share',
+            type=float,
+            default=0.2,
+            help='Доля операций записи.'
+        )
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=10000,
+            help='Сколько постов в базе.'
+        )
+
+    def run(self, profile, directory, options):
+        path = os.path.join(directory, f'{profile}.sqlite3')
+        _prepare(path, options['posts'])
+
+        tasks = [
+            (
+                path,
+                _pragmas(profile),
+                options['seconds'],
+                options['write_share'],
+                options['posts'],
+                worker
+            )
+            for worker in range(options['processes'])
+        ]
+
+        with multiprocessing.Pool(options['processes']) as pool:
+            results = pool.map(_workload, tasks)
+
+        latencies = sorted(
+            latency for result in results for latency in result['latencies']
+        )
+        seconds = options['seconds']
+
+        return {
+            'reads': sum(r['reads'] for r in results) / seconds,
+            'writes': sum(r['writes'] for r in results) / seconds,
+            'locked': sum(r['locked'] for r in results),
+            'p95': latencies[int(len(latencies) * 0.95)] * 1000
+            if latencies else 0,
+        }
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"profile":<10}{"reads/s":>10}{"writes/s":>10}'
+            f'{"p95 мс":>10}{"locked":>10}'
+        )
+
+        for profile in PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                row = self.run(profile, directory, options)
+
+            self.stdout.write(
+                f'{profile:<10}{row["reads"]:>10.0f}{row["writes"]:>10.0f}'
+                f'{row["p95"]:>10.1f}{row["locked"]:>10}'
+            )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.routing.replication import ReplicationError, replicate
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновить реплики SQLite копией основной базы. Это замена '
+        'репликации для локального запуска с DATABASE_REPLICAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases',
+            nargs='*',
+            help='Реплики из DATABASES. По умолчанию DATABASE_REPLICAS.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Повторять каждые столько секунд, имитируя отставание.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                aliases = replicate(options['aliases'])
+            except (ReplicationError, KeyError) as error:
+                raise CommandError(error)
+
+            if not aliases:
+                raise CommandError('Нет реплик: задайте DATABASE_REPLICAS')
+
+            self.stdout.write(f'Обновлены реплики: {", ".join(aliases)}')
+
+            if not options['interval']:
+                return
+
+            time.sleep(options['interval'])
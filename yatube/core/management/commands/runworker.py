@@ -0,0 +1,69 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import queue
+
+
+def _serve(burst):
+    """ Один процесс-обработчик. SIGTERM дает доделать задачу. """
+    stopping = []
+
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *args: stopping.append(True))
+
+    return queue.work(burst=burst, stop=lambda: bool(stopping))
+
+
+class Command(BaseCommand):
+    help = (
+        'Запустить обработчики очереди фоновых задач core.jobs. '
+        'Ctrl+C или SIGTERM останавливают их после текущей задачи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Сколько процессов-обработчиков запустить.'
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Выполнить задачи, которые уже пора, и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 1)
+        burst = options['burst']
+
+        if processes == 1:
+            done = _serve(burst)
+            self.stdout.write(f'Выполнено задач: {done}')
+            return
+
+        # Дочерним процессам не достаются открытые соединения
+        connections.close_all()
+
+        workers = [
+            multiprocessing.Process(target=_serve, args=(burst,))
+            for _ in range(processes)
+        ]
+
+        for worker in workers:
+            worker.start()
+
+        # SIGTERM передаем обработчикам, Ctrl+C они получают сами
+        signal.signal(
+            signal.SIGTERM,
+            lambda *args: [worker.terminate() for worker in workers]
+        )
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        self.stdout.write(f'Запущено обработчиков: {processes}')
+
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sqlite import maintenance
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание баз SQLite: checkpoint журнала WAL, ANALYZE и '
+        'VACUUM. С --schedule ставит их в очередь core.jobs '
+        'с повтором по SQLITE_MAINTENANCE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'operations',
+            nargs='*',
+            help='checkpoint, analyze, vacuum. По умолчанию все.'
+        )
+        parser.add_argument(
+            '--database',
+            action='append',
+            help='База из DATABASES. По умолчанию все базы SQLite.'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='VACUUM даже при малом числе свободных страниц.'
+        )
+        parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help='Поставить обслуживание в очередь и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            added = maintenance.schedule()
+
+            for operation, alias in added:
+                self.stdout.write(f'Запланировано: {operation} {alias}')
+
+            if not added:
+                self.stdout.write('Обслуживание уже запланировано')
+
+            return
+
+        operations = options['operations'] or maintenance.OPERATIONS
+
+        for operation in operations:
+            if operation not in maintenance.OPERATIONS:
+                raise CommandError(f'Неизвестная операция {operation}')
+
+        aliases = options['database'] or maintenance.sqlite_aliases()
+
+        unknown = set(aliases) - set(maintenance.sqlite_aliases())
+
+        if unknown:
+            raise CommandError(f'Не база SQLite: {", ".join(unknown)}')
+
+        for alias in aliases:
+            for operation in operations:
+                self.run(operation, alias, options['force'])
+
+    def run(self, operation, alias, force):
+        if operation == 'checkpoint':
+            result = maintenance.checkpoint(alias)
+
+            if result is None:
+                self.stdout.write(f'{alias}: журнал не в режиме WAL')
+            else:
+                self.stdout.write(
+                    f'{alias}: checkpoint, в журнале {result[0]} '
+                    f'страниц, перенесено {result[1]}'
+                )
+
+        elif operation == 'analyze':
+            maintenance.analyze(alias)
+            self.stdout.write(f'{alias}: ANALYZE')
+
+        elif maintenance.vacuum(alias, force):
+            self.stdout.write(f'{alias}: VACUUM')
+
+        else:
+            self.stdout.write(
+                f'{alias}: VACUUM не нужен, свободно '
+                f'{maintenance.free_ratio(alias):.0%} страниц'
+            )
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('edited', models.DateTimeField(auto_now=True)),
+                ('task', models.CharField(max_length=200, verbose_name='Задача')),
+                ('arguments', models.TextField(default='{}', verbose_name='Аргументы')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Приоритет')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Когда выполнить')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('failed', 'Не выполнена')], default='queued', max_length=10, verbose_name='Состояние')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(verbose_name='Попыток не больше')),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100, verbose_name='Обработчик')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Занята до')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Задача',
+                'verbose_name_plural': 'Задачи',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', '-priority', 'run_at'], name='job_status_priority_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sequence',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Модель')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Последний тикет')),
+            ],
+            options={
+                'verbose_name': 'Последовательность id',
+                'verbose_name_plural': 'Последовательности id',
+            },
+        ),
+    ]
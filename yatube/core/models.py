@@ -0,0 +1,2 @@
+from core.jobs.models import Job  # noqa: F401
+from core.sharding.models import Sequence  # noqa: F401
@@ -0,0 +1,127 @@
+"""
+Пагинатор с заранее известным количеством записей.
+
+Paginator считает записи запросом COUNT(*) на каждой странице.
+Если количество уже хранится в счетчике или достаточно оценки,
+его можно передать в CountedPaginator и обойтись без запроса.
+"""
+from django.conf import settings
+from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db import connections, router
+from django.utils.functional import cached_property
+
+from core.caching.singleflight import get_or_compute
+
+
+class CountedPaginator(Paginator):
+    """
+    count - число записей или функция, которая его вернет.
+    estimated=True - count только оценка: страницы за ее пределами
+    не считаются пустыми и не обрезаются по count.
+    """
+
+    def __init__(self, object_list, per_page, count=None, estimated=False,
+                 **kwargs):
+        self._count = count
+        self.estimated = estimated
+
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        if self._count is None:
+            return super().count
+
+        if callable(self._count):
+            return self._count()
+
+        return self._count
+
+    def validate_number(self, number):
+        if not self.estimated:
+            return super().validate_number(number)
+
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+
+        return number
+
+    def page(self, number):
+        if not self.estimated:
+            return super().page(number)
+
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+
+
+def _sqlite_estimate(cursor, table):
+    # Статистику собирает ANALYZE, первое число - количество строк
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'"
+    )
+
+    if cursor.fetchone() is None:
+        return None
+
+    cursor.execute(
+        'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+    )
+    row = cursor.fetchone()
+
+    return int(row[0].split()[0]) if row else None
+
+
+def _postgresql_estimate(cursor, table):
+    cursor.execute(
+        'SELECT reltuples FROM pg_class WHERE relname = %s', [table]
+    )
+    row = cursor.fetchone()
+
+    return int(row[0]) if row and row[0] >= 0 else None
+
+
+ESTIMATORS = {
+    'sqlite': _sqlite_estimate,
+    'postgresql': _postgresql_estimate,
+}
+
+
+def _estimate(model):
+    connection = connections[router.db_for_read(model)]
+    estimator = ESTIMATORS.get(connection.vendor)
+
+    count = None
+
+    if estimator is not None:
+        with connection.cursor() as cursor:
+            count = estimator(cursor, model._meta.db_table)
+
+    if count is None:
+        count = model._default_manager.count()
+
+    return count
+
+
+def estimated_count(queryset):
+    """
+    Примерное количество записей всей таблицы модели.
+
+    Берется из статистики планировщика базы, если ее нет -
+    точный COUNT(*). Результат кэшируется на COUNT_ESTIMATE_TIMEOUT.
+    """
+    model = queryset.model
+
+    return get_or_compute(
+        f'estimated_count:{model._meta.db_table}',
+        lambda: _estimate(model),
+        settings.COUNT_ESTIMATE_TIMEOUT
+    )
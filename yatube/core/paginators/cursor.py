@@ -0,0 +1,337 @@
+"""
+Постраничная навигация по курсору (keyset pagination).
+
+Вместо LIMIT/OFFSET и COUNT(*) страница ищется по значениям полей
+сортировки последней показанной записи: WHERE (edited, id) < (?, ?).
+Глубина страницы не влияет на стоимость запроса.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page
+from django.db.models import CharField, Q, QuerySet, TextField
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .counted import CountedPaginator
+
+# Диапазон INTEGER в SQLite и BIGINT в других базах
+INTEGER_MIN, INTEGER_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    """ Упаковать значения полей сортировки в непрозрачную строку. """
+    packed = [
+        {'dt': value.isoformat()}
+        if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+
+    raw = json.dumps(packed, separators=(',', ':')).encode()
+
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ Распаковать строку курсора обратно в значения полей. """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        packed = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(packed, list):
+        raise InvalidCursor(cursor)
+
+    return [_unpack(value, cursor) for value in packed]
+
+
+def _unpack(value, cursor):
+    """ Одно значение курсора: дата, число, строка или None. """
+    if isinstance(value, list):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(value, dict):
+        return value
+
+    dt = value.get('dt')
+
+    if not isinstance(dt, str):
+        raise InvalidCursor(cursor)
+
+    try:
+        value = parse_datetime(dt)
+    except ValueError:
+        # Похоже на дату, но такой даты нет
+        value = None
+
+    if value is None:
+        raise InvalidCursor(cursor)
+
+    return value
+
+
+class Cursor:
+    """
+    Записи одной страницы вокруг курсора.
+
+    Запрос выполняется при первом обращении к записям, поэтому
+    страница, закрытая кэшем фрагмента, не ходит в базу.
+    """
+
+    def __init__(self, paginator, after=None, before=None):
+        self.paginator = paginator
+        self.after = after
+        self.before = before
+
+        # Курсор проверяем сразу, чтобы откатиться на первую страницу
+        self.queryset = paginator.seek(after=after, before=before)
+
+    def _fetch(self, limit):
+        return list(self.queryset[:limit])
+
+    @cached_property
+    def _window(self):
+        per_page = self.paginator.per_page
+
+        rows = self._fetch(per_page + 1)
+
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+
+        if self.before:
+            rows.reverse()
+
+        return rows, has_more
+
+    @property
+    def rows(self):
+        return self._window[0]
+
+    @property
+    def key(self):
+        """ Ключ страницы для кэша фрагментов. """
+        if self.after:
+            return f'after:{self.after}'
+
+        if self.before:
+            return f'before:{self.before}'
+
+        return ''
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, index):
+        # Шаблон сначала пробует cursor['key'], записи для этого не нужны
+        if not isinstance(index, (int, slice)):
+            raise TypeError(
+                f'Индекс должен быть числом или срезом, а не {type(index)}'
+            )
+
+        return self.rows[index]
+
+    def has_next(self):
+        if self.before:
+            return True
+
+        return self._window[1]
+
+    def has_previous(self):
+        if self.before:
+            return self._window[1]
+
+        return bool(self.after)
+
+    @property
+    def next(self):
+        if not (self.has_next() and self.rows):
+            return None
+
+        return self.paginator.cursor_for(self.rows[-1])
+
+    @property
+    def previous(self):
+        if not (self.has_previous() and self.rows):
+            return None
+
+        return self.paginator.cursor_for(self.rows[0])
+
+
+class CursorPaginator(CountedPaginator):
+    """
+    Пагинатор по курсору поверх QuerySet.
+
+    Поля сортировки берутся из order_by() запроса, он должен
+    заканчиваться уникальным полем. Если запрос не отсортирован,
+    берется Meta.ordering модели и в конец добавляется pk.
+    numbered=True оставляет ссылки на страницы по номерам там,
+    где COUNT(*) дешевый.
+
+    Страница по курсору остается обычной Page без номера: number
+    равен None, has_next/has_previous отвечают по курсору, соседние
+    страницы доступны через page.cursor.next и page.cursor.previous.
+    """
+
+    cursor_class = Cursor
+
+    def __init__(self, object_list, per_page, numbered=False, **kwargs):
+        self.numbered = numbered
+
+        if isinstance(object_list, QuerySet):
+            self.ordering = self._get_ordering(object_list)
+            object_list = object_list.order_by(*self.ordering)
+
+        super().__init__(object_list, per_page, **kwargs)
+
+    @staticmethod
+    def _get_ordering(queryset):
+        # Явный order_by() должен сам заканчиваться уникальным полем
+        if queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+
+        ordering = list(queryset.model._meta.ordering)
+
+        if not any(key.lstrip('-') in ('pk', 'id') for key in ordering):
+            descending = bool(ordering) and ordering[0].startswith('-')
+
+            ordering.append('-pk' if descending else 'pk')
+
+        return tuple(ordering)
+
+    def cursor_for(self, obj):
+        """ Курсор, указывающий на запись или строку values(). """
+        if isinstance(obj, dict):
+            return encode_cursor(
+                obj[key.lstrip('-')] for key in self.ordering
+            )
+
+        return encode_cursor(
+            getattr(obj, key.lstrip('-')) for key in self.ordering
+        )
+
+    def _to_python(self, name, value, cursor):
+        """ Значение курсора в типе поля сортировки или InvalidCursor. """
+        query = self.object_list.query
+        meta = self.object_list.model._meta
+
+        if name in query.annotations:
+            field = query.annotations[name].output_field
+        elif name == 'pk':
+            field = meta.pk
+        else:
+            field = meta.get_field(name)
+
+        if value is None:
+            if not field.null:
+                raise InvalidCursor(cursor)
+
+            return None
+
+        # Строка в поле даты или число вместо даты - подделка
+        if isinstance(value, str) != isinstance(field, (CharField, TextField)):
+            raise InvalidCursor(cursor)
+
+        try:
+            value = field.to_python(value)
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            raise InvalidCursor(cursor)
+
+        # Число вне INTEGER базы падает уже при выполнении запроса
+        if type(value) is int and not INTEGER_MIN <= value <= INTEGER_MAX:
+            raise InvalidCursor(cursor)
+
+        return value
+
+    def seek(self, after=None, before=None):
+        """
+        Запрос к записям после курсора after или перед курсором before.
+        Для before порядок сортировки обратный.
+        """
+        cursor = after or before
+
+        if cursor is None:
+            return self.object_list
+
+        values = decode_cursor(cursor)
+
+        if len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+
+        values = [
+            self._to_python(key.lstrip('-'), value, cursor)
+            for key, value in zip(self.ordering, values)
+        ]
+
+        condition = Q()
+        equal = Q()
+
+        for key, value in zip(self.ordering, values):
+            name = key.lstrip('-')
+            # Для обратной сортировки "после" означает "меньше"
+            forward = key.startswith('-') == bool(after)
+            lookup = 'lt' if forward else 'gt'
+
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        queryset = self.object_list.filter(condition)
+
+        if before:
+            queryset = queryset.reverse()
+
+        return queryset
+
+    def cursor_page(self, after=None, before=None):
+        """ Страница по курсору, без COUNT(*) и OFFSET. """
+        cursor = self.cursor_class(self, after=after, before=before)
+
+        page = Page(cursor, None, self)
+
+        page.cursor = cursor
+        page.has_next = cursor.has_next
+        page.has_previous = cursor.has_previous
+
+        return page
+
+    def get_page(self, number=None, after=None, before=None):
+        """
+        Страница по курсору, если он передан, иначе по номеру.
+        Испорченный курсор ведет на первую страницу.
+        """
+        if after or before:
+            try:
+                return self.cursor_page(after=after, before=before)
+            except InvalidCursor:
+                pass
+
+        if number is not None or self.numbered:
+            return super().get_page(number)
+
+        return self.cursor_page()
+
+
+def next_cursor(page):
+    """
+    Курсор следующей страницы. У страницы по номеру - курсор ее
+    последней записи, чтобы продолжить ленту по курсору.
+    """
+    if not page.has_next():
+        return None
+
+    cursor = getattr(page, 'cursor', None)
+
+    if cursor is not None:
+        return cursor.next
+
+    return page.paginator.cursor_for(page[-1])
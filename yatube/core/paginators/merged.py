@@ -0,0 +1,120 @@
+"""
+Лента, слитая из нескольких запросов с одной сортировкой.
+
+Условие OR по разным источникам не читается по одному индексу, и база
+сортирует всю выборку во временном B-дереве. Поэтому каждая часть
+ленты - отдельный запрос по своему индексу: она получает то же условие
+курсора и отдает не больше limit записей, а heapq.merge берет из них
+limit общих. Так же собирается лента со всех шардов (core.sharding).
+"""
+import heapq
+from itertools import islice
+
+from django.db.models import QuerySet, prefetch_related_objects
+
+from .cursor import Cursor, CursorPaginator
+
+
+def flip(key):
+    """ Поле сортировки в обратном направлении. """
+    return key[1:] if key.startswith('-') else f'-{key}'
+
+
+def merge(parts, limit, ordering):
+    """
+    Первые limit записей или строк values() из нескольких запросов.
+    ordering - общие поля сортировки запросов, все в одном направлении.
+    """
+    directions = {key.startswith('-') for key in ordering}
+
+    if len(directions) != 1:
+        raise ValueError('Поля сортировки должны идти в одном направлении')
+
+    fields = [key.lstrip('-') for key in ordering]
+
+    def sort_key(row):
+        if isinstance(row, dict):
+            return tuple(row[field] for field in fields)
+
+        return tuple(getattr(row, field) for field in fields)
+
+    # Связанные объекты догружаются один раз на слитую страницу,
+    # а не на каждую часть
+    lookups = set()
+    rows = []
+
+    for part in parts:
+        lookups.update(part._prefetch_related_lookups)
+        rows.append(list(part.prefetch_related(None)[:limit]))
+
+    rows = list(islice(
+        heapq.merge(*rows, key=sort_key, reverse=directions.pop()), limit
+    ))
+
+    if lookups:
+        prefetch_related_objects(rows, *lookups)
+
+    return rows
+
+
+class MergedQuerySet(QuerySet):
+    """
+    Запрос ко всей ленте вместе с частями, которые пагинатор читает
+    по отдельности. Сам запрос нужен для проверок и подсчета, части
+    задаются последними: после merged() их меняет только values().
+    """
+
+    parts = ()
+
+    def merged(self, *parts):
+        queryset = self._chain()
+        queryset.parts = parts
+
+        return queryset
+
+    def values(self, *fields, **expressions):
+        queryset = super().values(*fields, **expressions)
+        queryset.parts = tuple(
+            part.values(*fields, **expressions) for part in self.parts
+        )
+
+        return queryset
+
+    def _clone(self):
+        queryset = super()._clone()
+        queryset.parts = self.parts
+
+        return queryset
+
+
+class MergedCursor(Cursor):
+    def _fetch(self, limit):
+        ordering = self.paginator.ordering
+
+        # Для before части отсортированы в обратную сторону
+        if self.before:
+            ordering = [flip(key) for key in ordering]
+
+        return merge(self.queryset.parts, limit, ordering)
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """
+    Пагинатор по курсору для ленты из частей MergedQuerySet. Номеров
+    страниц нет: OFFSET по слитой ленте пришлось бы выполнять в каждой
+    части.
+    """
+
+    cursor_class = MergedCursor
+
+    def seek(self, after=None, before=None):
+        queryset = super().seek(after=after, before=before)
+
+        # Части получают тот же курсор, что и вся лента
+        return queryset.merged(*(
+            CursorPaginator(part, self.per_page).seek(after, before)
+            for part in self.object_list.parts
+        ))
+
+    def get_page(self, number=None, after=None, before=None):
+        return super().get_page(after=after, before=before)
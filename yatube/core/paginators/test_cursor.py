@@ -0,0 +1,158 @@
+import base64
+import json
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.paginators.cursor import (
+    CursorPaginator, InvalidCursor, decode_cursor, encode_cursor
+)
+from posts.models import Post, User
+
+
+class TestingCursorPaginator(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.GENERAL_AMOUNT_POSTS = 25
+
+        cls.AMOUNT_POSTS_ON_ONE_PAGE = 10
+
+        for i in range(cls.GENERAL_AMOUNT_POSTS):
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.user
+            )
+
+    def setUp(self):
+        cache.clear()
+
+        self.paginator = CursorPaginator(
+            Post.objects.all(),
+            self.AMOUNT_POSTS_ON_ONE_PAGE
+        )
+
+    def test_cursor_round_trip(self):
+        """ Курсор распаковывается в те же значения. """
+        post = Post.objects.first()
+
+        values = [post.edited, post.pk]
+
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_broken_cursor(self):
+        """ Испорченный курсор не принимается. """
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('не-курсор')
+
+    def test_cursor_with_wrong_types(self):
+        """ Курсор в base64 и JSON, но с чужими типами - первая страница. """
+        post = Post.objects.first()
+        raw = base64.urlsafe_b64encode(b'{"dt": 1}').decode()
+
+        cursors = [
+            raw,
+            encode_cursor(['вчера', post.pk]),
+            encode_cursor([post.edited, 'котик']),
+            encode_cursor([post.pk, post.pk]),
+            encode_cursor([[1], post.pk]),
+            encode_cursor([{'dt': 5}, post.pk]),
+            encode_cursor([{'dt': '2020-13-45T10:00:00'}, post.pk]),
+            encode_cursor([post.edited, None]),
+            encode_cursor([post.edited, 10 ** 30]),
+            encode_cursor([post.edited, -10 ** 30]),
+            base64.urlsafe_b64encode(
+                json.dumps([{'dt': post.edited.isoformat()}, 1e400]).encode()
+            ).decode(),
+        ]
+        first = list(self.paginator.get_page())
+
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                for direction in ('after', 'before'):
+                    page = self.paginator.get_page(**{direction: cursor})
+
+                    self.assertEqual(list(page), first)
+
+                response = Client().get(
+                    reverse('posts:index'), {'after': cursor}
+                )
+
+                self.assertEqual(response.status_code, 200)
+
+                response = Client().get(
+                    reverse('posts:api_index'), {'after': cursor}
+                )
+
+                self.assertEqual(response.status_code, 400)
+
+    def test_walk_forward_and_back(self):
+        """ Проход по курсорам вперед и назад совпадает с сортировкой. """
+        expected = list(Post.objects.order_by('-edited', '-pk'))
+
+        page = self.paginator.get_page()
+        seen = list(page)
+
+        while page.has_next():
+            page = self.paginator.get_page(after=page.cursor.next)
+            seen.extend(page)
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(page), 5)
+
+        previous = self.paginator.get_page(before=page.cursor.previous)
+
+        self.assertEqual(list(previous), expected[10:20])
+        self.assertTrue(previous.has_previous())
+
+    def test_first_page_without_count(self):
+        """ Первая страница по курсору не считает посты. """
+        page = self.paginator.get_page()
+
+        with self.assertNumQueries(1):
+            self.assertFalse(page.has_previous())
+            self.assertTrue(page.has_next())
+
+    def test_cursor_key_without_rows(self):
+        """ Ключ кэша в шаблоне не загружает записи страницы. """
+        page = self.paginator.get_page()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                Template('{{ page_obj.cursor.key }}').render(
+                    Context({'page_obj': page})
+                ),
+                ''
+            )
+
+    def test_numbered_pages_still_work(self):
+        """ Страница по номеру, как у обычного Paginator. """
+        page = self.paginator.get_page(3)
+
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+
+    def test_index_links_by_cursor(self):
+        """ Главная страница ведет на следующую страницу по курсору. """
+        response = Client().get(reverse('posts:index'))
+
+        next_cursor = response.context['page_obj'].cursor.next
+
+        self.assertContains(response, f'?after={next_cursor}')
+
+        response = Client().get(
+            reverse('posts:index'), {'after': next_cursor}
+        )
+
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(Post.objects.order_by('-edited', '-pk')[10:20])
+        )
@@ -0,0 +1,98 @@
+"""
+Выборочный профиль SQL по представлениям.
+
+Профилируется доля запросов SQL_PROFILING_RATE, остальным middleware
+стоит одного random(). В выбранном запросе каждая инструкция SQL
+проходит через execute_wrapper всех подключений: снимается время,
+текст сохраняется без значений параметров. Один и тот же текст,
+выполненный в запросе несколько раз, - признак N+1.
+
+Итоги копятся в процессе и сбрасываются в общие счетчики кэша
+(core.profiling.stats) не чаще раза в SQL_PROFILING_FLUSH секунд.
+"""
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import stats
+
+# Списки IN разной длины - один и тот же запрос
+IN_LIST = re.compile(r'\(%s(?:, %s)*\)')
+
+# Длиннее в отчете текст не нужен
+SQL_LENGTH = 1000
+
+UNRESOLVED = '<unresolved>'
+
+
+def normalize(sql):
+    return IN_LIST.sub('(%s, ...)', sql)[:SQL_LENGTH]
+
+
+class Collector:
+    """ Инструкции SQL одного запроса: число, время, повторы. """
+
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+        self.statements = Counter()
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(sql, time.perf_counter() - started)
+
+    def add(self, sql, duration):
+        sql = normalize(sql)
+
+        self.queries += 1
+        self.time += duration
+        self.statements[sql] += 1
+        self.slowest.append((duration, sql))
+
+    @property
+    def duplicates(self):
+        """ Лишние выполнения: повторы одного и того же текста. """
+        return self.queries - len(self.statements)
+
+    def repeated(self):
+        return {
+            sql: count for sql, count in self.statements.items()
+            if count > 1
+        }
+
+
+class SQLProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.SQL_PROFILING_RATE
+
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+
+        collector = Collector()
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(collector)
+                )
+
+            response = self.get_response(request)
+
+        # Запросы потокового ответа после этого места не учитываются
+        match = request.resolver_match
+        stats.record(match.view_name if match else UNRESOLVED, collector)
+
+        return response
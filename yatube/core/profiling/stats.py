@@ -0,0 +1,197 @@
+"""
+Общие счетчики профиля SQL в кэше.
+
+Числовые итоги представления лежат отдельными ключами и растут через
+cache.incr, поэтому процессы не теряют чужие приращения. Самые
+медленные и самые частые повторяющиеся инструкции хранятся одной
+записью на представление и сливаются чтением и записью: при гонке
+может пропасть одна выборка, но не счетчики.
+
+Каждый процесс копит итоги у себя и пишет их в кэш не чаще раза в
+SQL_PROFILING_FLUSH секунд, так что профиль почти не нагружает кэш.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'sqlprofile:'
+VIEWS_KEY = KEY_PREFIX + 'views'
+
+COUNTERS = ('requests', 'queries', 'time', 'duplicates', 'n_plus_one')
+
+_lock = threading.Lock()
+_pending = {}
+_flushed = time.monotonic()
+
+
+def _key(view, name):
+    return f'{KEY_PREFIX}{view}:{name}'
+
+
+def _empty():
+    return {
+        **dict.fromkeys(COUNTERS, 0),
+        'max_queries': 0,
+        'slowest': [],
+        'repeated': {},
+    }
+
+
+def _top(items, limit):
+    return sorted(items, reverse=True)[:limit]
+
+
+def _merge(totals, detail):
+    """ Слить выборки totals в запись кэша detail. """
+    limit = settings.SQL_PROFILING_TOP
+    repeated = dict(detail['repeated'])
+
+    for sql, count in totals['repeated'].items():
+        repeated[sql] = max(count, repeated.get(sql, 0))
+
+    return {
+        'max_queries': max(totals['max_queries'], detail['max_queries']),
+        'slowest': _top(totals['slowest'] + detail['slowest'], limit),
+        'repeated': dict(
+            (sql, count) for count, sql in _top(
+                ((count, sql) for sql, count in repeated.items()), limit
+            )
+        ),
+    }
+
+
+def record(view, collector):
+    """ Учесть профиль одного запроса. """
+    limit = settings.SQL_PROFILING_TOP
+
+    with _lock:
+        totals = _pending.setdefault(view, _empty())
+
+        totals['requests'] += 1
+        totals['queries'] += collector.queries
+        # Время в микросекундах: incr работает только с целыми
+        totals['time'] += round(collector.time * 1000000)
+        totals['duplicates'] += collector.duplicates
+        totals['n_plus_one'] += bool(collector.duplicates)
+        totals['max_queries'] = max(
+            totals['max_queries'], collector.queries
+        )
+        totals['slowest'] = _top(totals['slowest'] + [
+            (round(duration * 1000, 3), sql)
+            for duration, sql in collector.slowest
+        ], limit)
+
+        for sql, count in collector.repeated().items():
+            totals['repeated'][sql] = max(
+                count, totals['repeated'].get(sql, 0)
+            )
+
+        due = time.monotonic() - _flushed >= settings.SQL_PROFILING_FLUSH
+
+    if due:
+        try:
+            flush()
+        except Exception:
+            # Профиль не должен ронять страницу
+            logger.exception('Профиль SQL не записан')
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def flush():
+    """ Записать накопленное процессом в кэш. """
+    global _pending, _flushed
+
+    with _lock:
+        pending, _pending = _pending, {}
+        _flushed = time.monotonic()
+
+    if not pending:
+        return
+
+    for view, totals in pending.items():
+        for name in COUNTERS:
+            if totals[name]:
+                _incr(_key(view, name), totals[name])
+
+        key = _key(view, 'detail')
+        cache.set(
+            key, _merge(totals, cache.get(key) or _empty()), timeout=None
+        )
+
+    # Имя, потерянное в гонке двух процессов, вернется при следующей
+    # записи этого представления
+    views = cache.get(VIEWS_KEY) or []
+    missing = [view for view in pending if view not in views]
+
+    if missing:
+        cache.set(VIEWS_KEY, views + missing, timeout=None)
+
+
+def report():
+    """ Итоги по представлениям, больше всего времени в SQL - первыми. """
+    flush()
+
+    views = cache.get(VIEWS_KEY) or []
+    found = cache.get_many([
+        _key(view, name) for view in views
+        for name in COUNTERS + ('detail',)
+    ])
+
+    rows = []
+
+    for view in views:
+        totals = {
+            name: found.get(_key(view, name), 0) for name in COUNTERS
+        }
+        requests = totals['requests']
+
+        if not requests:
+            continue
+
+        detail = found.get(_key(view, 'detail')) or _empty()
+
+        rows.append({
+            'view': view,
+            'requests': requests,
+            'queries': round(totals['queries'] / requests, 1),
+            'max_queries': detail['max_queries'],
+            'sql_ms': round(totals['time'] / 1000 / requests, 2),
+            'total_sql_ms': round(totals['time'] / 1000, 1),
+            'duplicates': round(totals['duplicates'] / requests, 1),
+            'n_plus_one': totals['n_plus_one'],
+            'slowest': [
+                {'ms': ms, 'sql': sql} for ms, sql in detail['slowest']
+            ],
+            'repeated': [
+                {'count': count, 'sql': sql}
+                for sql, count in detail['repeated'].items()
+            ],
+        })
+
+    rows.sort(key=lambda row: row['total_sql_ms'], reverse=True)
+
+    return rows
+
+
+def reset():
+    with _lock:
+        _pending.clear()
+
+    views = cache.get(VIEWS_KEY) or []
+
+    cache.delete_many([
+        _key(view, name) for view in views
+        for name in COUNTERS + ('detail',)
+    ] + [VIEWS_KEY])
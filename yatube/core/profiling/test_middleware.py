@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.profiling import stats
+from core.profiling.middleware import Collector
+from posts.models import Post, User
+
+
+@override_settings(SQL_PROFILING_RATE=1, SQL_PROFILING_FLUSH=0)
+class TestingSQLProfiling(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leo')
+        cls.staff = User.objects.create(username='admin', is_staff=True)
+
+        Post.objects.create(text='Текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+
+        self.client = Client()
+        self.staff_client = Client()
+        self.staff_client.force_login(TestingSQLProfiling.staff)
+
+    def report(self):
+        response = self.staff_client.get(reverse('profiling:report_json'))
+
+        return {row['view']: row for row in response.json()['views']}
+
+    def test_request_profiled_by_view_name(self):
+        """ Запросы страницы учтены под именем представления. """
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+
+        row = self.report()['posts:index']
+
+        self.assertEqual(row['requests'], 2)
+        self.assertGreater(row['queries'], 0)
+        self.assertGreater(row['max_queries'], 0)
+        self.assertTrue(row['slowest'])
+
+    @override_settings(SQL_PROFILING_RATE=0)
+    def test_not_sampled(self):
+        """ При нулевой доле ничего не пишется. """
+        self.client.get(reverse('posts:index'))
+
+        self.assertNotIn('posts:index', self.report())
+
+    def test_repeated_statements_reported(self):
+        """ Один текст SQL несколько раз - повтор, списки IN сжаты. """
+        collector = Collector()
+        collector.add('SELECT * FROM post WHERE id = %s', 0.001)
+        collector.add('SELECT * FROM post WHERE id = %s', 0.002)
+        collector.add('SELECT * FROM post WHERE id IN (%s, %s)', 0.003)
+        collector.add('SELECT * FROM post WHERE id IN (%s)', 0.004)
+
+        stats.record('posts:test', collector)
+
+        row = {row['view']: row for row in stats.report()}['posts:test']
+
+        self.assertEqual((row['duplicates'], row['n_plus_one']), (2, 1))
+        self.assertEqual(row['slowest'][0], {
+            'ms': 4.0, 'sql': 'SELECT * FROM post WHERE id IN (%s, ...)'
+        })
+        self.assertCountEqual(row['repeated'], [
+            {'count': 2, 'sql': 'SELECT * FROM post WHERE id = %s'},
+            {'count': 2, 'sql': 'SELECT * FROM post WHERE id IN (%s, ...)'},
+        ])
+
+    def test_report_staff_only(self):
+        """ Отчет видит только персонал, POST обнуляет счетчики. """
+        for name in ('profiling:report', 'profiling:report_json'):
+            response = self.client.get(reverse(name))
+
+            self.assertEqual(response.status_code, 302)
+
+        self.client.get(reverse('posts:index'))
+
+        response = self.staff_client.get(reverse('profiling:report'))
+
+        self.assertContains(response, 'posts:index')
+
+        self.staff_client.post(reverse('profiling:report'))
+
+        self.assertNotIn('posts:index', self.report())
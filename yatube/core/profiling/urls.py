@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+
+app_name = 'profiling'
+
+urlpatterns = [
+    path('', views.report, name='report'),
+    path('json/', views.report_json, name='report_json'),
+]
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+
+from . import stats
+
+
+@staff_member_required
+def report(request):
+    """ Отчет по SQL представлений. POST обнуляет счетчики. """
+    if request.method == 'POST':
+        stats.reset()
+
+        return redirect('profiling:report')
+
+    return render(request, 'core/sql_report.html', {
+        'rows': stats.report(),
+        'rate': settings.SQL_PROFILING_RATE,
+    })
+
+
+@staff_member_required
+def report_json(request):
+    return JsonResponse({
+        'rate': settings.SQL_PROFILING_RATE,
+        'views': stats.report(),
+    })
@@ -0,0 +1,42 @@
+from django.conf import settings
+
+from . import router
+
+# Пока живет cookie, чтение пользователя идет из основной базы
+COOKIE_NAME = 'read_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class PinningMiddleware:
+    """
+    Read-your-writes: после записи пользователь READ_YOUR_WRITES_WINDOW
+    секунд читает из основной базы и видит свой пост или комментарий,
+    даже если реплика еще отстает.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        router.reset()
+
+        if (request.method not in SAFE_METHODS
+                or COOKIE_NAME in request.COOKIES):
+            router.pin()
+
+        try:
+            response = self.get_response(request)
+            wrote = router.wrote()
+        finally:
+            router.reset()
+
+        if wrote:
+            response.set_cookie(
+                COOKIE_NAME, '1',
+                max_age=settings.READ_YOUR_WRITES_WINDOW,
+                httponly=True,
+                samesite='Lax'
+            )
+
+        return response
@@ -0,0 +1,47 @@
+"""
+Замена репликации для локального запуска на SQLite.
+
+Реплика - копия файла основной базы, снятая через backup API SQLite.
+Копия согласованная, даже если в основную базу в это время пишут, а
+читатели реплики видят либо старую, либо новую копию целиком.
+"""
+import sqlite3
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+class ReplicationError(Exception):
+    pass
+
+
+def sqlite_path(alias):
+    database = settings.DATABASES[alias]
+
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        raise ReplicationError(f'{alias}: поддерживается только SQLite')
+
+    return database['NAME']
+
+
+def copy(source, target):
+    """ Скопировать файл базы source в target. """
+    source = sqlite3.connect(source)
+    target = sqlite3.connect(target)
+
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def replicate(aliases=None):
+    """ Обновить реплики из основной базы, вернуть их имена. """
+    aliases = aliases or settings.DATABASE_REPLICAS
+    source = sqlite_path(DEFAULT_DB_ALIAS)
+
+    for alias in aliases:
+        copy(source, sqlite_path(alias))
+
+    return aliases
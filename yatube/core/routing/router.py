@@ -0,0 +1,98 @@
+"""
+Чтение с реплик, запись в основную базу.
+
+Запросы на чтение моделей приложений REPLICA_APPS уходят на случайную
+реплику из DATABASE_REPLICAS, любая запись - в default. Реплика
+отстает от основной базы, поэтому чтение закрепляется за default:
+- внутри транзакции на default;
+- в потоке, который уже что-то записал;
+- в запросе, который пометил PinningMiddleware (POST или недавняя
+  запись этого пользователя);
+- при заполнении кэша и в запросе со страницей под ETag (primary()).
+
+Кэш фрагментов и ETag привязаны к поколениям данных, а поколение
+меняется сразу после записи в default. Фрагмент, собранный с отстающей
+реплики, лег бы в кэш под новым поколением до конца своего срока, а
+ETag с новым поколением отвечал бы 304 на устаревшую страницу.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def pin():
+    """ Читать из основной базы до конца запроса. """
+    _state.pinned = True
+
+
+@contextmanager
+def primary():
+    """ Читать из основной базы внутри блока. """
+    pinned = getattr(_state, 'pinned', False)
+    _state.pinned = True
+
+    try:
+        yield
+    finally:
+        _state.pinned = pinned
+
+
+def reset():
+    _state.pinned = False
+    _state.wrote = False
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def pinned():
+    return (
+        getattr(_state, 'pinned', False)
+        or wrote()
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+def _replicated(model):
+    return model._meta.app_label in settings.REPLICA_APPS
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not _replicated(model):
+            return None
+
+        if pinned():
+            return DEFAULT_DB_ALIAS
+
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if _replicated(model):
+            # Следующее чтение должно увидеть эту запись
+            _state.wrote = True
+
+        # Объект, прочитанный с реплики, сохраняется все равно в default
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии default, объекты из них можно связывать
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему реплика получает вместе с данными
+        if db in settings.DATABASE_REPLICAS:
+            return False
+
+        return None
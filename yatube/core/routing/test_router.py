@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import tempfile
+
+from django.db import router as db_router, transaction
+from django.http import HttpResponse
+from django.test import (
+    TestCase, TransactionTestCase, RequestFactory, override_settings
+)
+
+from core.routing import router
+from core.routing.middleware import COOKIE_NAME, PinningMiddleware
+from core.routing.replication import copy
+from posts.models import Post, User
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class TestingPrimaryReplicaRouter(TransactionTestCase):
+    # Без общей транзакции теста, иначе чтение всегда идет в default
+    def setUp(self):
+        router.reset()
+
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        router.reset()
+
+    def route(self, request):
+        """ Куда пошло чтение постов внутри запроса. """
+        routes = []
+
+        def view(request):
+            routes.append(db_router.db_for_read(Post))
+
+            return HttpResponse()
+
+        response = PinningMiddleware(view)(request)
+
+        return routes[0], response
+
+    def test_reads_go_to_replica(self):
+        """ Посты читаются с реплики, остальное - из default. """
+        self.assertEqual(db_router.db_for_read(Post), 'replica')
+        self.assertEqual(db_router.db_for_read(User), 'default')
+        self.assertEqual(db_router.db_for_write(Post), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertEqual(db_router.db_for_read(Post), 'default')
+
+    def test_write_pins_reads(self):
+        """ После записи поток читает из default. """
+        db_router.db_for_write(Post)
+
+        self.assertEqual(db_router.db_for_read(Post), 'default')
+
+    def test_primary_block(self):
+        """ Заполнение кэша читает из default только внутри блока. """
+        with router.primary():
+            self.assertEqual(db_router.db_for_read(Post), 'default')
+
+        self.assertEqual(db_router.db_for_read(Post), 'replica')
+
+    def test_transaction_reads_primary(self):
+        with transaction.atomic():
+            self.assertEqual(db_router.db_for_read(Post), 'default')
+
+    def test_read_your_writes_cookie(self):
+        """ POST читает из default и ставит cookie на окно после записи. """
+        def view(request):
+            db_router.db_for_write(Post)
+
+            return HttpResponse()
+
+        response = PinningMiddleware(view)(self.factory.post('/'))
+
+        self.assertIn(COOKIE_NAME, response.cookies)
+
+        database, _ = self.route(self.factory.post('/'))
+        self.assertEqual(database, 'default')
+
+        pinned = self.factory.get('/')
+        pinned.COOKIES[COOKIE_NAME] = '1'
+
+        database, _ = self.route(pinned)
+        self.assertEqual(database, 'default')
+
+        database, response = self.route(self.factory.get('/'))
+        self.assertEqual(database, 'replica')
+        self.assertNotIn(COOKIE_NAME, response.cookies)
+
+    def test_replicas_not_migrated(self):
+        self.assertFalse(db_router.allow_migrate('replica', 'posts'))
+        self.assertTrue(db_router.allow_migrate('default', 'posts'))
+
+
+class TestingReplication(TestCase):
+    def test_copy_sqlite_file(self):
+        """ Реплика получает схему и данные основной базы. """
+        with tempfile.TemporaryDirectory() as directory:
+            primary = os.path.join(directory, 'primary.sqlite3')
+            replica = os.path.join(directory, 'replica.sqlite3')
+
+            with sqlite3.connect(primary) as db:
+                db.execute('CREATE TABLE post (text TEXT)')
+                db.execute("INSERT INTO post VALUES ('котик')")
+
+            copy(primary, replica)
+
+            db = sqlite3.connect(replica)
+
+            try:
+                self.assertEqual(
+                    db.execute('SELECT text FROM post').fetchall(),
+                    [('котик',)]
+                )
+            finally:
+                db.close()
@@ -0,0 +1,23 @@
+"""
+SQLite для шардов.
+
+На шарде нет пользователей и групп, на которые ссылаются посты,
+поэтому проверка внешних ключей выключена. Обычный бэкенд включает ее
+в каждом соединении и заново после миграций, а тесты проверяют ключи
+после каждого теста. Здесь проверки нет.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        connection.execute('PRAGMA foreign_keys = OFF')
+
+        return connection
+
+    def enable_constraint_checking(self):
+        pass
+
+    def check_constraints(self, table_names=None):
+        pass
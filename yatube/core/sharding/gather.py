@@ -0,0 +1,51 @@
+"""
+Scatter-gather: лента по всем шардам.
+
+Каждый шард отдает первые limit записей в порядке сортировки ленты,
+слияние heapq.merge берет из них limit общих. Для страницы по курсору
+каждый шард получает то же условие WHERE (edited, id) < (?, ?), поэтому
+глубина страницы по-прежнему не влияет на стоимость запросов.
+"""
+from core.paginators.cursor import Cursor, CursorPaginator
+from core.paginators.merged import flip, merge
+
+from . import shards
+
+
+def gather(queryset, limit, ordering, aliases=None):
+    """
+    Первые limit записей или строк values() queryset со всех шардов.
+    ordering - поля сортировки queryset, все в одном направлении.
+    """
+    return merge(
+        [queryset.using(alias) for alias in aliases or shards.aliases()],
+        limit, ordering
+    )
+
+
+class ShardedCursor(Cursor):
+    def _fetch(self, limit):
+        ordering = self.paginator.ordering
+
+        # Для before запрос отсортирован в обратную сторону
+        if self.before:
+            ordering = [flip(key) for key in ordering]
+
+        return gather(self.queryset, limit, ordering, self.paginator.aliases)
+
+
+class ShardedCursorPaginator(CursorPaginator):
+    """
+    Пагинатор по курсору для ленты со всех шардов. Номеров страниц
+    нет: OFFSET по слитой ленте пришлось бы выполнять на каждом шарде.
+    """
+
+    cursor_class = ShardedCursor
+
+    def __init__(self, object_list, per_page, aliases=None, **kwargs):
+        self.aliases = aliases
+
+        super().__init__(object_list, per_page, **kwargs)
+
+    def get_page(self, number=None, after=None, before=None):
+        return super().get_page(after=after, before=before)
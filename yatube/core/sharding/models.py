@@ -0,0 +1,147 @@
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import F, Max
+
+from . import shards
+
+
+class Sequence(models.Model):
+    """
+    Счетчик тикетов для id шардированных записей. Живет в default,
+    поэтому id не повторяются между шардами.
+
+    Счет начинается с наибольшего id в default: записи, которые
+    лежали там до шардов, reshard переносит с id = старый id * SLOTS +
+    слот, и они не совпадут с новыми.
+    """
+
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Модель'
+    )
+    value = models.BigIntegerField(
+        default=0,
+        verbose_name='Последний тикет'
+    )
+
+    class Meta:
+        verbose_name = 'Последовательность id'
+        verbose_name_plural = 'Последовательности id'
+
+    def __str__(self) -> str:
+        return f'{self.name}: {self.value}'
+
+
+def start_sequence(model):
+    """ Завести последовательность model, если ее еще нет. """
+    start = model._base_manager.using(DEFAULT_DB_ALIAS).aggregate(
+        last=Max('pk')
+    )['last']
+
+    Sequence.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+        name=model._meta.label_lower, defaults={'value': start or 0}
+    )
+
+
+def next_ticket(model):
+    """ Следующий тикет для новой записи model. """
+    sequences = Sequence.objects.using(DEFAULT_DB_ALIAS).filter(
+        name=model._meta.label_lower
+    )
+
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        if not sequences.update(value=F('value') + 1):
+            start_sequence(model)
+            sequences.update(value=F('value') + 1)
+
+        return sequences.values_list('value', flat=True).get()
+
+
+class ShardedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        if not shards.enabled() or self._db is not None:
+            return super().create(**kwargs)
+
+        # Шард выбирается по самой записи: у запроса подсказки нет
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True)
+
+        return obj
+
+    def shard_for_pk(self, pk):
+        """ Запрос к шарду записи с этим id. Без шардов - как есть. """
+        if not shards.enabled():
+            return self
+
+        return self.using(shards.alias_for_pk(int(pk)))
+
+    def shard_for_key(self, value):
+        """ Запрос к шарду записей с этим значением ключа шардирования. """
+        if not shards.enabled():
+            return self
+
+        return self.using(
+            shards.alias_for_slot(self.model.slot_for_key(value))
+        )
+
+    def related(self, *fields):
+        """
+        select_related, пока все в одной базе. Связанные записи на
+        другом шарде или в default JOIN не достанет, с шардами они
+        догружаются через prefetch_related.
+        """
+        if shards.enabled():
+            return self.prefetch_related(*fields)
+
+        return self.select_related(*fields)
+
+
+class Sharded(models.Model):
+    """
+    Модель, записи которой разложены по шардам SHARDS.
+
+    shard_key - внешний ключ, по которому выбирается слот: на
+    нешардированную модель (автор поста) слот - хэш ее id, на другую
+    шардированную (пост комментария) - слот той записи. Связанные так
+    записи лежат на одном шарде.
+
+    Новая запись получает id из тикета Sequence и своего слота.
+    Без шардов id раздает база, как обычно.
+    """
+
+    shard_key = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def slot_for_key(cls, value):
+        related = cls._meta.get_field(cls.shard_key).related_model
+
+        if issubclass(related, Sharded):
+            return shards.slot_of(value)
+
+        return shards.key_slot(value)
+
+    @property
+    def shard_slot(self):
+        if self.pk is not None:
+            return shards.slot_of(self.pk)
+
+        value = getattr(self, self._meta.get_field(self.shard_key).attname)
+
+        if value is None:
+            return None
+
+        return self.slot_for_key(value)
+
+    def save(self, *args, **kwargs):
+        if self.pk is None and shards.enabled():
+            slot = self.shard_slot
+
+            if slot is not None:
+                self.pk = shards.make_id(next_ticket(type(self)), slot)
+                # id новый, UPDATE перед INSERT не нужен
+                kwargs['force_insert'] = True
+
+        super().save(*args, **kwargs)
@@ -0,0 +1,71 @@
+"""
+Роутер шардированных моделей (core.sharding.models.Sharded).
+
+Шард выбирается по подсказке instance, которую Django передает
+вместе с запросом: по самой записи или связанной шардированной
+(post.comments), по значению ключа шардирования (author.posts).
+Запрос без подсказки роутер не трогает: к шарду его нужно направить
+через shard_for_pk() и shard_for_key() или собрать со всех шардов
+(core.sharding.gather).
+
+Остальные модели живут в default. Связанные с записью на шарде
+объекты (post.author) тоже читаются из default, а не из базы записи.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import shards
+from .models import Sharded
+
+
+def _route(model, instance):
+    if not shards.enabled() or instance is None:
+        return None
+
+    if not issubclass(model, Sharded):
+        if instance._state.db in settings.SHARDS:
+            return DEFAULT_DB_ALIAS
+
+        return None
+
+    slot = None
+
+    if isinstance(instance, Sharded):
+        slot = instance.shard_slot
+    elif isinstance(
+        instance, model._meta.get_field(model.shard_key).related_model
+    ):
+        slot = model.slot_for_key(instance.pk)
+
+    if slot is None:
+        return None
+
+    return shards.alias_for_slot(slot)
+
+
+class ShardRouter:
+    def db_for_read(self, model, **hints):
+        return _route(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return _route(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not shards.enabled():
+            return None
+
+        # Пост на шарде ссылается на автора и группу из default
+        databases = {
+            DEFAULT_DB_ALIAS, *settings.SHARDS, *settings.DATABASE_REPLICAS
+        }
+
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        if shards.is_shard(db):
+            return app_label in settings.SHARDED_APPS
+
+        return None
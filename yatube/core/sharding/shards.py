@@ -0,0 +1,86 @@
+"""
+Раскладка записей по шардам.
+
+Ключ шардирования (для постов - автор) хэшируется в один из SLOTS
+виртуальных слотов, а слот отображается на базу из SHARDS. Номер слота
+зашит в младшие разряды первичного ключа: id = тикет * SLOTS + слот.
+Поэтому шард записи находится и по ключу шардирования, и по одному
+id, например из адреса страницы.
+
+Слоты раскладываются по шардам jump consistent hash: при добавлении
+шарда в конец списка переезжает только доля 1/N слотов, остальные
+остаются на месте.
+"""
+import zlib
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Часть формата id, менять нельзя
+SLOTS = 1024
+
+# ENGINE баз шардов в DATABASES
+BACKEND = 'core.sharding.backend'
+
+
+class Unsupported(Exception):
+    """
+    Операция читает одну базу default. С шардами она молча вернула бы
+    часть данных, поэтому не выполняется.
+    """
+
+
+def enabled():
+    return bool(settings.SHARDS)
+
+
+def require_unsharded(action):
+    """ Запретить action, который не умеет обходить шарды. """
+    if enabled():
+        raise Unsupported(f'{action} не работает с шардами (SHARDS)')
+
+
+def is_shard(alias):
+    """ База для шарда, даже если ее еще нет в SHARDS. """
+    return settings.DATABASES[alias]['ENGINE'] == BACKEND
+
+
+def aliases():
+    """ Базы, на которых лежат шардированные записи. """
+    return list(settings.SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def key_slot(value):
+    """ Слот значения ключа шардирования. """
+    return zlib.crc32(str(value).encode()) % SLOTS
+
+
+def slot_of(pk):
+    """ Слот записи по ее id. """
+    return pk % SLOTS
+
+
+def make_id(ticket, slot):
+    return ticket * SLOTS + slot
+
+
+def jump(key, buckets):
+    """ Jump consistent hash (Lamping, Veach): номер корзины ключа. """
+    bucket, candidate = -1, 0
+
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * (1 << 31) / ((key >> 33) + 1))
+
+    return bucket
+
+
+def alias_for_slot(slot, shards=None):
+    shards = shards or aliases()
+
+    return shards[jump(slot, len(shards))]
+
+
+def alias_for_pk(pk, shards=None):
+    return alias_for_slot(slot_of(pk), shards)
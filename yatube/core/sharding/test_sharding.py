@@ -0,0 +1,161 @@
+from django.db import router as db_router
+from django.test import TestCase, override_settings
+
+from core.sharding import shards
+from core.sharding.gather import ShardedCursorPaginator, gather
+from posts.models import Post, Comment, User
+
+SHARDS = ['shard0', 'shard1']
+
+
+def create_authors(per_shard):
+    """ Авторы, по per_shard на каждом шарде SHARDS. """
+    authors = {alias: [] for alias in SHARDS}
+    number = 0
+
+    while min(map(len, authors.values())) < per_shard:
+        author = User.objects.create(username=f'author{number}')
+        number += 1
+
+        alias = shards.alias_for_slot(Post.slot_for_key(author.pk), SHARDS)
+
+        if len(authors[alias]) < per_shard:
+            authors[alias].append(author)
+
+    return [author for pair in zip(*authors.values()) for author in pair]
+
+
+@override_settings(SHARDS=SHARDS)
+class TestingSharding(TestCase):
+    databases = {'default', *SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.authors = create_authors(3)
+
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.authors[number % 6]
+            )
+            for number in range(12)
+        ]
+
+    def alias_of(self, author):
+        return shards.alias_for_slot(Post.slot_for_key(author.pk))
+
+    def test_posts_on_author_shard(self):
+        """ Пост лежит на шарде автора, слот автора - в его id. """
+        self.assertEqual(
+            {self.alias_of(author) for author in self.authors}, set(SHARDS)
+        )
+
+        for post in self.posts:
+            alias = self.alias_of(post.author)
+
+            self.assertEqual(post._state.db, alias)
+            self.assertEqual(
+                shards.slot_of(post.pk), Post.slot_for_key(post.author_id)
+            )
+            self.assertTrue(Post.objects.using(alias).filter(
+                pk=post.pk
+            ).exists())
+
+        self.assertFalse(Post.objects.using('default').exists())
+
+    def test_comments_next_to_post(self):
+        post = self.posts[0]
+
+        comment = post.comments.create(author=self.authors[1], text='Да')
+
+        self.assertEqual(comment._state.db, post._state.db)
+        self.assertEqual(shards.slot_of(comment.pk), shards.slot_of(post.pk))
+
+        post = Post.objects.shard_for_pk(post.pk).get(pk=post.pk)
+
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            list(Comment.objects.shard_for_pk(comment.pk)), [comment]
+        )
+
+    def test_router_hints(self):
+        """ Шард по автору, по посту; связанные объекты - из default. """
+        author = self.authors[0]
+        post = self.posts[0]
+
+        self.assertEqual(
+            db_router.db_for_read(Post, instance=author),
+            self.alias_of(author)
+        )
+        self.assertEqual(
+            db_router.db_for_read(Comment, instance=post), post._state.db
+        )
+        self.assertEqual(
+            db_router.db_for_read(User, instance=post), 'default'
+        )
+        self.assertEqual(
+            list(author.posts.order_by('pk')),
+            [post for post in self.posts if post.author == author]
+        )
+
+    def test_consistent_slots(self):
+        """ С новым шардом переезжает около трети слотов, и только на него. """
+        before = [shards.alias_for_slot(slot, SHARDS)
+                  for slot in range(shards.SLOTS)]
+        after = [shards.alias_for_slot(slot, [*SHARDS, 'default'])
+                 for slot in range(shards.SLOTS)]
+
+        moved = [new for old, new in zip(before, after) if old != new]
+
+        self.assertEqual(set(moved), {'default'})
+        self.assertAlmostEqual(len(moved) / shards.SLOTS, 1 / 3, delta=0.05)
+
+    def test_gather(self):
+        """ Первые записи со всех шардов в общем порядке. """
+        expected = sorted(post.pk for post in self.posts)[::-1][:5]
+
+        rows = gather(Post.objects.order_by('-pk'), 5, ['-pk'])
+
+        self.assertEqual([post.pk for post in rows], expected)
+
+        rows = gather(Post.objects.order_by('-pk').values('pk'), 5, ['-pk'])
+
+        self.assertEqual([row['pk'] for row in rows], expected)
+
+        with self.assertRaises(ValueError):
+            gather(Post.objects.order_by('-edited', 'pk'), 5,
+                   ['-edited', 'pk'])
+
+    def test_paginator_walks_all_shards(self):
+        """ Лента по курсору проходит все посты всех шардов по разу. """
+        paginator = ShardedCursorPaginator(
+            Post.objects.feed().order_by('-edited', '-pk'), 5
+        )
+
+        page = paginator.get_page(number=2)
+        seen = [post.pk for post in page]
+
+        while page.has_next():
+            page = paginator.get_page(after=page.cursor.next)
+            seen.extend(post.pk for post in page)
+
+        self.assertEqual(seen, [post.pk for post in self.posts[::-1]])
+
+        previous = paginator.get_page(before=page.cursor.previous)
+
+        self.assertEqual(
+            [post.pk for post in previous],
+            [post.pk for post in self.posts[::-1]][5:10]
+        )
+
+    @override_settings(SHARDS=[])
+    def test_without_shards(self):
+        """ Без шардов все в default, id раздает база. """
+        post = Post.objects.create(text='Пост', author=self.authors[0])
+
+        self.assertEqual(post._state.db, 'default')
+        self.assertEqual(Post.objects.shard_for_pk(post.pk).db, 'default')
+        self.assertEqual(
+            db_router.db_for_read(Post, instance=self.authors[0]), 'default'
+        )
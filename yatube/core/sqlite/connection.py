@@ -0,0 +1,31 @@
+"""
+Настройка каждого нового соединения с SQLite.
+
+По умолчанию SQLite пишет через журнал отката: пока идет запись,
+читатели ждут, а при очереди писателей запросы получают "database is
+locked". В режиме WAL читатели не мешают писателю и наоборот,
+synchronous=NORMAL в WAL безопасен для целостности и не ждет fsync
+на каждой транзакции, а busy_timeout заставляет писателя подождать
+блокировку вместо ошибки. mmap_size и cache_size держат горячие
+страницы в памяти процесса.
+
+Значения берутся из SQLITE_PRAGMAS. journal_mode=WAL сохраняется в
+файле базы, остальные настройки живут только в соединении, поэтому
+применяются при каждом подключении.
+"""
+from django.conf import settings
+
+
+def apply_pragmas(db, pragmas):
+    """ Выполнить PRAGMA на соединении sqlite3. """
+    for name, value in pragmas.items():
+        db.execute(f'PRAGMA {name} = {value}')
+
+
+def configure(sender, connection, **kwargs):
+    """ Обработчик connection_created. """
+    if connection.vendor != 'sqlite':
+        return
+
+    # Мимо курсоров Django: запросы настройки не нужны в профилях
+    apply_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
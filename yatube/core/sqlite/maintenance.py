@@ -0,0 +1,129 @@
+"""
+Обслуживание файлов SQLite.
+
+- checkpoint: перенести WAL в основной файл и обрезать журнал, иначе
+  при постоянных читателях он растет без предела;
+- analyze: обновить статистику для планировщика и оценок количества
+  строк (core.paginators.counted);
+- vacuum: пересобрать файл, когда в нем много свободных страниц.
+  VACUUM блокирует запись на все время работы, поэтому выполняется,
+  только если свободных страниц не меньше SQLITE_VACUUM_FREE_RATIO.
+
+schedule() ставит эти операции в очередь core.jobs. Задача после
+выполнения ставит себя снова через интервал из SQLITE_MAINTENANCE.
+"""
+import json
+
+from django.conf import settings
+from django.db import connections
+
+from core.jobs import queue
+from core.jobs.models import Job
+from core.sharding import shards
+
+OPERATIONS = ('checkpoint', 'analyze', 'vacuum')
+
+
+def _copy(alias, database):
+    """ Реплика или зеркало - копия другой базы, ее не обслуживаем. """
+    return (
+        alias in settings.DATABASE_REPLICAS
+        or database.get('TEST', {}).get('MIRROR')
+    )
+
+
+def _idle(alias):
+    """ Шард, которого нет в SHARDS, приложение не использует. """
+    return shards.is_shard(alias) and alias not in settings.SHARDS
+
+
+def sqlite_aliases():
+    """ Базы SQLite, в которые пишет приложение. """
+    return [
+        alias for alias, database in settings.DATABASES.items()
+        if connections[alias].vendor == 'sqlite'
+        and not _copy(alias, database) and not _idle(alias)
+    ]
+
+
+def _pragma(alias, statement):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(statement)
+
+        return cursor.fetchone()
+
+
+def checkpoint(alias):
+    """ Страниц в журнале и перенесено в файл, или None без WAL. """
+    busy, logged, moved = _pragma(alias, 'PRAGMA wal_checkpoint(TRUNCATE)')
+
+    if logged < 0:
+        return None
+
+    return logged, moved
+
+
+def analyze(alias):
+    _pragma(alias, 'ANALYZE')
+
+
+def free_ratio(alias):
+    pages, = _pragma(alias, 'PRAGMA page_count')
+    free, = _pragma(alias, 'PRAGMA freelist_count')
+
+    return free / pages if pages else 0
+
+
+def vacuum(alias, force=False):
+    """ Пересобрать файл, если он того стоит. True - пересобран. """
+    if not force and free_ratio(alias) < settings.SQLITE_VACUUM_FREE_RATIO:
+        return False
+
+    with connections[alias].cursor() as cursor:
+        cursor.execute('VACUUM')
+
+    return True
+
+
+ACTIONS = {
+    'checkpoint': checkpoint,
+    'analyze': analyze,
+    'vacuum': vacuum,
+}
+
+
+def _scheduled():
+    """ Пары (операция, база), которые уже стоят в очереди. """
+    jobs = Job.objects.filter(
+        task=maintain.task_name, status__in=(Job.QUEUED, Job.RUNNING)
+    ).values_list('arguments', flat=True)
+
+    return {tuple(json.loads(arguments)['args']) for arguments in jobs}
+
+
+@queue.task
+def maintain(operation, alias):
+    ACTIONS[operation](alias)
+
+    # Без обработчиков задача выполняется сразу и не повторяется
+    if not settings.JOBS_EAGER:
+        maintain.enqueue(
+            operation, alias, _delay=settings.SQLITE_MAINTENANCE[operation]
+        )
+
+
+def schedule():
+    """ Поставить периодическое обслуживание, если его еще нет. """
+    scheduled = _scheduled()
+    added = []
+
+    for alias in sqlite_aliases():
+        for operation in OPERATIONS:
+            if (operation, alias) not in scheduled:
+                maintain.enqueue(
+                    operation, alias,
+                    _delay=settings.SQLITE_MAINTENANCE[operation]
+                )
+                added.append((operation, alias))
+
+    return added
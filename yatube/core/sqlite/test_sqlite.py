@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+
+from core.jobs.models import Job
+from core.sqlite import maintenance
+from core.sqlite.connection import apply_pragmas
+
+
+class TestingSQLiteConnection(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+
+            return cursor.fetchone()[0]
+
+    def test_connection_configured(self):
+        """ Новое соединение Django получает SQLITE_PRAGMAS. """
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+        # 1 - NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+    def test_file_switched_to_wal(self):
+        """ Файл базы переходит в WAL и остается в нем. """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'db.sqlite3')
+
+            db = sqlite3.connect(path)
+            apply_pragmas(db, settings.SQLITE_PRAGMAS)
+            db.close()
+
+            db = sqlite3.connect(path)
+
+            try:
+                self.assertEqual(
+                    db.execute('PRAGMA journal_mode').fetchone()[0], 'wal'
+                )
+            finally:
+                db.close()
+
+
+class TestingSQLiteMaintenance(TestCase):
+    def test_only_primary_databases(self):
+        """ Реплики, зеркала и неиспользуемые шарды не обслуживаются. """
+        self.assertEqual(maintenance.sqlite_aliases(), ['default'])
+
+        with self.settings(SHARDS=['shard1']):
+            self.assertEqual(
+                maintenance.sqlite_aliases(), ['default', 'shard1']
+            )
+
+    def test_operations(self):
+        maintenance.analyze('default')
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master "
+                "WHERE name = 'sqlite_stat1'"
+            )
+
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+        self.assertFalse(maintenance.vacuum('default'))
+
+    def test_schedule_once(self):
+        """ Обслуживание ставится в очередь один раз и повторяется. """
+        added = maintenance.schedule()
+
+        self.assertEqual(
+            sorted(added),
+            sorted((operation, 'default')
+                   for operation in maintenance.OPERATIONS)
+        )
+        self.assertEqual(maintenance.schedule(), [])
+
+        Job.objects.all().delete()
+
+        maintenance.maintain('analyze', 'default')
+
+        self.assertEqual(
+            maintenance._scheduled(), {('analyze', 'default')}
+        )
@@ -0,0 +1,10 @@
+from django import template
+
+from core.paginators import cursor
+
+register = template.Library()
+
+
+@register.filter
+def next_cursor(page):
+    return cursor.next_cursor(page) or ''
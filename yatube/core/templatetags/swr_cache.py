@@ -0,0 +1,69 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.template import Node, TemplateSyntaxError, VariableDoesNotExist
+
+from core.caching.singleflight import get_or_compute
+
+register = template.Library()
+
+
+class SWRCacheNode(Node):
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time_var = expire_time_var
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except VariableDoesNotExist:
+            raise TemplateSyntaxError(
+                f'"swrcache" tag got an unknown variable: '
+                f'{self.expire_time_var.var!r}'
+            )
+
+        try:
+            expire_time = int(expire_time)
+        except (ValueError, TypeError):
+            raise TemplateSyntaxError(
+                f'"swrcache" tag got a non-integer timeout value: '
+                f'{expire_time!r}'
+            )
+
+        vary_on = [var.resolve(context) for var in self.vary_on]
+
+        return get_or_compute(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context),
+            expire_time
+        )
+
+
+@register.tag('swrcache')
+def do_swrcache(parser, token):
+    """
+    Кэш фрагмента шаблона, как {% cache %}, но устаревший фрагмент
+    пересчитывает только один запрос, а остальные получают старый.
+
+        {% load swr_cache %}
+        {% swrcache [timeout] [fragment_name] [var1] [var2] .. %}
+            .. some expensive processing ..
+        {% endswrcache %}
+    """
+    nodelist = parser.parse(('endswrcache',))
+    parser.delete_first_token()
+
+    tokens = token.split_contents()
+
+    if len(tokens) < 3:
+        raise TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+
+    return SWRCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]]
+    )
@@ -0,0 +1,51 @@
+"""
+Тесты с отдельным кэшем.
+
+Кэш по умолчанию - файл SQLite, общий для всех процессов на машине
+(core.caching.backends.sqlite). Тесты сбрасывают кэш, поэтому на время
+прогона файлы кэшей переносятся во временный каталог, и кэш сайта,
+запущенного на той же машине, остается как был.
+
+manage.py test подключает это через TEST_RUNNER, pytest - через
+conftest.py в корне репозитория.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def temporary_caches():
+    """ CACHES с файлами во временном каталоге, который потом удаляется. """
+    directory = tempfile.mkdtemp(prefix='yatube-cache-')
+
+    caches = {
+        alias: {
+            **params, 'LOCATION': os.path.join(directory, f'{alias}.sqlite3')
+        }
+        for alias, params in settings.CACHES.items()
+    }
+
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+
+        self._caches = ExitStack()
+        self._caches.enter_context(temporary_caches())
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.close()
+
+        super().teardown_test_environment(**kwargs)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Post, Group, Comment, Follow
+from .search import search_posts
 
 
 @admin.register(Post)
@@ -20,6 +21,15 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     readonly_fields = ('edited',)
 
+    def get_search_results(self, request, queryset, search_term):
+        """ Поиск по полнотекстовому индексу вместо LIKE '%term%'. """
+        if not search_term:
+            return queryset, False
+
+        found = search_posts(search_term).values('pk')
+
+        return queryset.filter(pk__in=found), False
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -0,0 +1,196 @@
+"""
+JSON API только для чтения: ленты, пост и комментарии.
+
+Строки читаются через values() с короткими именами полей, без
+экземпляров моделей и связанных объектов. Страницы открываются по
+курсору ?after= из поля next предыдущего ответа. Ответы размечены
+теми же ETag, что и страницы, поэтому повторный запрос без изменений
+получает 304. Запросы не обходят шарды, поэтому с SHARDS API отвечает
+501.
+"""
+from functools import wraps
+
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from core.paginators.cursor import CursorPaginator, InvalidCursor
+from core.paginators.merged import MergedCursorPaginator
+from core.sharding import shards
+from .models import Post, Group, User, Comment
+from .inbox import follow_feed
+from . import etags
+
+POSTS_ON_PAGE = 10
+COMMENTS_ON_PAGE = 50
+
+# Имя в ответе -> поле для values()
+POST_FIELDS = {
+    'id': 'pk',
+    'text': 'text',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments': 'comments_count',
+    'created': 'created',
+}
+
+POST_DETAIL_FIELDS = {
+    **POST_FIELDS,
+    'edited': 'edited',
+    'author_name': 'author__first_name',
+    'author_surname': 'author__last_name',
+}
+
+COMMENT_FIELDS = {
+    'id': 'pk',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def _error(message, status):
+    return _json({'error': message}, status=status)
+
+
+def unsharded(view):
+    """ Запросы API читают только default: с шардами ответ 501. """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if shards.enabled():
+            return _error('API не работает с шардами (SHARDS)', 501)
+
+        return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _row(row, fields):
+    item = {name: row[field] for name, field in fields.items()}
+
+    if 'image' in item:
+        item['image'] = (
+            default_storage.url(item['image']) if item['image'] else None
+        )
+
+    return item
+
+
+def _page(request, queryset, fields, per_page):
+    """ Страница строк после курсора и курсор следующей. """
+    # Поля сортировки нужны в строках для курсора следующей страницы
+    ordering = CursorPaginator(queryset, per_page).ordering
+    rows = queryset.values(
+        *{*fields.values(), *(key.lstrip('-') for key in ordering)}
+    )
+
+    # Лента из частей листается слиянием частей
+    if getattr(rows, 'parts', None):
+        paginator = MergedCursorPaginator(rows, per_page)
+    else:
+        paginator = CursorPaginator(rows, per_page)
+
+    try:
+        cursor = paginator.cursor_page(after=request.GET.get('after')).cursor
+    except InvalidCursor:
+        return _error('Неверный курсор', 400)
+
+    return _json({
+        'results': [_row(row, fields) for row in cursor],
+        'next': cursor.next,
+    })
+
+
+@unsharded
+@require_safe
+@condition(etag_func=etags.index_etag)
+def index(request):
+    return _page(request, Post.objects.all(), POST_FIELDS, POSTS_ON_PAGE)
+
+
+@unsharded
+@require_safe
+@condition(etag_func=etags.group_posts_etag)
+def group_posts(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+
+    if group_id is None:
+        return _error('Группа не найдена', 404)
+
+    return _page(
+        request, Post.objects.filter(group_id=group_id), POST_FIELDS,
+        POSTS_ON_PAGE
+    )
+
+
+@unsharded
+@require_safe
+@condition(etag_func=etags.profile_etag)
+def profile(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+
+    if author_id is None:
+        return _error('Автор не найден', 404)
+
+    return _page(
+        request, Post.objects.filter(author_id=author_id), POST_FIELDS,
+        POSTS_ON_PAGE
+    )
+
+
+@unsharded
+@require_safe
+@condition(etag_func=etags.follow_etag)
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error('Нужно войти', 401)
+
+    return _page(
+        request, follow_feed(request.user), POST_FIELDS, POSTS_ON_PAGE
+    )
+
+
+@unsharded
+@require_safe
+@condition(
+    etag_func=etags.post_detail_etag,
+    last_modified_func=etags.post_detail_last_modified
+)
+def post_detail(request, post_id):
+    row = Post.objects.filter(pk=post_id).values(
+        *POST_DETAIL_FIELDS.values()
+    ).first()
+
+    if row is None:
+        return _error('Пост не найден', 404)
+
+    return _json(_row(row, POST_DETAIL_FIELDS))
+
+
+@unsharded
+@require_safe
+@condition(
+    etag_func=etags.post_detail_etag,
+    last_modified_func=etags.post_detail_last_modified
+)
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error('Пост не найден', 404)
+
+    return _page(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        COMMENTS_ON_PAGE
+    )
@@ -1,5 +1,20 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def install_search(using, **kwargs):
+    """ Вернуть триггеры поиска, если миграция пересоздала posts_post. """
+    from . import search
+
+    search.install(connections[using], create=False)
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        # Подключить обработчики сигналов
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(install_search, sender=self)
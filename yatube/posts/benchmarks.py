@@ -0,0 +1,62 @@
+"""
+Сценарии замеров страниц постов (benchmark_views).
+
+Для каждой страницы берутся самые тяжелые данные заполненной базы
+(seed_scale): самая большая группа, самый активный автор, пост с
+наибольшим числом комментариев, читатель с наибольшим числом
+подписок. Страницы, которые меняют подписки или удаляют посты, не
+замеряются: повтор запроса не измерял бы то же самое.
+"""
+from django.urls import reverse
+
+from core.benchmark.harness import Scenario
+from users.models import Profile
+
+from .models import Post, Group, Follow
+
+
+def scenarios():
+    group = Group.objects.order_by('-posts_count', 'pk').first()
+    author = Profile.objects.select_related('user').order_by(
+        '-posts_count', 'pk'
+    ).first().user
+    reader = Profile.objects.select_related('user').order_by(
+        '-following_count', 'pk'
+    ).first().user
+    post = Post.objects.order_by('-comments_count', 'pk').first()
+    followed = Follow.objects.filter(user=reader).select_related(
+        'author'
+    ).order_by('pk').first()
+
+    word = post.text.split()[0]
+
+    found = [
+        Scenario('index', reverse('posts:index')),
+        Scenario('search', reverse('posts:search'), data={'q': word}),
+        Scenario('profile', reverse(
+            'posts:profile', kwargs={'username': author.username}
+        )),
+        Scenario('post_detail', reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}
+        ), user=reader),
+        Scenario('follow_index', reverse('posts:follow_index'), user=reader),
+        Scenario('post_create', reverse('posts:post_create'),
+                 method='post', data={'text': 'Замер'}, user=reader,
+                 status=302),
+        Scenario('add_comment', reverse(
+            'posts:add_comment', kwargs={'post_id': post.pk}
+        ), method='post', data={'text': 'Замер'}, user=reader, status=302),
+    ]
+
+    if group is not None:
+        found.append(Scenario('group_posts', reverse(
+            'posts:group_posts', kwargs={'slug': group.slug}
+        )))
+
+    if followed is not None:
+        found.append(Scenario('follow_author', reverse(
+            'posts:follow_author',
+            kwargs={'username': followed.author.username}
+        ), user=reader))
+
+    return found
@@ -0,0 +1,88 @@
+"""
+Общее для массовой записи постов мимо сигналов: импорта и генерации
+тестовых данных.
+
+bulk_create не вызывает сигналы, поэтому то, что они делают для
+каждого поста, делает refresh() один раз для всех записанных постов.
+"""
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Max
+
+from core.caching.generations import bump
+
+from . import counters, inbox, search, thumbnails
+
+
+@contextmanager
+def keep_dates(*models):
+    """ bulk_create сохраняет переданные даты, а не текущее время. """
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def assign_pks(model, objects):
+    """
+    Раздать первичные ключи до bulk_create, если база не возвращает их
+    сама. Вызывается в транзакции, которая уже что-то записала: SQLite
+    не пустит других писателей до фиксации, и ключи никто не займет.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        return
+
+    # Со скрытыми постами, которые еще ждут удаления
+    last_pk = model._base_manager.aggregate(last=Max('pk'))['last'] or 0
+
+    for number, instance in enumerate(objects, 1):
+        instance.pk = last_pk + number
+
+
+def refresh(posts, batch_size=1000):
+    """ Обновить счетчики, ленты, поиск, миниатюры и кэш после записи. """
+    authors = set(
+        posts.order_by().values_list('author_id', flat=True).distinct()
+    )
+    groups = set(
+        posts.exclude(group=None).order_by().values_list(
+            'group_id', flat=True
+        ).distinct()
+    )
+
+    for name in ('profiles', 'groups', 'posts'):
+        getattr(counters, f'recount_{name}')(batch_size)
+
+    for author_id in authors:
+        inbox.rebuild_author(author_id)
+
+    # Индекс FTS5 обновляют триггеры в базе
+    if not search.uses_fts():
+        search.rebuild(batch_size)
+
+    waiting = posts.exclude(image='').exclude(image=None).filter(
+        thumbnails=''
+    ).values_list('pk', flat=True)
+
+    with transaction.atomic():
+        for post_id in waiting.iterator():
+            thumbnails.generate.enqueue(post_id)
+
+    bump(
+        'posts',
+        *[f'author:{author_id}' for author_id in authors],
+        *[f'profile:{author_id}' for author_id in authors],
+        *[f'group:{group_id}' for group_id in groups]
+    )
@@ -0,0 +1,200 @@
+"""
+Счетчики постов, подписок и комментариев.
+
+Точные значения хранятся в Profile (посты, подписчики, подписки),
+Group.posts_count и Post.comments_count и меняются атомарно через F()
+при создании, удалении и переносе поста в другую группу, подписке,
+отписке и комментарии. Для главной страницы хватает оценки
+estimated_count. Если счетчики разошлись с данными, их пересчитывает
+команда recount_counters.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, F
+
+from core.paginators.counted import estimated_count
+from core.sharding import shards
+from users.models import Profile
+
+from .models import Post, Group, Comment, Follow, User
+
+
+def _shift(model, lookup, field, delta):
+    model.objects.filter(**lookup).update(**{field: F(field) + delta})
+
+
+def post_added(post):
+    _shift(Profile, {'user_id': post.author_id}, 'posts_count', 1)
+
+    if post.group_id:
+        _shift(Group, {'pk': post.group_id}, 'posts_count', 1)
+
+
+def post_removed(post):
+    _shift(Profile, {'user_id': post.author_id}, 'posts_count', -1)
+
+    if post.group_id:
+        _shift(Group, {'pk': post.group_id}, 'posts_count', -1)
+
+
+def post_moved(old_group_id, new_group_id):
+    """ Пост перенесли в другую группу. """
+    if old_group_id == new_group_id:
+        return
+
+    if old_group_id:
+        _shift(Group, {'pk': old_group_id}, 'posts_count', -1)
+
+    if new_group_id:
+        _shift(Group, {'pk': new_group_id}, 'posts_count', 1)
+
+
+def follow_added(follow):
+    _shift(Profile, {'user_id': follow.author_id}, 'followers_count', 1)
+    _shift(Profile, {'user_id': follow.user_id}, 'following_count', 1)
+
+
+def follow_removed(follow):
+    _shift(Profile, {'user_id': follow.author_id}, 'followers_count', -1)
+    _shift(Profile, {'user_id': follow.user_id}, 'following_count', -1)
+
+
+def _shift_comments(post_id, delta):
+    # Пост может лежать на шарде
+    Post.objects.shard_for_pk(post_id).filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def comment_added(comment):
+    _shift_comments(comment.post_id, 1)
+
+
+def comment_removed(comment):
+    _shift_comments(comment.post_id, -1)
+
+
+def author_posts_count(author):
+    """ Количество постов автора без COUNT(*). """
+    try:
+        return author.profile.posts_count
+    except ObjectDoesNotExist:
+        # Профиль еще не заведен
+        return author.posts.count()
+
+
+def group_posts_count(group):
+    return group.posts_count
+
+
+def index_posts_count():
+    """ Оценка количества всех постов для главной страницы. """
+    return estimated_count(Post.objects.all())
+
+
+def _totals(queryset, field, ids):
+    """ Количество записей queryset по значениям field из ids. """
+    return dict(
+        queryset.filter(**{f'{field}__in': ids}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values_list(field, 'total')
+    )
+
+
+def _batches(queryset, batch_size):
+    """ Первичные ключи queryset пачками, по возрастанию. """
+    last_pk = 0
+
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', flat=True
+            )[:batch_size]
+        )
+
+        if not ids:
+            return
+
+        yield ids
+
+        last_pk = ids[-1]
+
+
+def recount_profiles(batch_size):
+    """ Пересчитать счетчики пользователей. Вернет число профилей. """
+    shards.require_unsharded('Пересчет счетчиков')
+
+    updated = 0
+
+    for ids in _batches(User.objects.all(), batch_size):
+        posts = _totals(Post.objects.all(), 'author', ids)
+        followers = _totals(Follow.objects.all(), 'author', ids)
+        following = _totals(Follow.objects.all(), 'user', ids)
+
+        existing = set(
+            Profile.objects.filter(user_id__in=ids).values_list(
+                'user_id', flat=True
+            )
+        )
+
+        Profile.objects.bulk_create(
+            Profile(user_id=user_id) for user_id in ids
+            if user_id not in existing
+        )
+
+        profiles = list(Profile.objects.filter(user_id__in=ids))
+
+        for profile in profiles:
+            profile.posts_count = posts.get(profile.user_id, 0)
+            profile.followers_count = followers.get(profile.user_id, 0)
+            profile.following_count = following.get(profile.user_id, 0)
+
+        Profile.objects.bulk_update(
+            profiles,
+            ('posts_count', 'followers_count', 'following_count')
+        )
+
+        updated += len(profiles)
+
+    return updated
+
+
+def recount_groups(batch_size):
+    """ Пересчитать количество постов в группах. """
+    shards.require_unsharded('Пересчет счетчиков')
+
+    updated = 0
+
+    for ids in _batches(Group.objects.all(), batch_size):
+        posts = _totals(Post.objects.all(), 'group', ids)
+
+        groups = list(Group.objects.filter(pk__in=ids))
+
+        for group in groups:
+            group.posts_count = posts.get(group.pk, 0)
+
+        Group.objects.bulk_update(groups, ('posts_count',))
+
+        updated += len(groups)
+
+    return updated
+
+
+def recount_posts(batch_size):
+    """ Пересчитать количество комментариев у постов. """
+    shards.require_unsharded('Пересчет счетчиков')
+
+    updated = 0
+
+    for ids in _batches(Post.objects.all(), batch_size):
+        comments = _totals(Comment.objects.all(), 'post', ids)
+
+        posts = [
+            Post(pk=post_id, comments_count=comments.get(post_id, 0))
+            for post_id in ids
+        ]
+
+        Post.objects.bulk_update(posts, ('comments_count',))
+
+        updated += len(posts)
+
+    return updated
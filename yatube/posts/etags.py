@@ -0,0 +1,139 @@
+"""
+Валидаторы для условных GET-запросов.
+
+ETag страницы собирается из номеров поколений кэша и полей, которые
+уже хранятся в строке поста, без загрузки объектов страницы. Если
+браузер или прокси присылает тот же ETag, представление не
+выполняется и отдается 304 Not Modified.
+
+Страницы выглядят по-разному для разных пользователей, поэтому в
+ETag входит pk пользователя. ETag слабый: токен CSRF в форме каждый
+раз новый, хотя страница та же.
+
+Валидаторы и сама страница под ETag читаются из основной базы
+(core.routing): ETag с новым поколением на странице с отстающей реплики
+отвечал бы 304 на устаревшую страницу, пока поколение снова не сменится.
+"""
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+
+from core.caching.generations import get_generations
+from core.routing import router
+
+from .models import Post, Group, User, Comment
+from . import fragments
+
+
+def _primary(func):
+    """ Запрос с валидатором читает из основной базы до конца. """
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        router.pin()
+
+        return func(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _etag(request, *parts):
+    viewer = request.user.pk or 0
+    query = request.GET.urlencode()
+
+    parts = [viewer, query, *parts]
+
+    return 'W/"%s"' % '-'.join(str(part) for part in parts)
+
+
+def _post_validators(request, post_id):
+    """ Поля поста для ETag и Last-Modified, один запрос на запрос. """
+    if not hasattr(request, '_post_validators'):
+        last_comment = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by('-created', '-id').values('created')[:1]
+
+        request._post_validators = Post.objects.shard_for_pk(
+            post_id
+        ).filter(
+            pk=post_id
+        ).annotate(
+            last_comment=Subquery(last_comment)
+        ).values(
+            'edited', 'comments_count', 'last_comment', 'author_id',
+            'group_id'
+        ).first()
+
+    return request._post_validators
+
+
+@_primary
+def post_detail_etag(request, post_id):
+    post = _post_validators(request, post_id)
+
+    if post is None:
+        return None
+
+    generations = get_generations(
+        f'author:{post["author_id"]}',
+        f'group:{post["group_id"]}',
+        'users'
+    )
+
+    return _etag(
+        request,
+        post['edited'].timestamp(),
+        post['comments_count'],
+        post['last_comment'] and post['last_comment'].timestamp(),
+        generations
+    )
+
+
+@_primary
+def post_detail_last_modified(request, post_id):
+    post = _post_validators(request, post_id)
+
+    if post is None:
+        return None
+
+    return max(filter(None, (post['edited'], post['last_comment'])))
+
+
+@_primary
+def group_posts_etag(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+
+    if group_id is None:
+        return None
+
+    return _etag(request, get_generations(f'group:{group_id}', 'users'))
+
+
+@_primary
+def profile_etag(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+
+    if author_id is None:
+        return None
+
+    return _etag(
+        request,
+        get_generations(f'author:{author_id}', f'profile:{author_id}',
+                        'groups')
+    )
+
+
+@_primary
+def index_etag(request):
+    return _etag(request, get_generations('posts', 'groups', 'users'))
+
+
+@_primary
+def follow_etag(request, username=None):
+    if not request.user.is_authenticated:
+        return None
+
+    return _etag(request, fragments.follow_generation(request.user))
@@ -0,0 +1,155 @@
+"""
+Выгрузка групп, постов, комментариев и подписок в JSON Lines.
+
+Таблицы обходятся по первичному ключу пачками (keyset: pk > последний),
+из базы читаются только нужные поля через values(), а строки сразу
+сжимаются в gzip и отдаются дальше. Поэтому память не растет с
+размером таблиц, а длинная выгрузка не держит открытым один курсор.
+
+Формат записей тот же, что читает import_content.
+"""
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from core.sharding import shards
+
+from .models import Post, Group, Comment, Follow
+
+TYPES = ('group', 'post', 'comment', 'follow')
+
+# Сжатые данные отдаются кусками не меньше этого размера
+CHUNK_SIZE = 64 * 1024
+
+
+def _keyset(queryset, fields, batch_size):
+    """ Строки queryset как словари, пачками по возрастанию pk. """
+    last_pk = 0
+
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').values(
+                'pk', *fields.values()
+            )[:batch_size]
+        )
+
+        if not batch:
+            return
+
+        for row in batch:
+            yield {name: row[field] for name, field in fields.items()}
+
+        last_pk = batch[-1]['pk']
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _filter(queryset, since, until, author, author_field):
+    if since:
+        queryset = queryset.filter(created__gte=_day_start(since))
+
+    if until:
+        # until включительно
+        queryset = queryset.filter(
+            created__lt=_day_start(until + timedelta(days=1))
+        )
+
+    if author is not None:
+        queryset = queryset.filter(**{author_field: author})
+
+    return queryset
+
+
+def export_records(types=TYPES, since=None, until=None, author=None,
+                   batch_size=1000):
+    """
+    Записи для выгрузки по одной. since и until - даты создания
+    включительно. Для автора выгружаются его посты, комментарии к ним
+    и подписки на него.
+    """
+    # Генератор проверил бы шарды только на первой записи
+    shards.require_unsharded('Выгрузка')
+
+    return _records(types, since, until, author, batch_size)
+
+
+def _records(types, since, until, author, batch_size):
+    posts = _filter(Post.objects.all(), since, until, author, 'author')
+    comments = _filter(
+        Comment.objects.all(), since, until, author, 'post__author'
+    )
+    follows = _filter(Follow.objects.all(), since, until, author, 'author')
+
+    sources = {
+        'group': (Group.objects.all(), {
+            'slug': 'slug',
+            'title': 'title',
+            'description': 'description',
+        }),
+        'post': (posts, {
+            'id': 'pk',
+            'author': 'author__username',
+            'group': 'group__slug',
+            'text': 'text',
+            'image': 'image',
+            'created': 'created',
+            'edited': 'edited',
+        }),
+        'comment': (comments, {
+            'id': 'pk',
+            'post': 'post_id',
+            'author': 'author__username',
+            'text': 'text',
+            'created': 'created',
+            'edited': 'edited',
+        }),
+        'follow': (follows, {
+            'user': 'user__username',
+            'author': 'author__username',
+            'created': 'created',
+        }),
+    }
+
+    for kind in TYPES:
+        if kind not in types:
+            continue
+
+        queryset, fields = sources[kind]
+
+        for record in _keyset(queryset, fields, batch_size):
+            yield {'type': kind, **record}
+
+
+def json_lines(records):
+    for record in records:
+        yield json.dumps(
+            record, ensure_ascii=False, cls=DjangoJSONEncoder
+        ).encode() + b'\n'
+
+
+def gzip_stream(chunks):
+    """ Сжать поток байтов в gzip на лету. """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    buffer = []
+    size = 0
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+
+        if data:
+            buffer.append(data)
+            size += len(data)
+
+        if size >= CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+
+    buffer.append(compressor.flush())
+
+    yield b''.join(buffer)
@@ -1,6 +1,7 @@
 from django import forms
 
-from .models import Post, Comment
+from .exporting import TYPES
+from .models import Post, Comment, Group, User
 
 
 class PostForm(forms.ModelForm):
@@ -15,3 +16,57 @@ class CommentForm(forms.ModelForm):
         model = Comment
 
         fields = ('text',)
+
+
+class AuthorFilterForm(forms.Form):
+    """ Фильтр по автору: username в поле, User в cleaned_data. """
+    author = forms.CharField(
+        max_length=150,
+        required=False,
+        label='Автор'
+    )
+
+    def clean_author(self):
+        username = self.cleaned_data['author']
+
+        if not username:
+            return None
+
+        author = User.objects.filter(username=username).first()
+
+        if author is None:
+            raise forms.ValidationError('Такого автора нет')
+
+        return author
+
+
+class SearchForm(AuthorFilterForm):
+    q = forms.CharField(
+        max_length=200,
+        label='Запрос'
+    )
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False,
+        empty_label='Все группы',
+        label='Группа'
+    )
+
+    field_order = ('q', 'group', 'author')
+
+
+class ExportForm(AuthorFilterForm):
+    since = forms.DateField(
+        required=False,
+        label='С даты'
+    )
+    until = forms.DateField(
+        required=False,
+        label='По дату включительно'
+    )
+    type = forms.MultipleChoiceField(
+        choices=[(kind, kind) for kind in TYPES],
+        required=False,
+        label='Что выгрузить'
+    )
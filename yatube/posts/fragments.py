@@ -0,0 +1,74 @@
+"""
+Кэш страниц постов.
+
+Главная страница, страница группы и профиль кэшируют список постов
+под ключом с номерами поколений. Номер меняется только при изменении
+данных, которые выводит фрагмент, поэтому запись в одну группу или
+профиль не сбрасывает кэш остальных. Так же устроен кэш данных
+представлений, например списка авторов в ленте подписок.
+"""
+from core.caching.generations import bump, get_generations
+from core.caching.singleflight import cached
+
+from .models import User
+
+
+def index_generation():
+    return get_generations('posts', 'groups', 'users')
+
+
+def group_generation(group):
+    return get_generations(f'group:{group.pk}', 'users')
+
+
+def profile_generation(author):
+    return get_generations(f'author:{author.pk}', 'groups')
+
+
+def follow_generation(user):
+    # Новый пост любимого автора меняет поколение posts
+    return get_generations(f'follows:{user.pk}', 'posts', 'users')
+
+
+def post_changed(post, old_group_id=None):
+    """ Пост создан, изменен или удален. """
+    names = ['posts', f'author:{post.author_id}']
+
+    for group_id in {old_group_id, post.group_id}:
+        if group_id:
+            names.append(f'group:{group_id}')
+
+    bump(*names)
+
+
+def group_changed(group):
+    bump('groups', f'group:{group.pk}')
+
+
+def author_changed(user):
+    bump('users', f'author:{user.pk}')
+
+
+def feeds_changed():
+    """ Пересобраны ленты подписчиков автора. """
+    # Отдельного поколения у лент нет, общее с постами
+    bump('posts')
+
+
+def follows_changed(follow):
+    # В профилях обоих пользователей выводятся счетчики подписок
+    bump(
+        f'follows:{follow.user_id}',
+        f'profile:{follow.user_id}',
+        f'profile:{follow.author_id}'
+    )
+
+
+def _follows_key(user):
+    return f'{user.pk}:{get_generations(f"follows:{user.pk}")}'
+
+
+@cached(key=_follows_key)
+def followed_authors(user):
+    """ Авторы, на которых подписан пользователь, для вкладок ленты. """
+    return list(User.objects.filter(following__user=user))
@@ -0,0 +1,440 @@
+"""
+Массовый импорт постов и комментариев (manage.py import_content).
+
+Записи читаются потоком из JSON Lines или CSV и пишутся пачками через
+bulk_create, каждая пачка - одна транзакция. Вместе с пачкой в той же
+транзакции сохраняется позиция в ImportCheckpoint, поэтому прерванный
+импорт продолжается ровно с первой незаписанной пачки.
+
+Запись поста:
+    {"type": "post", "id": "17", "author": "leo", "group": "cats",
+     "text": "...", "created": "2020-01-01T10:00:00", "image": "a.jpg"}
+Запись комментария:
+    {"type": "comment", "post": "17", "author": "leo", "text": "..."}
+Группа и подписка:
+    {"type": "group", "slug": "cats", "title": "...", "description": ""}
+    {"type": "follow", "user": "leo", "author": "author"}
+В CSV те же поля - столбцы. Выгрузка export_content читается как есть.
+
+id и post - идентификаторы поста в источнике, их соответствие нашим
+постам хранит ImportedPost. Авторы и группы ищутся по username и slug
+через словари в памяти. Картинки копируются из каталога media_dir.
+
+bulk_create не вызывает сигналы, поэтому счетчики, ленты подписчиков,
+поиск без FTS5, миниатюры и поколения кэша обновляются один раз в
+finish(). Ленты импортированных подписок дополняются там же: пары
+подписок собираются и из записей, пропущенных при продолжении.
+
+reset() начинает источник заново: точка импорта и созданные им посты
+удаляются вместе с комментариями, подписки и группы остаются.
+"""
+import csv
+import gzip
+import json
+import os
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.sharding import shards
+
+from . import fragments, inbox
+from .bulk import assign_pks, keep_dates, refresh
+from .models import (
+    Post, Group, Comment, Follow, User, ImportCheckpoint, ImportedPost
+)
+
+
+class RecordError(ValueError):
+    """ Запись нельзя импортировать, она пропускается. """
+
+
+def read_records(path, file_format=None):
+    """ Записи файла по одной: словари или RecordError. Файл .gz сжат. """
+    name = path.lower()
+    compressed = name.endswith('.gz')
+
+    if compressed:
+        name = name[:-len('.gz')]
+
+    file_format = file_format or (
+        'csv' if name.endswith('.csv') else 'jsonl'
+    )
+
+    opener = gzip.open if compressed else open
+
+    with opener(path, 'rt', encoding='utf-8', newline='') as source:
+        if file_format == 'csv':
+            yield from csv.DictReader(source)
+            return
+
+        for line in source:
+            if not line.strip():
+                continue
+
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield RecordError(f'Неверный JSON: {error}')
+
+
+def _date(value, default):
+    if not value:
+        return default
+
+    date = parse_datetime(value)
+
+    if date is None:
+        raise RecordError(f'Неверная дата: {value}')
+
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+
+    return date
+
+
+def _text(record):
+    text = (record.get('text') or '').strip()
+
+    if not text:
+        raise RecordError('Пустой текст')
+
+    return text
+
+
+class Importer:
+    def __init__(self, source, media_dir=None, create_missing=False,
+                 batch_size=1000, report=None):
+        # bulk_create пишет в default, мимо шардов
+        shards.require_unsharded('Импорт')
+
+        self.source = source
+        self.media_dir = media_dir
+        self.create_missing = create_missing
+        self.batch_size = batch_size
+        self.report = report or (lambda position, message: None)
+
+        self.authors = {}
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.posts = {}
+        self.follows = set()
+
+        self.imported = {'post': 0, 'comment': 0, 'follow': 0, 'skipped': 0}
+
+    def position(self):
+        return ImportCheckpoint.objects.filter(
+            source=self.source
+        ).values_list('position', flat=True).first() or 0
+
+    def reset(self):
+        """ Забыть точку импорта и удалить посты источника. """
+        with transaction.atomic():
+            ImportCheckpoint.objects.filter(source=self.source).delete()
+
+            # Сигналы уменьшат счетчики и сбросят кэш, лента и
+            # соответствия ImportedPost удалятся каскадом
+            Post.all_objects.filter(imports__source=self.source).delete()
+
+        self.posts = {}
+
+    def run(self, records):
+        """ Импортировать записи после сохраненной позиции. """
+        start = self.position()
+        batch = []
+
+        for position, record in enumerate(records, 1):
+            self._remember_follow(record)
+
+            if position <= start:
+                continue
+
+            batch.append((position, record))
+
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+
+        if batch:
+            self._write(batch)
+
+        return self.imported
+
+    def _remember_follow(self, record):
+        """ Подписка из записи, ее лента дополняется в finish(). """
+        if isinstance(record, dict) and record.get('type') == 'follow':
+            self.follows.add((record.get('user'), record.get('author')))
+
+    def _skip(self, position, error):
+        self.imported['skipped'] += 1
+        self.report(position, str(error))
+
+    def _resolve_authors(self, usernames):
+        missing = usernames - self.authors.keys()
+
+        if not missing:
+            return
+
+        self.authors.update(
+            User.objects.filter(username__in=missing).values_list(
+                'username', 'pk'
+            )
+        )
+
+        missing -= self.authors.keys()
+
+        if missing and self.create_missing:
+            # Войти они смогут после сброса пароля
+            User.objects.bulk_create(
+                User(username=username, password=make_password(None))
+                for username in missing
+            )
+
+            self.authors.update(
+                User.objects.filter(username__in=missing).values_list(
+                    'username', 'pk'
+                )
+            )
+
+    def _resolve_group(self, slug):
+        if not slug:
+            return None
+
+        if slug not in self.groups and self.create_missing:
+            group, _ = Group.objects.get_or_create(
+                slug=slug, defaults={'title': slug, 'description': ''}
+            )
+            self.groups[slug] = group.pk
+
+        if slug not in self.groups:
+            raise RecordError(f'Нет группы {slug}')
+
+        return self.groups[slug]
+
+    def _add_group(self, record):
+        slug = record.get('slug')
+
+        if not slug:
+            raise RecordError('Нет slug группы')
+
+        if slug not in self.groups:
+            group, _ = Group.objects.get_or_create(slug=slug, defaults={
+                'title': record.get('title') or slug,
+                'description': record.get('description') or '',
+            })
+            self.groups[slug] = group.pk
+
+    def _author(self, record, field='author'):
+        username = record.get(field)
+
+        if username not in self.authors:
+            raise RecordError(f'Нет автора {username}')
+
+        return self.authors[username]
+
+    def _image(self, record):
+        path = record.get('image')
+
+        if not path:
+            return None
+
+        if self.media_dir:
+            path = os.path.join(self.media_dir, path)
+
+        try:
+            with open(path, 'rb') as image:
+                return default_storage.save(
+                    f'posts/{os.path.basename(path)}', File(image)
+                )
+        except OSError as error:
+            raise RecordError(f'Картинка не скопирована: {error}')
+
+    def _parse(self, record, now):
+        """ Вид записи и то, что из нее запишется в базу. """
+        if isinstance(record, RecordError):
+            raise record
+
+        if not isinstance(record, dict):
+            raise RecordError('Запись должна быть объектом')
+
+        kind = record.get('type')
+        created = _date(record.get('created'), now)
+
+        if kind == 'group':
+            return kind, self._add_group(record)
+
+        if kind == 'follow':
+            return kind, Follow(
+                user_id=self._author(record, 'user'),
+                author_id=self._author(record),
+                created=created,
+                edited=created
+            )
+
+        if kind not in ('post', 'comment'):
+            raise RecordError(f'Неизвестный тип записи {kind}')
+
+        fields = {
+            'author_id': self._author(record),
+            'text': _text(record),
+            'created': created,
+            'edited': _date(record.get('edited'), created),
+        }
+
+        if kind == 'comment':
+            return kind, (str(record.get('post')), fields)
+
+        external_id = str(record.get('id', ''))
+
+        if external_id in ('', 'None'):
+            raise RecordError('Нет id поста')
+
+        fields['group_id'] = self._resolve_group(record.get('group'))
+        fields['image'] = self._image(record)
+
+        return kind, (external_id, Post(**fields))
+
+    def _prepare(self, batch):
+        """ Разобрать пачку. Картинки копируются до транзакции. """
+        self._resolve_authors({
+            record.get(field) for _, record in batch
+            if isinstance(record, dict)
+            for field in ('author', 'user') if record.get(field)
+        })
+
+        now = timezone.now()
+        parsed = {'post': [], 'comment': [], 'follow': [], 'group': []}
+
+        for position, record in batch:
+            try:
+                kind, value = self._parse(record, now)
+            except RecordError as error:
+                self._skip(position, error)
+                continue
+
+            if kind == 'comment':
+                value = (position, *value)
+
+            parsed[kind].append(value)
+
+        return parsed['post'], parsed['comment'], parsed['follow']
+
+    def _insert_posts(self, posts):
+        objects = [post for _, post in posts]
+
+        # Транзакция уже записала точку импорта
+        assign_pks(Post, objects)
+
+        Post.objects.bulk_create(objects)
+
+        ImportedPost.objects.bulk_create(
+            ImportedPost(source=self.source, external_id=external_id,
+                         post_id=post.pk)
+            for external_id, post in posts
+        )
+
+        self.posts.update(
+            (external_id, post.pk) for external_id, post in posts
+        )
+
+    def _post_ids(self, external_ids):
+        missing = set(external_ids) - self.posts.keys()
+
+        if missing:
+            self.posts.update(
+                ImportedPost.objects.filter(
+                    source=self.source, external_id__in=missing
+                ).values_list('external_id', 'post_id')
+            )
+
+        return self.posts
+
+    def _insert_follows(self, follows):
+        """ Подписки, которых еще нет. """
+        existing = set(
+            Follow.objects.filter(
+                user_id__in={follow.user_id for follow in follows},
+                author_id__in={follow.author_id for follow in follows}
+            ).values_list('user_id', 'author_id')
+        )
+
+        new = {}
+
+        for follow in follows:
+            pair = (follow.user_id, follow.author_id)
+
+            if pair not in existing and follow.user_id != follow.author_id:
+                new.setdefault(pair, follow)
+
+        Follow.objects.bulk_create(new.values())
+
+        return len(new)
+
+    def _write(self, batch):
+        posts, comments, follows = self._prepare(batch)
+
+        with transaction.atomic(), keep_dates(Post, Comment, Follow):
+            checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+                source=self.source
+            )
+            checkpoint.position = batch[-1][0]
+            checkpoint.save()
+
+            if posts:
+                self._insert_posts(posts)
+
+            known = self._post_ids(post for _, post, _ in comments)
+            objects = []
+
+            for position, post, fields in comments:
+                if post in known:
+                    objects.append(Comment(post_id=known[post], **fields))
+                else:
+                    self._skip(position, RecordError(f'Нет поста {post}'))
+
+            Comment.objects.bulk_create(objects)
+
+            if follows:
+                self.imported['follow'] += self._insert_follows(follows)
+
+        self.imported['post'] += len(posts)
+        self.imported['comment'] += len(objects)
+
+    def finish(self, batch_size=1000):
+        """ Обновить то, что обычно делают сигналы, разом для всего. """
+        refresh(Post.objects.filter(imports__source=self.source), batch_size)
+
+        self._refresh_follows()
+
+    def _refresh_follows(self):
+        """ Добавить в ленты посты авторов импортированных подписок. """
+        usernames = {name for pair in self.follows for name in pair}
+        users = dict(
+            User.objects.filter(username__in=usernames).values_list(
+                'username', 'pk'
+            )
+        )
+        pairs = {
+            (users[user], users[author]) for user, author in self.follows
+            if user in users and author in users
+        }
+
+        # Ошибочные записи подписок не создали
+        follows = Follow.objects.filter(
+            user_id__in={user_id for user_id, _ in pairs},
+            author_id__in={author_id for _, author_id in pairs}
+        ).only('user_id', 'author_id')
+
+        for follow in follows.iterator():
+            if (follow.user_id, follow.author_id) in pairs:
+                inbox.backfill(follow.user_id, follow.author_id)
+                fragments.follows_changed(follow)
+
+        # Импорт мог сделать автора популярным, его записи в лентах
+        # больше не нужны
+        for author_id in {author_id for _, author_id in pairs}:
+            if inbox.is_celebrity(author_id):
+                inbox.celebrity_changed(author_id)
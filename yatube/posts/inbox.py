@@ -0,0 +1,259 @@
+"""
+Входящая лента подписчика.
+
+Пост при создании раскладывается по лентам всех подписчиков автора
+(fan-out on write), поэтому follow_index читает уже отсортированные
+записи одного пользователя. Авторы, у которых подписчиков больше
+FEED_CELEBRITY_THRESHOLD, в ленты не раскладываются: их посты
+подмешиваются при чтении (merge on read): входящая лента и посты
+каждого популярного автора читаются отдельно, каждый запрос по своему
+индексу, и сливаются в одну страницу (core.paginators.merged).
+
+Когда подписка или отписка переводит автора через порог, обработчик
+очереди пересобирает его записи в лентах (tasks.celebrity_changed):
+у ставшего популярным они удаляются, а посты бывшего популярного
+раскладываются заново. Пока задача ждет, оставшиеся записи ставшего
+популярным автора ничего не портят: эти же посты подмешиваются при
+чтении. А в лентах бывшего популярного видны только посты, записи
+которых остались с тех пор, когда он еще не был популярным.
+
+С шардами (core.sharding) посты лежат не в default, и записи ленты
+не на что ссылать. Тогда лента собирается при чтении со всех шардов
+по списку авторов, на которых подписан пользователь.
+"""
+from django.conf import settings
+from django.db.models import F, Q
+
+from core.sharding import shards
+from users.models import Profile
+
+from .models import Post, Follow, FeedEntry
+
+
+def is_celebrity(author_id):
+    """ У автора слишком много подписчиков для раскладки по лентам. """
+    threshold = settings.FEED_CELEBRITY_THRESHOLD
+
+    # Не считаем всех подписчиков, достаточно найти порогового
+    return Follow.objects.filter(
+        author_id=author_id
+    )[threshold - 1:threshold].exists()
+
+
+def crossed_threshold(author_id, followed):
+    """
+    Подписка (followed=True) или отписка только что перевела автора
+    через FEED_CELEBRITY_THRESHOLD.
+    """
+    threshold = settings.FEED_CELEBRITY_THRESHOLD
+    count = threshold if followed else threshold - 1
+
+    # Ровно count подписчиков, считаются не больше count + 1
+    return Follow.objects.filter(
+        author_id=author_id
+    ).order_by().values('pk')[:count + 1].count() == count
+
+
+def celebrity_changed(author_id):
+    """ Автор перешел порог: убрать его из лент или разложить заново. """
+    if shards.enabled():
+        return
+
+    if is_celebrity(author_id):
+        # Посты подмешиваются при чтении, записи больше не нужны
+        FeedEntry.objects.filter(author_id=author_id).delete()
+    else:
+        rebuild_author(author_id)
+
+
+def celebrity_authors(user):
+    """ Популярные авторы, на которых подписан пользователь. """
+    # Подписчиков не считаем, счетчик уже есть в профиле автора
+    return Profile.objects.filter(
+        user__in=Follow.objects.filter(user=user).values('author'),
+        followers_count__gte=settings.FEED_CELEBRITY_THRESHOLD
+    ).values_list('user', flat=True)
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def _in_batches(values):
+    """ Разбить поток значений на пачки по FEED_FANOUT_BATCH_SIZE. """
+    batch = []
+
+    for value in values:
+        batch.append(value)
+
+        if len(batch) >= settings.FEED_FANOUT_BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def fan_out(post):
+    """ Разложить новый пост по лентам подписчиков автора. """
+    if shards.enabled():
+        return
+
+    if is_celebrity(post.author_id):
+        return
+
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).order_by().values_list('user_id', flat=True).iterator()
+
+    for batch in _in_batches(followers):
+        _bulk_insert(
+            FeedEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                edited=post.edited
+            )
+            for user_id in batch
+        )
+
+
+def touch(post):
+    """ Пост изменен, переставить его в лентах. """
+    if shards.enabled():
+        return
+
+    FeedEntry.objects.filter(post_id=post.pk).update(edited=post.edited)
+
+
+def backfill(user_id, author_id):
+    """ Подписка. Добавить в ленту уже написанные посты автора. """
+    if shards.enabled():
+        return
+
+    if is_celebrity(author_id):
+        return
+
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).order_by().values_list('pk', 'edited').iterator()
+
+    for batch in _in_batches(posts):
+        _bulk_insert(
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                edited=edited
+            )
+            for post_id, edited in batch
+        )
+
+
+def rebuild_author(author_id):
+    """ Разложить все посты автора по лентам всех его подписчиков. """
+    if shards.enabled():
+        return
+
+    if is_celebrity(author_id):
+        return
+
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).order_by().values_list('user_id', flat=True).iterator()
+
+    # Подписчиков меньше порога, поэтому посты читаются пару раз,
+    # а в памяти только одна пачка записей
+    for users in _in_batches(followers):
+        posts = Post.objects.filter(
+            author_id=author_id
+        ).order_by().values_list('pk', 'edited').iterator()
+
+        entries = (
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                edited=edited
+            )
+            for post_id, edited in posts
+            for user_id in users
+        )
+
+        for batch in _in_batches(entries):
+            _bulk_insert(batch)
+
+
+def prune(user_id, author_id):
+    """ Отписка. Убрать посты автора из ленты. """
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_feed(user, author=None):
+    """ Лента подписок пользователя, при необходимости одного автора. """
+    if shards.enabled():
+        return _gathered_feed(user, author)
+
+    celebrities = list(celebrity_authors(user))
+
+    if author is not None and author.pk in celebrities:
+        # Посты популярного автора в ленты не раскладываются
+        return _author_feed(author.pk)
+
+    entries = Q(inbox__user=user)
+
+    if author is not None:
+        entries &= Q(inbox__author=author)
+
+    # Сортируем по полям записи ленты, чтобы работал ее индекс
+    posts = Post.objects.feed().filter(entries).annotate(
+        feed_edited=F('inbox__edited'),
+        feed_post=F('inbox__post')
+    ).order_by('-feed_edited', '-feed_post')
+
+    if author is not None or not celebrities:
+        return posts
+
+    # Записи ставшего популярным автора, которые еще ждут удаления,
+    # не должны повторить его посты
+    posts = posts.exclude(author__in=celebrities)
+
+    # Вся лента одним запросом - для проверок, страницы же сливаются
+    # из входящей ленты и постов каждого популярного автора
+    inbox = FeedEntry.objects.filter(user=user).values('post_id')
+
+    return Post.objects.feed().filter(
+        Q(pk__in=inbox) | Q(author__in=celebrities)
+    ).annotate(
+        feed_edited=F('edited'),
+        feed_post=F('pk')
+    ).order_by('-feed_edited', '-feed_post').merged(
+        posts, *(_author_feed(author_id) for author_id in celebrities)
+    )
+
+
+def _author_feed(author_id):
+    """ Посты одного автора, с теми же полями сортировки, что у ленты. """
+    return Post.objects.feed().filter(author_id=author_id).annotate(
+        feed_edited=F('edited'),
+        feed_post=F('pk')
+    ).order_by('-feed_edited', '-feed_post')
+
+
+def _gathered_feed(user, author=None):
+    """ Посты авторов из подписок, запрос для сбора со всех шардов. """
+    follows = Follow.objects.filter(user=user)
+
+    if author is not None:
+        follows = follows.filter(author=author)
+
+    # Подзапрос к default на шарде не выполнить, авторы - списком
+    authors = list(follows.values_list('author_id', flat=True))
+
+    return Post.objects.feed().filter(
+        author_id__in=authors
+    ).order_by('-edited', '-pk')
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.benchmark import harness
+from posts.benchmarks import scenarios
+
+
+class Command(BaseCommand):
+    help = (
+        'Замерить страницы постов тестовым клиентом на заполненной базе '
+        '(seed_scale): p50/p95/p99, SQL, рендер, размер. С --baseline '
+        'регрессии против сохраненных итогов завершают команду ошибкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--only',
+            action='append',
+            help='Замерить только эти сценарии.'
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кэш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON с базовыми итогами для сравнения.'
+        )
+        parser.add_argument(
+            '--save',
+            help='Сохранить итоги в JSON как новую базу.'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Допустимый рост p95 и размера, доля.'
+        )
+
+    def handle(self, *args, **options):
+        # Созданные посты и комментарии после замера откатываются
+        with transaction.atomic():
+            selected = [
+                scenario for scenario in scenarios()
+                if not options['only'] or scenario.name in options['only']
+            ]
+
+            results = harness.run(
+                selected, options['repeat'], options['warmup'],
+                options['cold']
+            )
+
+            transaction.set_rollback(True)
+
+        for line in harness.table(results):
+            self.stdout.write(line)
+
+        if options['save']:
+            harness.save(options['save'], results)
+
+        if options['baseline']:
+            regressions = harness.compare(
+                results, harness.load(options['baseline']),
+                options['tolerance']
+            )
+
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions)
+                )
+
+            self.stdout.write('Регрессий нет')
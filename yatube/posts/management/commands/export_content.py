@@ -0,0 +1,89 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sharding import shards
+from posts.exporting import TYPES, export_records, gzip_stream, json_lines
+from posts.forms import ExportForm
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгрузить группы, посты, комментарии и подписки в JSON Lines '
+        'с gzip. Таблицы читаются пачками, память не растет с их '
+        'размером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл выгрузки, "-" - стандартный вывод.'
+        )
+        parser.add_argument(
+            '--since',
+            help='Созданное с этой даты (ГГГГ-ММ-ДД).'
+        )
+        parser.add_argument(
+            '--until',
+            help='Созданное по эту дату включительно (ГГГГ-ММ-ДД).'
+        )
+        parser.add_argument(
+            '--author',
+            help='Посты автора, комментарии к ним и подписки на него.'
+        )
+        parser.add_argument(
+            '--type',
+            choices=TYPES,
+            action='append',
+            help='Выгрузить только эти записи.'
+        )
+        parser.add_argument(
+            '--plain',
+            action='store_true',
+            help='Не сжимать.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк читать из базы за один запрос.'
+        )
+
+    def handle(self, *args, **options):
+        # Те же проверки, что у выгрузки через сайт
+        form = ExportForm({
+            'since': options['since'],
+            'until': options['until'],
+            'author': options['author'],
+        })
+
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        try:
+            records = export_records(
+                types=options['type'] or TYPES,
+                since=form.cleaned_data['since'],
+                until=form.cleaned_data['until'],
+                author=form.cleaned_data['author'],
+                batch_size=options['batch_size']
+            )
+        except shards.Unsupported as error:
+            raise CommandError(error)
+
+        chunks = json_lines(records)
+
+        if not options['plain']:
+            chunks = gzip_stream(chunks)
+
+        if options['path'] == '-':
+            output = sys.stdout.buffer
+        else:
+            output = open(options['path'], 'wb')
+
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Построить миниатюры для постов с картинками, у которых их '
+        'еще нет или они остались от прежней картинки или прежнего '
+        'формата Post.THUMBNAILS_VERSION.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help=(
+                'Построить заново миниатюры всех постов, например после '
+                'смены размеров в POST_THUMBNAILS.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image=None).only(
+            'pk', 'image', 'thumbnails'
+        )
+
+        generated = 0
+
+        for post in posts.iterator():
+            # Версию формата и имя картинки хранит JSON, проверяем здесь
+            if not options['all'] and not post.thumbnails_outdated:
+                continue
+
+            try:
+                generated += thumbnails.generate(post.pk)
+            except Exception as error:
+                self.stderr.write(f'{post.pk}: {error}')
+
+        self.stdout.write(f'Построены миниатюры {generated} постов')
@@ -0,0 +1,92 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sharding import shards
+from posts.importing import Importer, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортировать посты и комментарии из JSON Lines или CSV '
+        'пачками через bulk_create. Прерванный импорт продолжается '
+        'с последней записанной пачки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл .jsonl или .csv, по записи на строку, '
+                 'можно сжатый (.gz).'
+        )
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Формат файла, если его не видно по расширению.'
+        )
+        parser.add_argument(
+            '--source',
+            help='Имя источника для точки импорта и id постов. '
+                 'По умолчанию имя файла.'
+        )
+        parser.add_argument(
+            '--media-dir',
+            help='Каталог, относительно которого указаны картинки.'
+        )
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Заводить неизвестных авторов и группы.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей писать в одной транзакции.'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать источник сначала: забыть точку импорта '
+                 'и удалить импортированные из него посты.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+
+        if not os.path.isfile(path):
+            raise CommandError(f'Нет файла {path}')
+
+        try:
+            importer = Importer(
+                options['source'] or os.path.basename(path),
+                media_dir=options['media_dir'],
+                create_missing=options['create_missing'],
+                batch_size=options['batch_size'],
+                report=lambda position, message: self.stderr.write(
+                    f'{position}: {message}'
+                )
+            )
+        except shards.Unsupported as error:
+            raise CommandError(error)
+
+        if options['restart']:
+            importer.reset()
+
+        start = importer.position()
+
+        if start:
+            self.stdout.write(f'Продолжаем после записи {start}')
+
+        imported = importer.run(read_records(path, options['format']))
+
+        self.stdout.write('Обновляем счетчики, ленты и кэш')
+
+        importer.finish(options['batch_size'])
+
+        self.stdout.write(
+            'Импортировано постов: {post}, комментариев: {comment}, '
+            'подписок: {follow}, пропущено записей: {skipped}'.format(
+                **imported
+            )
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sharding import shards
+from posts import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Построить поисковый индекс постов заново, например после '
+        'правки базы в обход приложения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов индексировать за один проход.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            indexed = search.rebuild(options['batch_size'])
+        except shards.Unsupported as error:
+            raise CommandError(error)
+
+        engine = 'FTS5' if search.uses_fts() else 'PostTerm'
+
+        self.stdout.write(f'{engine}: проиндексировано {indexed}')
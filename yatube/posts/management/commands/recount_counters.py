@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sharding import shards
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитать счетчики постов, подписок и комментариев, '
+        'если они разошлись с данными.'
+    )
+
+    RECOUNTS = {
+        'profiles': counters.recount_profiles,
+        'groups': counters.recount_groups,
+        'posts': counters.recount_posts,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей пересчитывать за один проход.'
+        )
+        parser.add_argument(
+            '--only',
+            choices=self.RECOUNTS,
+            action='append',
+            help='Пересчитать только эти счетчики.'
+        )
+
+    def handle(self, *args, **options):
+        for name in options['only'] or self.RECOUNTS:
+            try:
+                updated = self.RECOUNTS[name](options['batch_size'])
+            except shards.Unsupported as error:
+                raise CommandError(error)
+
+            self.stdout.write(f'{name}: пересчитано {updated}')
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sharding import shards
+from posts.resharding import reshard
+
+
+class Command(BaseCommand):
+    help = (
+        'Перенести посты и комментарии на шарды их авторов: после '
+        'изменения SHARDS или из default при включении шардов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sources',
+            nargs='*',
+            help='Базы, из которых переносить. По умолчанию default и '
+                 'все SHARDS.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько постов переносить за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        if not shards.enabled():
+            raise CommandError('Шарды не заданы: заполните SHARDS')
+
+        unknown = set(options['sources']) - set(settings.DATABASES)
+
+        if unknown:
+            raise CommandError(f'Нет баз: {", ".join(sorted(unknown))}')
+
+        moved = reshard(
+            options['sources'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write
+        )
+
+        if not moved:
+            self.stdout.write('Все посты на своих шардах')
@@ -0,0 +1,92 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sharding import shards
+from posts.seeding import Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполнить базу данными в масштабе продакшена: пользователи, '
+        'подписки со степенным распределением, посты, горячие посты '
+        'с тысячами комментариев. При одном --seed данные одинаковые.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Сколько подписок у пользователя в среднем.'
+        )
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument(
+            '--comments',
+            type=int,
+            default=20000,
+            help='Комментарии кроме горячих постов.'
+        )
+        parser.add_argument('--hot-posts', type=int, default=5)
+        parser.add_argument(
+            '--hot-comments',
+            type=int,
+            default=2000,
+            help='Сколько комментариев у каждого горячего поста.'
+        )
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=0,
+            help='Скольким постам сгенерировать картинки.'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней написаны посты.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Начало имен пользователей и slug групп.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--processes',
+            type=int,
+            help='Процессы для текстов, по умолчанию по числу ядер.'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        try:
+            seeder = Seeder(
+                seed=options['seed'],
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                processes=options['processes'],
+                days=options['days'],
+                log=self.stdout.write
+            )
+        except shards.Unsupported as error:
+            raise CommandError(error)
+
+        seeder.users(options['users'])
+        seeder.groups(options['groups'])
+        seeder.follows(options['follows'])
+        seeder.posts(options['posts'], options['images'])
+        seeder.comments(
+            options['comments'],
+            options['hot_posts'],
+            options['hot_comments']
+        )
+        seeder.finish()
+
+        self.stdout.write(
+            f'Готово за {time.perf_counter() - started:.0f} с'
+        )
@@ -0,0 +1,97 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_inbox(apps, schema_editor):
+    """ Разложить уже написанные посты по лентам подписчиков. """
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+
+    for follow in Follow.objects.iterator():
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=follow.user_id,
+                    post_id=post_id,
+                    author_id=follow.author_id,
+                    edited=edited
+                )
+                for post_id, edited in Post.objects.filter(
+                    author_id=follow.author_id
+                ).values_list('pk', 'edited').iterator()
+            ),
+            batch_size=500,
+            ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_auto_20220710_2102'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'ordering': ['-created'], 'verbose_name': 'Подписки', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AlterField(
+            model_name='follow',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='follow',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='description',
+            field=models.TextField(verbose_name='Описание'),
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='slug',
+            field=models.SlugField(default='category-', max_length=40, unique=True, verbose_name='Путь'),
+        ),
+        migrations.AlterField(
+            model_name='group',
+            name='title',
+            field=models.CharField(max_length=200, unique=True, verbose_name='Заголовок'),
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('edited', models.DateTimeField(verbose_name='Дата изменения поста')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+                'ordering': ['-edited'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-edited', '-post'], name='feedentry_user_edited_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feedentry_user_author_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='feedentry',
+            unique_together={('user', 'post')},
+        ),
+        migrations.RunPython(fill_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:36
+
+from django.db import migrations, models
+
+
+def count_group_posts(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+
+    counts = Post.objects.filter(group__isnull=False).order_by().values(
+        'group'
+    ).annotate(total=models.Count('id')).values_list('group', 'total')
+
+    for group_id, total in counts:
+        Group.objects.filter(pk=group_id).update(posts_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.RunPython(count_group_posts, migrations.RunPython.noop),
+    ]
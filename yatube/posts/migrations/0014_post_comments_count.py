@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:40
+
+from django.db import migrations, models
+
+
+def count_comments(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+
+    totals = Comment.objects.order_by().values('post').annotate(
+        total=models.Count('id')
+    ).values_list('post', 'total')
+
+    for post_id, total in totals:
+        Post.objects.filter(pk=post_id).update(comments_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
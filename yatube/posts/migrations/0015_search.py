@@ -0,0 +1,94 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:52
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+# SQL индекса на момент миграции. posts.search может меняться дальше,
+# а миграция должна создавать то же, что и раньше
+FTS_TABLE = 'posts_post_fts'
+
+FTS_SCHEMA = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"text, content='posts_post', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')"
+)
+
+FTS_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert "
+    f"AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete "
+    f"AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+    f"AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+)
+
+
+def install_fts(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        if FTS_TABLE in connection.introspection.table_names(cursor):
+            return
+
+        try:
+            cursor.execute(FTS_SCHEMA)
+        except OperationalError:
+            # SQLite собран без FTS5, поиск будет через PostTerm
+            return
+
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(trigger)
+
+
+def remove_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for suffix in ('insert', 'delete', 'update'):
+        schema_editor.execute(
+            f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}'
+        )
+
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Терм')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Частота')),
+                ('length', models.PositiveIntegerField(verbose_name='Длина поста')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Терм поиска',
+                'verbose_name_plural': 'Термы поиска',
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(install_fts, remove_fts),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=200, unique=True, verbose_name='Источник')),
+                ('position', models.PositiveIntegerField(default=0, verbose_name='Записей импортировано')),
+                ('edited', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Точка импорта',
+                'verbose_name_plural': 'Точки импорта',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportedPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=200, verbose_name='Источник')),
+                ('external_id', models.CharField(max_length=100, verbose_name='Id в источнике')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Импортированный пост',
+                'verbose_name_plural': 'Импортированные посты',
+                'unique_together': {('source', 'external_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_imports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='deleted',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Удален'),
+        ),
+    ]
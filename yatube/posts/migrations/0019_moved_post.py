@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovedPost',
+            fields=[
+                ('old_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Старый id')),
+                ('new_id', models.BigIntegerField(verbose_name='Новый id')),
+            ],
+            options={
+                'verbose_name': 'Перенесенный пост',
+                'verbose_name_plural': 'Перенесенные посты',
+            },
+        ),
+    ]
@@ -1,12 +1,35 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
 
-from core.general_models.models import Date
+from core.general_models.models import Counters, Date
+from core.paginators.merged import MergedQuerySet
+from core.sharding.models import Sharded, ShardedQuerySet
 
 User = get_user_model()
 
 
-class Post(Date):
+class PostQuerySet(MergedQuerySet, ShardedQuerySet):
+    def feed(self):
+        """ Посты для карточек ленты вместе со всем, что выводит шаблон. """
+        return self.related('author', 'group')
+
+
+class PostManager(models.Manager.from_queryset(PostQuerySet)):
+    def get_queryset(self):
+        # Удаленный пост ждет фоновой очистки и нигде не показывается
+        return super().get_queryset().filter(deleted=False)
+
+
+class CommentQuerySet(ShardedQuerySet):
+    def listing(self):
+        """ Комментарии для списка под постом вместе с авторами. """
+        return self.related('author')
+
+
+class Post(Sharded, Counters, Date):
     text = models.TextField(
         verbose_name='Описание',
         help_text='Введите описание поста'
@@ -38,17 +61,94 @@ class Post(Date):
         null=True,
         help_text='Загрузите картинку'
     )
+    comments_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+    # Адреса и размеры готовых миниатюр картинки в JSON
+    thumbnails = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Миниатюры'
+    )
+    # Пост удален автором, строку и все, что на нее ссылается, удалит
+    # фоновая задача posts.tasks.delete_post
+    deleted = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Удален'
+    )
+
+    objects = PostManager()
+    # Вместе с удаленными
+    all_objects = PostQuerySet.as_manager()
+
+    # Посты автора лежат на одном шарде
+    shard_key = 'author'
+
+    # Миниатюры и отметку об удалении записывают через update(),
+    # save() их не трогает
+    counter_fields = ('comments_count', 'thumbnails', 'deleted')
+
+    # Меняется вместе с форматом Post.thumbnails
+    THUMBNAILS_VERSION = 2
 
     class Meta:
         ordering = ['-edited']
+        # Индексы повторяют сортировку лент: (edited, id) по убыванию
+        indexes = [
+            models.Index(
+                fields=['-edited', '-id'],
+                name='post_edited_idx'
+            ),
+            models.Index(
+                fields=['author', '-edited', '-id'],
+                name='post_author_edited_idx'
+            ),
+            models.Index(
+                fields=['group', '-edited', '-id'],
+                name='post_group_edited_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self) -> str:
         return f'Описание: {self.text[:15]}...'
 
+    def _current_thumbnails(self):
+        """ Данные Post.thumbnails, если они от текущей картинки. """
+        if not self.thumbnails:
+            return None
+
+        data = json.loads(self.thumbnails)
+
+        # Миниатюры от прежней картинки или прежнего формата не подходят
+        if (data.get('version') != self.THUMBNAILS_VERSION
+                or data['image'] != self.image.name):
+            return None
+
+        return data
 
-class Group(models.Model):
+    @property
+    def thumbnails_outdated(self):
+        """ Миниатюр нет или они построены для другой картинки/формата. """
+        return self._current_thumbnails() is None
+
+    @cached_property
+    def thumbnail(self):
+        """ Миниатюры текущей картинки по размерам: url, width, height. """
+        data = self._current_thumbnails()
+
+        if data is None:
+            return {}
+
+        return data['sizes']
+
+
+class Group(Counters):
     title = models.CharField(
         max_length=200,
         unique=True,
@@ -63,6 +163,13 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Описание'
     )
+    posts_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов'
+    )
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name = 'Группа'
@@ -72,7 +179,7 @@ class Group(models.Model):
         return self.title
 
 
-class Comment(Date):
+class Comment(Sharded, Date):
     post = models.ForeignKey(
         'Post',
         on_delete=models.CASCADE,
@@ -92,8 +199,19 @@ class Comment(Date):
         help_text='Введите комментарий'
     )
 
+    objects = CommentQuerySet.as_manager()
+
+    # Комментарии лежат на шарде своего поста
+    shard_key = 'post'
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -119,8 +237,176 @@ class Follow(Date):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='follow_user_author_idx'
+            ),
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
         verbose_name = 'Подписки'
         verbose_name_plural = 'Подписки'
 
     def __str__(self) -> str:
         return self.user.username
+
+
+class FeedEntry(models.Model):
+    """ Запись во входящей ленте подписчика (fan-out on write). """
+
+    # Подписчик, в ленту которого попал пост
+    user = models.ForeignKey(
+        User,
+        related_name='inbox',
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        'Post',
+        related_name='inbox',
+        on_delete=models.CASCADE,
+        verbose_name='Пост'
+    )
+    # Автор поста. Нужен, чтобы вычистить ленту при отписке
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        on_delete=models.CASCADE,
+        verbose_name='Автор'
+    )
+    # Копия Post.edited, по ней лента отсортирована
+    edited = models.DateTimeField(
+        verbose_name='Дата изменения поста'
+    )
+
+    class Meta:
+        ordering = ['-edited']
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(
+                fields=['user', '-edited', '-post'],
+                name='feedentry_user_edited_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feedentry_user_author_idx'
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self) -> str:
+        return f'{self.user} <- {self.post_id}'
+
+
+class PostTerm(models.Model):
+    """
+    Терм поста в инвертированном индексе поиска.
+
+    Используется, только если в базе нет SQLite FTS5.
+    """
+
+    post = models.ForeignKey(
+        'Post',
+        related_name='terms',
+        on_delete=models.CASCADE,
+        verbose_name='Пост'
+    )
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Терм'
+    )
+    # Сколько раз терм встречается в посте
+    frequency = models.PositiveIntegerField(
+        verbose_name='Частота'
+    )
+    # Число термов в посте, нужно для BM25
+    length = models.PositiveIntegerField(
+        verbose_name='Длина поста'
+    )
+
+    class Meta:
+        unique_together = ('term', 'post')
+        verbose_name = 'Терм поиска'
+        verbose_name_plural = 'Термы поиска'
+
+    def __str__(self) -> str:
+        return f'{self.term} -> {self.post_id}'
+
+
+class ImportCheckpoint(models.Model):
+    """ Сколько записей источника уже импортировано (import_content). """
+
+    source = models.CharField(
+        max_length=200,
+        unique=True,
+        verbose_name='Источник'
+    )
+    position = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Записей импортировано'
+    )
+    edited = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Точка импорта'
+        verbose_name_plural = 'Точки импорта'
+
+    def __str__(self) -> str:
+        return f'{self.source}: {self.position}'
+
+
+class ImportedPost(models.Model):
+    """ Пост, импортированный из другого источника, и его id там. """
+
+    source = models.CharField(
+        max_length=200,
+        verbose_name='Источник'
+    )
+    external_id = models.CharField(
+        max_length=100,
+        verbose_name='Id в источнике'
+    )
+    post = models.ForeignKey(
+        'Post',
+        related_name='imports',
+        on_delete=models.CASCADE,
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        unique_together = ('source', 'external_id')
+        verbose_name = 'Импортированный пост'
+        verbose_name_plural = 'Импортированные посты'
+
+    def __str__(self) -> str:
+        return f'{self.source}:{self.external_id} -> {self.post_id}'
+
+
+class MovedPost(models.Model):
+    """
+    Пост, который reshard перенес из default на шард с новым id.
+    Старые адреса поста перенаправляются на новые.
+    """
+
+    old_id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name='Старый id'
+    )
+    # Не внешний ключ: пост лежит на шарде, а запись в default
+    new_id = models.BigIntegerField(
+        verbose_name='Новый id'
+    )
+
+    class Meta:
+        verbose_name = 'Перенесенный пост'
+        verbose_name_plural = 'Перенесенные посты'
+
+    def __str__(self) -> str:
+        return f'{self.old_id} -> {self.new_id}'
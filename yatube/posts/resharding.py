@@ -0,0 +1,168 @@
+"""
+Перенос постов и комментариев по шардам (manage.py reshard).
+
+Пост должен лежать на шарде, куда SHARDS относит слот его автора.
+Команда обходит посты каждой исходной базы пачками по id и переносит
+лежащие не там вместе с комментариями: после добавления шарда в SHARDS
+или при первом включении шардов, когда все посты еще в default.
+
+Посты и комментарии из default получают id = старый id * SLOTS + слот:
+в старом id нет слота. Последовательности новых id начинаются выше
+старых (core.sharding.models.Sequence), так что id не совпадут. Пара
+старого и нового id сохраняется в MovedPost, и старые адреса постов
+перенаправляются на новые.
+
+Удаленные автором посты, которые еще ждут обработчика очереди
+(tasks.delete_post), не переносятся, а удаляются на месте: задача ищет
+пост на шарде по id и в старой базе его бы не нашла.
+
+Пачка сначала фиксируется на новом шарде, потом удаляется из старой
+базы. Новые id вычисляются, а не выдаются, поэтому прерванный перенос
+можно просто запустить снова: уже записанные строки пропускаются.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from core.caching.generations import bump
+from core.sharding import shards
+from core.sharding.models import start_sequence
+
+from .bulk import keep_dates
+from .models import Post, Comment, MovedPost
+
+
+def _renumber(posts, comments):
+    """ id из default: старый id становится тикетом. Новые id по старым. """
+    new_ids = {}
+
+    for post in posts:
+        slot = Post.slot_for_key(post.author_id)
+        new_ids[post.pk] = shards.make_id(post.pk, slot)
+        post.pk = new_ids[post.pk]
+
+    for comment in comments:
+        comment.post_id = new_ids[comment.post_id]
+        comment.pk = shards.make_id(
+            comment.pk, shards.slot_of(comment.post_id)
+        )
+
+    return new_ids
+
+
+def _move(source, target, posts):
+    """ Перенести посты с комментариями из source в target. """
+    old_ids = [post.pk for post in posts]
+    comments = list(
+        Comment.objects.using(source).filter(post_id__in=old_ids)
+    )
+
+    moved = []
+
+    if source not in settings.SHARDS:
+        moved = [
+            MovedPost(old_id=old_id, new_id=new_id)
+            for old_id, new_id in _renumber(posts, comments).items()
+        ]
+
+    with transaction.atomic(using=target), keep_dates(Post, Comment):
+        Post.objects.using(target).bulk_create(posts, ignore_conflicts=True)
+        Comment.objects.using(target).bulk_create(
+            comments, ignore_conflicts=True
+        )
+
+    # Без сигналов: записи переезжают, счетчики не меняются. Записи
+    # лент, термы поиска и связи с импортом в старой базе ссылаются
+    # на старые id и удаляются
+    with transaction.atomic(using=source):
+        # Перенумеровываются посты из default, там же и MovedPost
+        MovedPost.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            moved, ignore_conflicts=True
+        )
+
+        for relation in Post._meta.related_objects:
+            relation.related_model._base_manager.using(source).filter(
+                **{f'{relation.field.name}__in': old_ids}
+            )._raw_delete(source)
+
+        Post._base_manager.using(source).filter(
+            pk__in=old_ids
+        )._raw_delete(source)
+
+    return len(comments)
+
+
+def _drop_deleted(source, posts):
+    """ Удалить в source посты, скрытые до удаления. Вернет остальные. """
+    deleted = [post.pk for post in posts if post.deleted]
+
+    if deleted:
+        Post.all_objects.using(source).filter(pk__in=deleted).delete()
+
+    return [post for post in posts if not post.deleted]
+
+
+def _target(source, post):
+    """ Шард, куда переносится пост, или None, если он на месте. """
+    slot = Post.slot_for_key(post.author_id)
+    target = shards.alias_for_slot(slot)
+
+    if source in settings.SHARDS and target == source:
+        return None
+
+    return target
+
+
+def reshard(sources=None, batch_size=500, log=None):
+    """ Перенести посты, лежащие не на своем шарде. Итог по базам. """
+    log = log or (lambda message: None)
+
+    start_sequence(Post)
+    start_sequence(Comment)
+
+    sources = sources or [DEFAULT_DB_ALIAS, *settings.SHARDS]
+    moved = {}
+
+    for source in sources:
+        last_pk = 0
+
+        while True:
+            batch = list(
+                Post.all_objects.using(source).filter(
+                    pk__gt=last_pk
+                ).order_by('pk')[:batch_size]
+            )
+
+            if not batch:
+                break
+
+            last_pk = batch[-1].pk
+            targets = {}
+
+            for post in _drop_deleted(source, batch):
+                target = _target(source, post)
+
+                if target is not None:
+                    targets.setdefault(target, []).append(post)
+
+            for target, posts in targets.items():
+                comments = _move(source, target, posts)
+
+                total = moved.setdefault(
+                    (source, target), {'posts': 0, 'comments': 0}
+                )
+                total['posts'] += len(posts)
+                total['comments'] += comments
+
+                log(
+                    f'{source} -> {target}: постов {total["posts"]}, '
+                    f'комментариев {total["comments"]}'
+                )
+
+                bump(
+                    'posts',
+                    *{f'author:{post.author_id}' for post in posts},
+                    *{f'group:{post.group_id}' for post in posts
+                      if post.group_id}
+                )
+
+    return moved
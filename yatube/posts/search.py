@@ -0,0 +1,301 @@
+"""
+Полнотекстовый поиск по постам.
+
+На SQLite с FTS5 индекс - виртуальная таблица posts_post_fts с внешним
+содержимым: сам текст хранится только в posts_post, а триггеры в базе
+обновляют индекс при любой записи в таблицу постов, в том числе при
+bulk_create() и update(). Ранг считает функция bm25() FTS5.
+
+Если FTS5 нет (другая база или SQLite собран без него), используется
+собственный инвертированный индекс PostTerm. Его обновляют сигналы
+постов, а BM25 считается тем же запросом, что выбирает посты.
+
+Запрос разбивается на слова так же, как это делает токенизатор
+unicode61, и находит посты, где есть все слова. Меньший rank
+означает более подходящий пост.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import (
+    Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.expressions import RawSQL
+
+from core.caching.singleflight import get_or_compute
+from core.sharding import shards
+
+from . import counters
+from .models import Post, PostTerm
+
+FTS_TABLE = 'posts_post_fts'
+
+FTS_SCHEMA = (
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    f"text, content='posts_post', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')"
+)
+
+FTS_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert "
+    f"AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete "
+    f"AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+    f"AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    f"VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); "
+    f"END",
+)
+
+# Слово - буквы и цифры, как у токенизатора unicode61
+WORD = re.compile(r'[^\W_]+')
+
+# Длиннее PostTerm.term не хранится
+MAX_TERM_LENGTH = 64
+
+# Параметры BM25, как у bm25() в FTS5
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TERM_LENGTH] for word in WORD.findall(text.lower())
+    ]
+
+
+def _tables(using):
+    with using.cursor() as cursor:
+        return set(using.introspection.table_names(cursor))
+
+
+# Наличие индекса по базе, проверяется один раз
+_fts_available = {}
+
+
+def uses_fts(using=None):
+    """ Есть ли в базе индекс FTS5. """
+    using = using or connection
+
+    if using.vendor != 'sqlite':
+        return False
+
+    # Имя базы в ключе: у тестов своя база с тем же alias
+    key = (using.alias, using.settings_dict['NAME'])
+
+    if key not in _fts_available:
+        _fts_available[key] = FTS_TABLE in _tables(using)
+
+    return _fts_available[key]
+
+
+def install(using=None, create=True):
+    """
+    Создать индекс FTS5, если SQLite его поддерживает, и триггеры.
+
+    После каждой миграции триггеры ставятся заново (create=False):
+    SQLite меняет схему через пересоздание таблицы, и триггеры
+    posts_post теряются.
+    """
+    using = using or connection
+
+    if using.vendor != 'sqlite':
+        return False
+
+    tables = _tables(using)
+
+    if Post._meta.db_table not in tables:
+        # Миграции постов откатили
+        return False
+
+    created = FTS_TABLE not in tables
+
+    if created and not create:
+        return False
+
+    with using.cursor() as cursor:
+        if created:
+            try:
+                cursor.execute(FTS_SCHEMA)
+            except OperationalError:
+                # SQLite собран без FTS5
+                return False
+
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+
+        for trigger in FTS_TRIGGERS:
+            cursor.execute(trigger)
+
+    _fts_available.clear()
+
+    return True
+
+
+def index_post(post):
+    """ Обновить термы поста в инвертированном индексе. """
+    # Термы в default не могут ссылаться на пост с шарда
+    if uses_fts() or shards.enabled():
+        return
+
+    PostTerm.objects.filter(post=post).delete()
+    PostTerm.objects.bulk_create(_terms(post.pk, post.text))
+
+
+def _terms(post_id, text):
+    words = tokenize(text)
+    length = len(words)
+
+    return [
+        PostTerm(
+            post_id=post_id, term=term, frequency=frequency, length=length
+        )
+        for term, frequency in Counter(words).items()
+    ]
+
+
+def rebuild(batch_size=1000):
+    """ Построить индекс заново по всем постам. """
+    shards.require_unsharded('Поисковый индекс')
+
+    if uses_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+
+        return Post.objects.count()
+
+    PostTerm.objects.all().delete()
+
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    indexed = 0
+    last_pk = 0
+
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+
+        if not batch:
+            return indexed
+
+        terms = []
+
+        for post_id, text in batch:
+            terms.extend(_terms(post_id, text))
+
+        PostTerm.objects.bulk_create(terms)
+
+        indexed += len(batch)
+        last_pk = batch[-1][0]
+
+
+def _match(terms):
+    """ Запрос FTS5: все слова, каждое в кавычках как фраза. """
+    return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+def _fts_search(posts, terms):
+    return posts.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = posts_post.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[_match(terms)]
+    ).annotate(
+        rank=RawSQL(f'bm25({FTS_TABLE})', (), output_field=FloatField())
+    )
+
+
+def _average_length():
+    total = PostTerm.objects.aggregate(
+        words=Sum('frequency'), posts=Count('post', distinct=True)
+    )
+
+    return (total['words'] or 0) / (total['posts'] or 1)
+
+
+def _index_search(posts, terms):
+    postings = PostTerm.objects.filter(term__in=terms)
+
+    found = dict(
+        postings.order_by().values_list('term').annotate(Count('id'))
+    )
+
+    if len(found) < len(terms):
+        return posts.none()
+
+    total = counters.index_posts_count()
+    average = get_or_compute(
+        'search:average_length', _average_length,
+        settings.COUNT_ESTIMATE_TIMEOUT
+    ) or 1
+
+    # Со знаком минус, чтобы лучшие посты шли первыми, как у bm25()
+    weight = Case(
+        *[
+            When(
+                term=term,
+                then=Value(-math.log(1 + (total - df + 0.5) / (df + 0.5)))
+            )
+            for term, df in found.items()
+        ],
+        output_field=FloatField()
+    )
+
+    score = weight * F('frequency') * Value(K1 + 1) / (
+        F('frequency')
+        + Value(K1 * (1 - B))
+        + Value(K1 * B / average) * F('length')
+    )
+
+    matched = postings.order_by().values('post').annotate(
+        matched=Count('id')
+    ).filter(matched=len(terms)).values('post')
+
+    rank = postings.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(score=Sum(score, output_field=FloatField())).values('score')
+
+    return posts.filter(pk__in=matched).annotate(
+        rank=Subquery(rank, output_field=FloatField())
+    )
+
+
+def search_posts(query, group=None, author=None):
+    """
+    Посты, где есть все слова запроса, сначала самые подходящие.
+    Сортировка по (rank, pk) подходит для CursorPaginator.
+    """
+    shards.require_unsharded('Поиск')
+
+    terms = list(dict.fromkeys(tokenize(query)))
+
+    if not terms:
+        return Post.objects.none()
+
+    posts = Post.objects.feed()
+
+    if group is not None:
+        posts = posts.filter(group=group)
+
+    if author is not None:
+        posts = posts.filter(author=author)
+
+    if uses_fts():
+        posts = _fts_search(posts, terms)
+    else:
+        posts = _index_search(posts, terms)
+
+    return posts.order_by('rank', 'pk')
@@ -0,0 +1,304 @@
+"""
+Данные в масштабе продакшена для локальных замеров (seed_scale).
+
+Перекос как в жизни:
+- подписчики распределены по степенному закону (Zipf);
+- активность авторов распределена так же;
+- у нескольких горячих постов тысячи комментариев;
+- остальные комментарии чаще достаются свежим постам.
+
+Структуру данных задает random.Random(seed). Тексты пишет Faker
+в пуле процессов пачками, и у каждой пачки свое зерно. Поэтому при
+одном seed и пустой базе результат одинаковый при любом числе
+процессов, меняется только день, от которого отсчитаны даты.
+
+Записи идут через bulk_create пачками по транзакции. Ключи постов
+раздаются подряд, поэтому во время генерации в базу больше никто не
+должен писать.
+"""
+import bisect
+import io
+import itertools
+import multiprocessing
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from core.sharding import shards
+
+from .bulk import assign_pks, keep_dates, refresh
+from .models import Post, Group, Comment, Follow, User
+
+# Показатель степенного закона: чем больше, тем сильнее перекос
+ZIPF_EXPONENT = 1.1
+
+_faker = None
+
+
+def _texts(task):
+    """ Тексты одной пачки. Выполняется в процессе пула. """
+    global _faker
+
+    seed, kind, number, count = task
+
+    if _faker is None:
+        from faker import Faker
+
+        _faker = Faker('ru_RU')
+
+    _faker.seed_instance(f'{seed}:{kind}:{number}')
+
+    if kind == 'comment':
+        return [_faker.sentence(nb_words=12) for _ in range(count)]
+
+    return [_faker.text(max_nb_chars=400) for _ in range(count)]
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """ Накопленные веса рангов 1..count для random.choices. """
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+class Seeder:
+    def __init__(self, seed=1, prefix='seed', batch_size=5000,
+                 processes=None, days=365, log=None):
+        # bulk_create пишет в default, мимо шардов
+        shards.require_unsharded('Генерация данных')
+
+        self.seed = seed
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.processes = processes or multiprocessing.cpu_count()
+        self.days = days
+        self.log = log or (lambda message: None)
+
+        self.random = random.Random(seed)
+        # Даты отсчитываются от начала текущего дня
+        self.now = timezone.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+        # Диапазоны ключей постов: (первый ключ, номер первого поста)
+        self.post_ranges = []
+        self.posts_total = 0
+
+    def _texts(self, kind, total):
+        """ Тексты пачками по batch_size в исходном порядке. """
+        tasks = [
+            (self.seed, kind, number, min(self.batch_size, total - start))
+            for number, start in enumerate(
+                range(0, total, self.batch_size)
+            )
+        ]
+
+        if self.processes == 1:
+            yield from map(_texts, tasks)
+            return
+
+        # imap отдает пачки по порядку, пока следующие еще пишутся
+        with multiprocessing.Pool(self.processes) as pool:
+            yield from pool.imap(_texts, tasks)
+
+    def _insert(self, model, objects):
+        with transaction.atomic(), keep_dates(model):
+            model.objects.bulk_create(objects)
+
+    def users(self, count):
+        password = make_password('password')
+
+        for start in range(0, count, self.batch_size):
+            self._insert(User, [
+                User(
+                    username=f'{self.prefix}{number:07d}',
+                    password=password,
+                    date_joined=self.now
+                )
+                for number in range(start, min(start + self.batch_size,
+                                               count))
+            ])
+
+        self.user_ids = list(
+            User.objects.filter(
+                username__startswith=self.prefix
+            ).order_by('pk').values_list('pk', flat=True)[:count]
+        )
+
+        # Популярность и активность - разные перестановки пользователей
+        self.popular = self.user_ids[:]
+        self.random.shuffle(self.popular)
+        self.active = self.user_ids[:]
+        self.random.shuffle(self.active)
+        self.weights = zipf_weights(len(self.user_ids))
+
+        self.log(f'Пользователей: {len(self.user_ids)}')
+
+    def groups(self, count):
+        self._insert(Group, [
+            Group(
+                title=f'Группа {self.prefix} {number}',
+                slug=f'{self.prefix}-{number}',
+                description='Группа для замеров'
+            )
+            for number in range(count)
+        ])
+
+        self.group_ids = list(
+            Group.objects.filter(
+                slug__startswith=f'{self.prefix}-'
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+
+    def follows(self, average):
+        """ Число подписок у каждого - экспоненциальное, авторы - Zipf. """
+        total = 0
+        batch = []
+
+        for user_id in self.user_ids:
+            wanted = min(
+                int(self.random.expovariate(1 / average)),
+                len(self.user_ids) - 1
+            )
+            authors = set(self.random.choices(
+                self.popular, cum_weights=self.weights, k=wanted
+            ))
+            authors.discard(user_id)
+
+            batch.extend(
+                Follow(user_id=user_id, author_id=author_id,
+                       created=self.now, edited=self.now)
+                for author_id in sorted(authors)
+            )
+
+            if len(batch) >= self.batch_size:
+                self._insert(Follow, batch)
+                total += len(batch)
+                batch = []
+
+        self._insert(Follow, batch)
+        total += len(batch)
+
+        self.log(f'Подписок: {total}')
+
+    def _created(self, number, total):
+        """ Посты идут по времени равномерно за последние days дней. """
+        span = timedelta(days=self.days)
+
+        return self.now - span + span * (number + 1) / total
+
+    def _image(self, number):
+        picture = Image.new('RGB', (1110, 627), tuple(
+            self.random.randrange(256) for _ in range(3)
+        ))
+        buffer = io.BytesIO()
+        picture.save(buffer, 'JPEG', quality=80)
+
+        return default_storage.save(
+            f'posts/{self.prefix}-{number}.jpg',
+            ContentFile(buffer.getvalue())
+        )
+
+    def posts(self, count, images=0):
+        with_images = set(self.random.sample(range(count), images))
+        number = 0
+
+        for texts in self._texts('post', count):
+            authors = self.random.choices(
+                self.active, cum_weights=self.weights, k=len(texts)
+            )
+            posts = []
+
+            for text, author_id in zip(texts, authors):
+                created = self._created(number, count)
+
+                # Треть постов без группы
+                group_id = None
+                if self.group_ids and self.random.random() > 1 / 3:
+                    group_id = self.random.choice(self.group_ids)
+
+                posts.append(Post(
+                    text=text,
+                    author_id=author_id,
+                    group_id=group_id,
+                    image=self._image(number) if number in with_images
+                    else None,
+                    created=created,
+                    edited=created
+                ))
+                number += 1
+
+            with transaction.atomic(), keep_dates(Post):
+                assign_pks(Post, posts)
+                Post.objects.bulk_create(posts)
+
+            self.post_ranges.append((posts[0].pk, self.posts_total))
+            self.posts_total += len(posts)
+
+            self.log(f'Постов: {self.posts_total}')
+
+    def _post(self, number):
+        """ Ключ и дата поста по его номеру. """
+        index = bisect.bisect_right(self.post_starts, number) - 1
+        first_pk, start = self.post_ranges[index]
+
+        return first_pk + number - start, self._created(
+            number, self.posts_total
+        )
+
+    def comments(self, count, hot_posts=0, hot_comments=0):
+        """ Горячие посты, затем остальные комментарии к свежим постам. """
+        self.post_starts = [start for _, start in self.post_ranges]
+
+        hot = self.random.sample(range(self.posts_total), hot_posts)
+        targets = itertools.chain(
+            (number for number in hot for _ in range(hot_comments)),
+            # Квадрат случайного числа сдвигает выбор к свежим постам
+            (
+                self.posts_total - 1
+                - int(self.posts_total * self.random.random() ** 2)
+                for _ in range(count)
+            )
+        )
+
+        total = count + hot_posts * hot_comments
+        inserted = 0
+
+        for texts in self._texts('comment', total):
+            comments = []
+
+            for text, number in zip(texts, targets):
+                post_id, posted = self._post(number)
+                created = min(
+                    posted + timedelta(
+                        minutes=self.random.randrange(60 * 24 * 7)
+                    ),
+                    self.now
+                )
+
+                comments.append(Comment(
+                    post_id=post_id,
+                    author_id=self.random.choice(self.user_ids),
+                    text=text,
+                    created=created,
+                    edited=created
+                ))
+
+            self._insert(Comment, comments)
+
+            inserted += len(comments)
+            self.log(f'Комментариев: {inserted}')
+
+    def finish(self):
+        self.log('Обновляем счетчики, ленты и кэш')
+
+        refresh(
+            Post.objects.filter(author__username__startswith=self.prefix),
+            self.batch_size
+        )
@@ -0,0 +1,97 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import counters, fragments, inbox, search, tasks, thumbnails
+from .models import Post, Group, Comment, Follow, User
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    """ Запомнить группу и картинку поста до изменения. """
+    if instance._state.adding:
+        return
+
+    instance._saved_group_id, instance._saved_image = (
+        Post.objects.shard_for_pk(instance.pk).filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, None)
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """ Новый пост раскладываем по лентам, измененный переставляем. """
+    old_group_id = getattr(instance, '_saved_group_id', None)
+
+    if created:
+        counters.post_added(instance)
+        inbox.fan_out(instance)
+    else:
+        counters.post_moved(old_group_id, instance.group_id)
+        inbox.touch(instance)
+
+    old_image = getattr(instance, '_saved_image', None)
+
+    if instance.image and instance.image.name != old_image:
+        thumbnails.schedule(instance)
+
+    search.index_post(instance)
+    fragments.post_changed(instance, old_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    # Счетчики удаленного автором поста уже уменьшены (tasks.remove_post)
+    if not instance.deleted:
+        counters.post_removed(instance)
+    fragments.post_changed(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    fragments.group_changed(instance)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    """ Имя автора выводится в карточках постов. """
+    # Вход на сайт обновляет только last_login
+    if created or update_fields == frozenset({'last_login'}):
+        return
+
+    fragments.author_changed(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """ Подписка. Заполнить ленту постами автора. """
+    if created:
+        counters.follow_added(instance)
+        inbox.backfill(instance.user_id, instance.author_id)
+        fragments.follows_changed(instance)
+
+        if inbox.crossed_threshold(instance.author_id, followed=True):
+            tasks.celebrity_changed.enqueue(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """ Отписка. Вычистить ленту. """
+    counters.follow_removed(instance)
+    inbox.prune(instance.user_id, instance.author_id)
+    fragments.follows_changed(instance)
+
+    if inbox.crossed_threshold(instance.author_id, followed=False):
+        tasks.celebrity_changed.enqueue(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_removed(instance)
@@ -0,0 +1,44 @@
+"""
+Задачи очереди core.jobs для постов.
+"""
+from core.jobs.queue import task
+
+from .models import Post
+from . import counters, fragments, inbox
+
+
+def remove_post(post):
+    """
+    Убрать пост со всех страниц сразу, а медленное удаление строк
+    отдать обработчику очереди.
+    """
+    Post.all_objects.shard_for_pk(post.pk).filter(pk=post.pk).update(
+        deleted=True
+    )
+    post.deleted = True
+
+    counters.post_removed(post)
+    fragments.post_changed(post)
+
+    delete_post.enqueue(post.pk)
+
+
+@task(priority=10)
+def delete_post(post_id):
+    """
+    Удалить пост со всем, что на него ссылается: комментариями,
+    записями лент подписчиков и термами поиска.
+    """
+    post = Post.all_objects.shard_for_pk(post_id).filter(
+        pk=post_id
+    ).first()
+
+    if post is not None:
+        post.delete()
+
+
+@task
+def celebrity_changed(author_id):
+    """ Автор перешел FEED_CELEBRITY_THRESHOLD, пересобрать его ленты. """
+    inbox.celebrity_changed(author_id)
+    fragments.feeds_changed()
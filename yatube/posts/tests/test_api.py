@@ -0,0 +1,161 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.api import POSTS_ON_PAGE
+from posts.models import Post, Group, User, Comment, Follow
+
+
+class TestingJsonApi(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='category-cats',
+            description='Мир котиков уникальный',
+        )
+
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group if i % 2 else None
+            )
+            for i in range(POSTS_ON_PAGE + 3)
+        ]
+
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.user, text=f'Комментарий {i}'
+            )
+
+    def setUp(self):
+        cache.clear()
+
+        self.guest_client = Client()
+
+        self.authorized_client = Client()
+
+        self.authorized_client.force_login(TestingJsonApi.user)
+
+    def get_all(self, client, url):
+        """ Все страницы ленты по курсору next. """
+        items = []
+        params = {}
+
+        while True:
+            data = client.get(url, params).json()
+            items.extend(data['results'])
+
+            if data['next'] is None:
+                return items
+
+            params = {'after': data['next']}
+
+    def test_index_pages_by_cursor(self):
+        """ Лента целиком по курсорам, без повторов, новые первыми. """
+        url = reverse('posts:api_index')
+
+        first = self.guest_client.get(url).json()
+
+        self.assertEqual(len(first['results']), POSTS_ON_PAGE)
+        self.assertEqual(set(first['results'][0]), {
+            'id', 'text', 'author', 'group', 'image', 'comments', 'created'
+        })
+        self.assertEqual(
+            [item['id'] for item in self.get_all(self.guest_client, url)],
+            [post.pk for post in reversed(self.posts)]
+        )
+
+    def test_feeds_filtered(self):
+        """ Группа, профиль и подписки отдают свои посты. """
+        feeds = {
+            reverse('posts:api_group_posts', args=[self.group.slug]):
+                {post.pk for post in self.posts if post.group_id},
+            reverse('posts:api_profile', args=[self.author.username]):
+                {post.pk for post in self.posts},
+            reverse('posts:api_follow_index'):
+                {post.pk for post in self.posts},
+        }
+
+        for url, expected in feeds.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    {item['id'] for item in self.get_all(
+                        self.authorized_client, url
+                    )},
+                    expected
+                )
+
+    def test_post_and_comments(self):
+        post = self.posts[0]
+
+        data = self.guest_client.get(
+            reverse('posts:api_post_detail', args=[post.pk])
+        ).json()
+
+        self.assertEqual((data['id'], data['comments']), (post.pk, 3))
+        self.assertEqual(data['author'], 'author')
+
+        comments = self.guest_client.get(
+            reverse('posts:api_post_comments', args=[post.pk])
+        ).json()
+
+        self.assertEqual(
+            [item['text'] for item in comments['results']],
+            ['Комментарий 2', 'Комментарий 1', 'Комментарий 0']
+        )
+
+    def test_not_modified(self):
+        """ Повтор с тем же ETag получает 304. """
+        url = reverse('posts:api_index')
+
+        response = self.guest_client.get(url)
+
+        repeated = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+
+        self.assertEqual(repeated.status_code, 304)
+
+    def test_errors_are_json(self):
+        """ Ошибки тоже в JSON. """
+        cases = {
+            reverse('posts:api_group_posts', args=['nope']): 404,
+            reverse('posts:api_profile', args=['nope']): 404,
+            reverse('posts:api_post_detail', args=[0]): 404,
+            reverse('posts:api_follow_index'): 401,
+            reverse('posts:api_index') + '?after=сломан': 400,
+        }
+
+        for url, status in cases.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+
+                self.assertEqual(response.status_code, status)
+                self.assertIn('error', response.json())
+
+    def test_smaller_than_html(self):
+        """ Страница ленты в JSON в разы меньше HTML. """
+        api = self.guest_client.get(reverse('posts:api_index'))
+        html = self.guest_client.get(reverse('posts:index'))
+
+        self.assertLess(len(api.content) * 3, len(html.content))
+
+    def test_single_query(self):
+        """ Страница ленты - один запрос без связанных объектов. """
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('posts:api_index'))
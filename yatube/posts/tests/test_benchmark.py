@@ -0,0 +1,55 @@
+"""
+Замер страниц на небольшой заполненной базе против базовых итогов.
+
+Запускается только явно:
+    pytest -m benchmark yatube/posts/tests/test_benchmark.py
+Новые базовые итоги после осознанного изменения:
+    BENCHMARK_SAVE=1 pytest -m benchmark ...
+
+Сравниваются только число SQL-запросов и размер ответов: они не
+зависят от машины. Задержки выводятся в таблице, а проверяются
+командой benchmark_views --baseline против итогов, сохраненных на той
+же машине через --save.
+"""
+import os
+from datetime import datetime
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.benchmark import harness
+from posts.benchmarks import scenarios
+from posts.seeding import Seeder
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def test_pages_have_no_regressions():
+    cache.clear()
+
+    seeder = Seeder(seed=1, batch_size=500, processes=1)
+    # Даты в страницах, а с ними и размер ответов, не зависят от дня
+    seeder.now = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    seeder.users(300)
+    seeder.groups(5)
+    seeder.follows(10)
+    seeder.posts(3000)
+    seeder.comments(1000, hot_posts=3, hot_comments=300)
+    seeder.finish()
+
+    results = harness.run(scenarios(), repeat=20, warmup=3)
+
+    print('\n'.join(harness.table(results)))
+
+    if os.environ.get('BENCHMARK_SAVE'):
+        harness.save(BASELINE, results, fields=harness.DETERMINISTIC)
+
+    # Посты, которые пишут сами сценарии, датированы сегодняшним днем
+    regressions = harness.compare(
+        results, harness.load(BASELINE), tolerance=0.02
+    )
+
+    assert not regressions, '\n'.join(regressions)
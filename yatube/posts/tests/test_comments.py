@@ -0,0 +1,83 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, User, Comment
+from posts.views import AMOUNT_COMMENTS_ON_ONE_PAGE
+
+
+class TestingCommentsPagination(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.post = Post.objects.create(
+            text='Описание поста',
+            author=cls.user
+        )
+
+        for i in range(AMOUNT_COMMENTS_ON_ONE_PAGE + 5):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.user,
+                text=f'Комментарий {i}'
+            )
+
+        cls.url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+        cls.fragment_url = reverse(
+            'posts:post_comments', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+
+        self.authorized_client.force_login(TestingCommentsPagination.user)
+
+    def test_first_comments_inline(self):
+        """ На странице поста первая порция и ссылка на следующую. """
+        response = self.authorized_client.get(self.url)
+
+        comments = response.context['comments']
+
+        self.assertEqual(len(comments), AMOUNT_COMMENTS_ON_ONE_PAGE)
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'data-load-more')
+        self.assertEqual(comments[0].text, 'Комментарий 24')
+        self.assertEqual(comments[-1].text, 'Комментарий 5')
+
+    def test_fragment_continues_after_cursor(self):
+        """ Фрагмент отдает следующие комментарии без разметки страницы. """
+        first = self.authorized_client.get(self.url).context['comments']
+
+        response = self.authorized_client.get(
+            self.fragment_url, {'after': first.cursor.next}
+        )
+
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            [f'Комментарий {i}' for i in range(4, -1, -1)]
+        )
+        self.assertNotContains(response, 'data-load-more')
+
+    def test_broken_cursor_starts_over(self):
+        """ Испорченный курсор дает первую порцию. """
+        response = self.authorized_client.get(
+            self.fragment_url, {'after': 'сломан'}
+        )
+
+        self.assertContains(response, 'Комментарий 24')
+
+    def test_missing_post_not_found(self):
+        response = self.authorized_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+
+        self.assertEqual(response.status_code, 404)
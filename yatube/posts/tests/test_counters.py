@@ -0,0 +1,189 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginators.counted import CountedPaginator
+from posts import counters
+from posts.models import Post, Group, User, Comment, Follow
+from users.models import Profile
+
+
+class TestingCounters(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='category-cats',
+            description='Мир котиков уникальный',
+        )
+
+        cls.other_group = Group.objects.create(
+            title='Лидеры',
+            slug='category-leader',
+            description='Лидеры вперед',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCounts(self, author_count, group_count, other_group_count):
+        author = User.objects.select_related('profile').get(pk=self.user.pk)
+
+        self.assertEqual(counters.author_posts_count(author), author_count)
+
+        for group, count in (
+            (self.group, group_count),
+            (self.other_group, other_group_count)
+        ):
+            group.refresh_from_db()
+
+            with self.subTest(group=group):
+                self.assertEqual(counters.group_posts_count(group), count)
+
+    def test_counts_follow_create_move_and_delete(self):
+        """ Счетчики меняются при создании, переносе и удалении поста. """
+        post = Post.objects.create(
+            text='Описание поста',
+            author=self.user,
+            group=self.group
+        )
+
+        self.assertCounts(1, 1, 0)
+
+        post.group = self.other_group
+        post.save()
+
+        self.assertCounts(1, 0, 1)
+
+        post.delete()
+
+        self.assertCounts(0, 0, 0)
+
+    def test_counted_paginator_skips_count_query(self):
+        """ Пагинатор с известным количеством не делает COUNT(*). """
+        paginator = CountedPaginator(Post.objects.all(), 10, count=42)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.num_pages, 5)
+
+    def test_index_estimate_is_cached(self):
+        """ Оценка для главной страницы кэшируется. """
+        counters.index_posts_count()
+
+        with self.assertNumQueries(0):
+            counters.index_posts_count()
+
+
+class TestingDenormalizedCounters(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.post = Post.objects.create(
+            text='Описание поста',
+            author=cls.author
+        )
+
+    def profile(self, user):
+        return User.objects.select_related('profile').get(
+            pk=user.pk
+        ).profile
+
+    def test_follow_counters(self):
+        """ Подписка и отписка меняют счетчики обоих пользователей. """
+        follow = Follow.objects.create(user=self.user, author=self.author)
+
+        self.assertEqual(self.profile(self.author).followers_count, 1)
+        self.assertEqual(self.profile(self.user).following_count, 1)
+
+        follow.delete()
+
+        self.assertEqual(self.profile(self.author).followers_count, 0)
+        self.assertEqual(self.profile(self.user).following_count, 0)
+
+    def test_comment_counter_survives_post_save(self):
+        """ Сохранение поста не затирает счетчик комментариев. """
+        post = Post.objects.get(pk=self.post.pk)
+
+        comment = Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text='Комментарий'
+        )
+
+        post.text = 'Пост изменен'
+        post.save()
+
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+        comment.delete()
+
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """ Команда пересчета чинит разошедшиеся счетчики. """
+        Follow.objects.create(user=self.user, author=self.author)
+        Comment.objects.create(
+            post=self.post,
+            author=self.user,
+            text='Комментарий'
+        )
+
+        Profile.objects.update(
+            posts_count=7, followers_count=7, following_count=7
+        )
+        Post.objects.update(comments_count=7)
+
+        call_command('recount_counters', batch_size=1, stdout=StringIO())
+
+        author = self.profile(self.author)
+
+        self.assertEqual(
+            (author.posts_count, author.followers_count),
+            (1, 1)
+        )
+        self.assertEqual(self.profile(self.user).following_count, 1)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).comments_count, 1
+        )
+
+    def test_pages_render_counters_without_aggregates(self):
+        """ Профиль и пост выводят счетчики без COUNT(*). """
+        client = Client()
+
+        urls = (
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(url)
+
+                self.assertFalse(
+                    [q for q in queries if 'COUNT(' in q['sql']]
+                )
@@ -0,0 +1,128 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, Group, User, Comment, Follow
+
+
+class TestingConditionalGet(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='category-cats',
+            description='Мир котиков уникальный',
+        )
+
+        cls.post = Post.objects.create(
+            text='Описание поста',
+            author=cls.author,
+            group=cls.group
+        )
+
+        cls.urls = {
+            'group_posts': reverse(
+                'posts:group_posts',
+                kwargs={'slug': cls.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile',
+                kwargs={'username': cls.author.username}
+            ),
+            'post_detail': reverse(
+                'posts:post_detail',
+                kwargs={'post_id': cls.post.pk}
+            ),
+        }
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def revalidate(self, url):
+        """ Повторный запрос с ETag первого ответа. """
+        etag = self.client.get(url)['ETag']
+
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_not_modified(self):
+        """ Без изменений страница отдается как 304 без рендера. """
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                etag, response = self.revalidate(url)
+
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.content)
+                self.assertTrue(etag.startswith('W/'))
+
+    def test_post_detail_last_modified(self):
+        """ Last-Modified поста - время изменения поста. """
+        response = self.client.get(self.urls['post_detail'])
+
+        response = self.client.get(
+            self.urls['post_detail'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """ Изменения, которые видны на странице, меняют ETag. """
+        changes = {
+            'post_detail': lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            ),
+            'group_posts': lambda: Post.objects.create(
+                text='Новый пост', author=self.user, group=self.group
+            ),
+            'profile': lambda: Follow.objects.create(
+                user=self.user, author=self.author
+            ),
+        }
+
+        for name, change in changes.items():
+            url = self.urls[name]
+
+            with self.subTest(page=name):
+                etag = self.client.get(url)['ETag']
+
+                change()
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_user(self):
+        """ Другой пользователь получает свою страницу. """
+        url = self.urls['post_detail']
+
+        etag = self.client.get(url)['ETag']
+
+        response = Client().get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_object_not_found(self):
+        """ Для несуществующих объектов остается 404. """
+        urls = (
+            reverse('posts:group_posts', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+            reverse('posts:post_detail', kwargs={'post_id': 0}),
+        )
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,143 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, Group, Comment, Follow, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class TestingExportContent(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='cats',
+            description='Мир котиков уникальный',
+        )
+
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+            for number in range(3)
+        ]
+
+        cls.other = Post.objects.create(text='Чужой пост', author=cls.user)
+
+        Post.objects.filter(pk=cls.other.pk).update(
+            created='2015-05-01T10:00:00Z'
+        )
+
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Ого'
+        )
+
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def export(self, *args):
+        path = os.path.join(TEMP_DIR, 'export.jsonl.gz')
+
+        call_command('export_content', path, *args, stdout=StringIO())
+
+        with gzip.open(path, 'rt', encoding='utf-8') as export:
+            return path, [json.loads(line) for line in export]
+
+    def test_all_content_exported(self):
+        """ Все таблицы выгружаются пачками, по записи на строку. """
+        _, records = self.export('--batch-size', '2')
+
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['group'] + ['post'] * 4 + ['comment', 'follow']
+        )
+        self.assertEqual(records[1]['author'], 'author')
+        self.assertEqual(records[1]['group'], 'cats')
+        self.assertEqual(records[5]['post'], self.posts[0].pk)
+
+    def test_filters(self):
+        """ Фильтры по автору и датам создания. """
+        _, records = self.export('--author', 'leo', '--type', 'post')
+
+        self.assertEqual([record['text'] for record in records],
+                         ['Чужой пост'])
+
+        _, records = self.export(
+            '--since', '2015-01-01', '--until', '2015-05-01',
+            '--type', 'post'
+        )
+
+        self.assertEqual([record['id'] for record in records],
+                         [self.other.pk])
+
+    def test_export_imports_back(self):
+        """ Выгрузку читает import_content. """
+        path, _ = self.export()
+
+        Post.objects.all().delete()
+
+        call_command(
+            'import_content', path, stdout=StringIO(), stderr=StringIO()
+        )
+
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(
+            Comment.objects.get().post.text, self.posts[0].text
+        )
+
+    def test_endpoint_streams_for_staff_only(self):
+        """ Выгрузка через сайт - только для персонала. """
+        url = reverse('posts:export_content')
+
+        client = Client()
+        client.force_login(self.user)
+
+        self.assertEqual(client.get(url).status_code, 302)
+
+        staff = User.objects.create(username='staff', is_staff=True)
+        client.force_login(staff)
+
+        response = client.get(url, {'type': 'follow'})
+
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        lines = gzip.decompress(
+            b''.join(response.streaming_content)
+        ).decode().splitlines()
+
+        follow = json.loads(lines[0])
+
+        self.assertEqual(
+            (follow['type'], follow['user'], follow['author']),
+            ('follow', 'leo', 'author')
+        )
+
+        response = client.get(url, {'since': 'вчера'})
+
+        self.assertEqual(response.status_code, 400)
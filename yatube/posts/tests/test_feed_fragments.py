@@ -0,0 +1,207 @@
+import os
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import (
+    TestCase, TransactionTestCase, Client, override_settings
+)
+from django.urls import reverse
+
+from core.paginators.cursor import next_cursor
+from posts.models import Post, Group, User, Follow
+from posts.views import AMOUNT_POSTS_ON_ONE_PAGE, NEXT_CURSOR_HEADER
+
+
+class TestingFeedFragments(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='category-cats',
+            description='Мир котиков уникальный',
+        )
+
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group
+            )
+            for i in range(AMOUNT_POSTS_ON_ONE_PAGE + 5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+        self.guest_client = Client()
+
+        self.authorized_client = Client()
+
+        self.authorized_client.force_login(TestingFeedFragments.user)
+
+    def walk(self, client, page_url, fragment_url):
+        """ Первая страница, затем фрагменты по X-Next-Cursor. """
+        response = client.get(page_url)
+        posts = list(response.context['page_obj'])
+        cursor = next_cursor(response.context['page_obj'])
+
+        while cursor:
+            response = client.get(fragment_url, {'after': cursor})
+
+            self.assertTemplateUsed(response, 'includes/feed_items.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+
+            posts.extend(response.context['page_obj'])
+            cursor = response.get(NEXT_CURSOR_HEADER)
+
+        return [post.pk for post in posts]
+
+    def test_fragments_continue_every_feed(self):
+        """ Фрагменты дописывают ленту до конца без повторов. """
+        feeds = {
+            reverse('posts:index'): reverse('posts:index_fragment'),
+            reverse('posts:group_posts', args=[self.group.slug]): reverse(
+                'posts:group_posts_fragment', args=[self.group.slug]
+            ),
+            reverse('posts:profile', args=[self.author.username]): reverse(
+                'posts:profile_fragment', args=[self.author.username]
+            ),
+            reverse('posts:follow_index'): reverse(
+                'posts:follow_index_fragment'
+            ),
+            reverse('posts:follow_author', args=[self.author.username]):
+                reverse('posts:follow_author_fragment',
+                        args=[self.author.username]),
+        }
+
+        expected = [post.pk for post in reversed(self.posts)]
+
+        for page_url, fragment_url in feeds.items():
+            with self.subTest(feed=page_url):
+                cache.clear()
+
+                self.assertEqual(
+                    self.walk(self.authorized_client, page_url,
+                              fragment_url),
+                    expected
+                )
+
+    def test_page_points_to_fragment(self):
+        """ Список на странице знает адрес фрагмента и курсор. """
+        response = self.guest_client.get(reverse('posts:index'))
+
+        self.assertContains(
+            response, f'data-feed="{reverse("posts:index_fragment")}"'
+        )
+        self.assertContains(
+            response,
+            f'data-next="{next_cursor(response.context["page_obj"])}"'
+        )
+
+    def test_fragment_cached(self):
+        """ Повторный фрагмент берется из кэша без запросов к базе. """
+        url = reverse('posts:index_fragment')
+        first = self.guest_client.get(url)
+
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(
+            second[NEXT_CURSOR_HEADER], first[NEXT_CURSOR_HEADER]
+        )
+
+    def test_last_fragment_without_cursor(self):
+        response = self.guest_client.get(reverse('posts:index_fragment'))
+
+        last = self.guest_client.get(
+            reverse('posts:index_fragment'),
+            {'after': response[NEXT_CURSOR_HEADER]}
+        )
+
+        self.assertEqual(
+            len(last.context['page_obj']), 5
+        )
+        self.assertFalse(last.has_header(NEXT_CURSOR_HEADER))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class TestingFragmentsWithLaggingReplica(TransactionTestCase):
+    # Без общей транзакции теста, иначе чтение всегда идет в default
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+
+        self.author = User.objects.create(username='author')
+        self.old_post = Post.objects.create(
+            text='Старый пост', author=self.author
+        )
+
+        self.client = Client()
+
+        self.lag_replica()
+
+    def lag_replica(self):
+        """ Реплика - снимок default, дальше она не обновляется. """
+        directory = tempfile.mkdtemp(prefix='yatube-replica-')
+        path = os.path.join(directory, 'replica.sqlite3')
+
+        primary = connections['default']
+        primary.ensure_connection()
+
+        snapshot = sqlite3.connect(path)
+
+        try:
+            primary.connection.backup(snapshot)
+        finally:
+            snapshot.close()
+
+        replica = connections['replica']
+        settings_dict = replica.settings_dict
+
+        replica.close()
+        replica.settings_dict = {**settings_dict, 'NAME': path}
+
+        def restore():
+            replica.close()
+            replica.settings_dict = settings_dict
+
+            os.remove(path)
+            os.rmdir(directory)
+
+        self.addCleanup(restore)
+
+    def test_fragments_not_cached_from_lagging_replica(self):
+        """
+        Фрагменты под новым поколением собираются из основной базы, даже
+        если реплика еще не получила новый пост.
+        """
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertFalse(
+            Post.objects.using('replica').filter(pk=new_post.pk).exists()
+        )
+
+        # Страница под ETag и страница с фрагментом в кэше шаблона
+        for url in (reverse('posts:index_fragment'), reverse('posts:index')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+
+                self.assertContains(response, new_post.text)
+                self.assertContains(self.client.get(url), new_post.text)
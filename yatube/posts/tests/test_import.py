@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.jobs.models import Job
+from posts import importing, search, tasks
+from posts.models import Post, Group, Comment, Follow, User, ImportedPost
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestingImportContent(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='cats',
+            description='Мир котиков уникальный',
+        )
+
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def write(self, name, lines):
+        path = os.path.join(TEMP_MEDIA_ROOT, name)
+
+        with open(path, 'w', encoding='utf-8') as source:
+            source.write('\n'.join(lines) + '\n')
+
+        return path
+
+    def write_jsonl(self, records):
+        return self.write(
+            'content.jsonl', [json.dumps(record) for record in records]
+        )
+
+    def import_content(self, path, *args):
+        stderr = StringIO()
+
+        call_command(
+            'import_content', path, *args, stdout=StringIO(), stderr=stderr
+        )
+
+        return stderr.getvalue()
+
+    def test_posts_and_comments_imported(self):
+        """ Посты и комментарии пишутся с датами источника. """
+        path = self.write_jsonl([
+            {'type': 'post', 'id': 1, 'author': 'author', 'group': 'cats',
+             'text': 'Жирафы', 'created': '2015-05-01T10:00:00'},
+            {'type': 'comment', 'post': 1, 'author': 'leo',
+             'text': 'Ого'},
+            {'type': 'post', 'id': 2, 'author': 'nobody', 'text': 'Мимо'},
+            {'type': 'comment', 'post': 3, 'author': 'leo', 'text': 'Нет'},
+        ])
+
+        errors = self.import_content(path, '--batch-size', '2')
+
+        self.assertIn('Нет автора nobody', errors)
+        self.assertIn('Нет поста 3', errors)
+
+        post = Post.objects.get(imports__external_id='1')
+
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.created.year, 2015)
+        self.assertEqual(post.edited, post.created)
+        self.assertEqual(post.comments.get().text, 'Ого')
+
+    def test_counters_feeds_and_search_updated(self):
+        """ То, что делают сигналы, делается один раз в конце. """
+        path = self.write_jsonl([
+            {'type': 'post', 'id': 1, 'author': 'author', 'group': 'cats',
+             'text': 'Жирафы'},
+            {'type': 'comment', 'post': 1, 'author': 'leo', 'text': 'Ого'},
+        ])
+
+        self.import_content(path)
+
+        post = Post.objects.get()
+
+        self.author.profile.refresh_from_db()
+        self.group.refresh_from_db()
+
+        self.assertEqual(self.author.profile.posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(self.user.inbox.filter(post=post).exists())
+        self.assertEqual(list(search.search_posts('жирафы')), [post])
+
+    def test_ids_after_hidden_post(self):
+        """ Скрытый, но еще не удаленный пост не отдает свой id. """
+        hidden = Post.objects.create(author=self.author, text='Скрыт')
+        tasks.remove_post(hidden)
+
+        path = self.write_jsonl([
+            {'type': 'post', 'id': 1, 'author': 'author', 'text': 'Новый'},
+        ])
+
+        self.import_content(path)
+
+        self.assertGreater(Post.objects.get().pk, hidden.pk)
+
+    def test_interrupted_import_resumed(self):
+        """ После сбоя импорт продолжается без дублей. """
+        path = self.write_jsonl([
+            {'type': 'post', 'id': number, 'author': 'author',
+             'text': f'Пост {number}'}
+            for number in range(5)
+        ] + [{'type': 'comment', 'post': 0, 'author': 'leo', 'text': 'Ого'}])
+
+        write = importing.Importer._write
+        calls = []
+
+        def fail_on_second_batch(importer, batch):
+            calls.append(batch)
+
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+
+            write(importer, batch)
+
+        with mock.patch.object(
+            importing.Importer, '_write', fail_on_second_batch
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self.import_content(path, '--batch-size', '2')
+
+        self.assertEqual(Post.objects.count(), 2)
+
+        self.import_content(path, '--batch-size', '2')
+
+        self.assertEqual(Post.objects.count(), 5)
+        self.assertEqual(ImportedPost.objects.count(), 5)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_restart_after_finished_import(self):
+        """ --restart импортирует источник заново без дублей. """
+        path = self.write_jsonl([
+            {'type': 'post', 'id': 1, 'author': 'author', 'text': 'Жирафы'},
+            {'type': 'comment', 'post': 1, 'author': 'leo', 'text': 'Ого'},
+        ])
+
+        self.import_content(path)
+        self.import_content(path, '--restart')
+
+        post = Post.objects.get()
+
+        self.author.profile.refresh_from_db()
+
+        self.assertEqual(ImportedPost.objects.get().post, post)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertEqual(self.author.profile.posts_count, 1)
+        self.assertEqual(
+            list(self.user.inbox.values_list('post', flat=True)), [post.pk]
+        )
+
+    def test_imported_follows_backfilled(self):
+        """ Лента новой подписки получает уже написанные посты. """
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        path = self.write_jsonl([
+            {'type': 'follow', 'user': 'reader', 'author': 'author'},
+        ])
+
+        with mock.patch.object(
+            importing.Importer, 'finish', side_effect=KeyboardInterrupt
+        ):
+            with self.assertRaises(KeyboardInterrupt):
+                self.import_content(path, '--create-missing')
+
+        reader = User.objects.get(username='reader')
+
+        self.assertFalse(reader.inbox.exists())
+
+        # Подписка уже записана, но лента дополняется при продолжении
+        self.import_content(path)
+
+        self.assertEqual(
+            list(reader.inbox.values_list('post', flat=True)), [post.pk]
+        )
+
+    def test_csv_with_new_authors_and_images(self):
+        """ CSV, новые авторы и группы, картинки ставят миниатюры. """
+        image = os.path.join(TEMP_MEDIA_ROOT, 'photo.gif')
+
+        with open(image, 'wb') as picture:
+            picture.write(b'GIF89a')
+
+        path = self.write('content.csv', [
+            'type,id,author,group,text,image',
+            'post,1,newbie,dogs,Собаки,photo.gif',
+        ])
+
+        self.import_content(
+            path, '--create-missing', '--media-dir', TEMP_MEDIA_ROOT
+        )
+
+        post = Post.objects.get()
+
+        self.assertEqual(post.author.username, 'newbie')
+        self.assertEqual(post.group.slug, 'dogs')
+        self.assertTrue(post.image.name.startswith('posts/photo'))
+        self.assertEqual(post.author.profile.posts_count, 1)
+        self.assertEqual(
+            Job.objects.get().task, 'posts.thumbnails.generate'
+        )
@@ -0,0 +1,167 @@
+from django.test import TestCase, override_settings
+
+from core.jobs import queue
+from core.paginators.merged import MergedCursorPaginator
+from posts.inbox import follow_feed
+from posts.models import Post, User, Follow, FeedEntry
+
+
+class TestingInbox(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        # Подписчик
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        # Автор, на которого подписан пользователь
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        # Автор, на которого никто не подписан
+        cls.stranger = User.objects.create(
+            username='stranger'
+        )
+
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.author
+        )
+
+        Follow.objects.create(
+            user=cls.user,
+            author=cls.author
+        )
+
+    def test_backfill_on_follow(self):
+        """ При подписке в ленту попадают уже написанные посты. """
+        self.assertIn(self.old_post, follow_feed(self.user))
+
+    def test_fan_out_on_create(self):
+        """ Новый пост раскладывается только подписчикам автора. """
+        new_post = Post.objects.create(
+            text='Новый пост',
+            author=self.author
+        )
+
+        stranger_post = Post.objects.create(
+            text='Пост без подписчиков',
+            author=self.stranger
+        )
+
+        feed = list(follow_feed(self.user))
+
+        self.assertEqual(feed[0], new_post)
+        self.assertNotIn(stranger_post, feed)
+
+    def test_edited_post_moves_to_top(self):
+        """ Измененный пост поднимается в ленте. """
+        Post.objects.create(
+            text='Новый пост',
+            author=self.author
+        )
+
+        self.old_post.text = 'Пост изменен'
+        self.old_post.save()
+
+        self.assertEqual(follow_feed(self.user)[0], self.old_post)
+
+    def test_prune_on_unfollow(self):
+        """ При отписке посты автора пропадают из ленты. """
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.user).exists()
+        )
+        self.assertFalse(follow_feed(self.user).exists())
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=1)
+    def test_celebrity_merge_on_read(self):
+        """ Посты популярного автора подмешиваются при чтении. """
+        celebrity_post = Post.objects.create(
+            text='Пост популярного автора',
+            author=self.author
+        )
+
+        self.assertFalse(
+            FeedEntry.objects.filter(post=celebrity_post).exists()
+        )
+
+        feed = list(follow_feed(self.user))
+
+        self.assertEqual(feed, [celebrity_post, self.old_post])
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=2)
+    def test_celebrity_threshold_crossed(self):
+        """ Переход порога в обе стороны пересобирает ленты автора. """
+        fan = User.objects.create(username='fan')
+
+        Follow.objects.create(user=fan, author=self.author)
+        queue.work(burst=True)
+
+        # Стал популярным: записи удалены, посты подмешиваются
+        self.assertFalse(FeedEntry.objects.filter(author=self.author).exists())
+        self.assertEqual(list(follow_feed(self.user)), [self.old_post])
+
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+
+        Follow.objects.filter(user=fan).delete()
+        queue.work(burst=True)
+
+        # Снова обычный: посты разложены по ленте оставшегося подписчика
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=self.user).values_list(
+                'post', flat=True
+            )),
+            {self.old_post.pk, new_post.pk}
+        )
+        self.assertEqual(
+            list(follow_feed(self.user)), [new_post, self.old_post]
+        )
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=2)
+    def test_merged_feed_pages(self):
+        """
+        Страницы ленты с популярным автором сливаются из частей в том же
+        порядке, что и вся лента, без повторов и пропусков.
+        """
+        celebrity = User.objects.create(username='celebrity')
+        fan = User.objects.create(username='fan')
+
+        Follow.objects.create(user=self.user, author=celebrity)
+        Follow.objects.create(user=fan, author=celebrity)
+
+        for number in range(3):
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            Post.objects.create(
+                text=f'Пост популярного {number}', author=celebrity
+            )
+
+        # Записи ставшего популярным автора еще ждут удаления
+        stale = Post.objects.filter(author=celebrity).first()
+        FeedEntry.objects.create(
+            user=self.user, post=stale, author=celebrity, edited=stale.edited
+        )
+
+        feed = follow_feed(self.user)
+        paginator = MergedCursorPaginator(feed, 3)
+
+        self.assertEqual(len(feed.parts), 2)
+
+        pages = [paginator.get_page()]
+
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(after=pages[-1].cursor.next))
+
+        self.assertEqual(
+            [post for page in pages for post in page], list(feed)
+        )
+        self.assertEqual(len(list(feed)), 7)
+
+        previous = paginator.get_page(before=pages[-1].cursor.previous)
+
+        self.assertEqual(list(previous), list(pages[-2]))
@@ -0,0 +1,149 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.paginators.cursor import CursorPaginator
+from core.paginators.merged import MergedCursorPaginator
+from posts.inbox import celebrity_authors, follow_feed
+from posts.models import Post, Group, User, Comment, Follow
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class TestingQueryPlans(TestCase):
+    """
+    Запросы лент идут по индексам.
+
+    Если для запроса нет подходящего индекса, SQLite сортирует
+    выборку целиком во временном B-дереве: в плане появляется
+    USE TEMP B-TREE FOR ORDER BY.
+    """
+
+    AMOUNT_POSTS_ON_ONE_PAGE = 10
+
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='category-cats',
+            description='Мир котиков уникальный',
+        )
+
+        Follow.objects.create(
+            user=cls.user,
+            author=cls.author
+        )
+
+        cls.post = Post.objects.create(
+            text='Описание поста',
+            author=cls.author,
+            group=cls.group
+        )
+
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Комментарий'
+        )
+
+    def feeds(self):
+        """ Запросы страниц так же, как их строят представления. """
+        return {
+            'index': Post.objects.feed(),
+            'group_posts': self.group.posts.feed(),
+            'profile': self.author.posts.feed(),
+            'follow_index': follow_feed(self.user),
+            'follow_author': follow_feed(self.user, self.author),
+            'post_detail': self.post.comments.listing(),
+        }
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+
+        self.assertNotIn('TEMP B-TREE', plan, plan)
+
+        # Полный проход по таблице без индекса
+        for step in plan.splitlines():
+            if 'SCAN' in step:
+                self.assertIn('USING', step, plan)
+
+    def test_feed_pages_use_indexes(self):
+        """ Первая страница и страница по курсору идут по индексу. """
+        for name, queryset in self.feeds().items():
+            paginator = CursorPaginator(
+                queryset, self.AMOUNT_POSTS_ON_ONE_PAGE
+            )
+
+            cursor = paginator.cursor_for(paginator.object_list[0])
+
+            pages = {
+                'first': paginator.seek(),
+                'after': paginator.seek(after=cursor),
+                'before': paginator.seek(before=cursor),
+            }
+
+            for page, seek in pages.items():
+                with self.subTest(view=name, page=page):
+                    self.assertUsesIndex(
+                        seek[:self.AMOUNT_POSTS_ON_ONE_PAGE + 1]
+                    )
+
+    @override_settings(FEED_CELEBRITY_THRESHOLD=1)
+    def test_merged_follow_feed_uses_indexes(self):
+        """
+        Лента с популярным автором читается частями, каждая по своему
+        индексу, без сортировки всей выборки.
+        """
+        self.assertIn('USING', celebrity_authors(self.user).explain())
+
+        feeds = {
+            'follow_index': follow_feed(self.user),
+            'follow_author': follow_feed(self.user, self.author),
+        }
+
+        self.assertTrue(feeds['follow_index'].parts)
+
+        for name, queryset in feeds.items():
+            paginator = MergedCursorPaginator(
+                queryset, self.AMOUNT_POSTS_ON_ONE_PAGE
+            )
+
+            cursor = paginator.cursor_for(paginator.object_list[0])
+
+            pages = {
+                'first': paginator.seek(),
+                'after': paginator.seek(after=cursor),
+                'before': paginator.seek(before=cursor),
+            }
+
+            for page, seek in pages.items():
+                for part in seek.parts or [seek]:
+                    with self.subTest(view=name, page=page):
+                        self.assertUsesIndex(
+                            part[:self.AMOUNT_POSTS_ON_ONE_PAGE + 1]
+                        )
+
+    def test_follow_lookups_use_indexes(self):
+        """ Подписки ищутся по индексу в обе стороны. """
+        lookups = {
+            'authors': User.objects.filter(following__user=self.user),
+            'followers': Follow.objects.filter(author=self.author),
+            'following': Follow.objects.filter(
+                user=self.user, author=self.author
+            ),
+        }
+
+        for name, queryset in lookups.items():
+            with self.subTest(lookup=name):
+                self.assertIn('USING', queryset.explain())
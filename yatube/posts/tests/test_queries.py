@@ -0,0 +1,143 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, Group, User, Comment, Follow
+
+
+class TestingQueryBudget(TestCase):
+    """
+    Бюджет SQL-запросов на страницу.
+
+    Количество запросов не должно зависеть от числа постов на
+    странице и комментариев под постом: связанные объекты, которые
+    выводят шаблоны, загружаются вместе с основным запросом.
+    """
+
+    # Сессия и пользователь авторизованного клиента входят в бюджет.
+    # Группа, профиль и пост тратят еще один запрос на ETag
+    BUDGETS = {
+        'index': 3,
+        'group_posts': 5,
+        'profile': 6,
+        'post_detail': 5,
+        'post_comments': 5,
+        'follow_index': 5,
+        'follow_author': 6,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.author = User.objects.create(
+            username='author',
+            first_name='Лев',
+            last_name='Толстой'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='category-cats',
+            description='Мир котиков уникальный',
+        )
+
+        Follow.objects.create(
+            user=cls.user,
+            author=cls.author
+        )
+
+        cls.post = cls.create_posts(1)[0]
+
+        cls.urls = {
+            'index': reverse('posts:index'),
+            'group_posts': reverse(
+                'posts:group_posts',
+                kwargs={'slug': cls.group.slug}
+            ),
+            'profile': reverse(
+                'posts:profile',
+                kwargs={'username': cls.author.username}
+            ),
+            'post_detail': reverse(
+                'posts:post_detail',
+                kwargs={'post_id': cls.post.pk}
+            ),
+            'post_comments': reverse(
+                'posts:post_comments',
+                kwargs={'post_id': cls.post.pk}
+            ),
+            'follow_index': reverse('posts:follow_index'),
+            'follow_author': reverse(
+                'posts:follow_author',
+                kwargs={'username': cls.author.username}
+            ),
+        }
+
+    @classmethod
+    def create_posts(cls, amount):
+        return [
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=cls.group
+            )
+            for i in range(amount)
+        ]
+
+    @classmethod
+    def create_comments(cls, amount):
+        Comment.objects.bulk_create(
+            Comment(
+                post=cls.post,
+                author=cls.user if i % 2 else cls.author,
+                text=f'Комментарий {i}'
+            )
+            for i in range(amount)
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+
+        self.authorized_client.force_login(TestingQueryBudget.user)
+
+    def count_queries(self, url):
+        cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+
+        return len(queries)
+
+    def test_pages_fit_query_budget(self):
+        """ Страницы укладываются в бюджет запросов. """
+        self.create_posts(15)
+        self.create_comments(500)
+
+        for name, budget in self.BUDGETS.items():
+            with self.subTest(page=name):
+                self.assertLessEqual(
+                    self.count_queries(self.urls[name]),
+                    budget
+                )
+
+    def test_queries_do_not_grow_with_data(self):
+        """ Число запросов не растет вместе с постами и комментариями. """
+        before = {
+            name: self.count_queries(url)
+            for name, url in self.urls.items()
+        }
+
+        self.create_posts(15)
+        self.create_comments(500)
+
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                self.assertEqual(self.count_queries(url), before[name])
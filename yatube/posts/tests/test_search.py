@@ -0,0 +1,154 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, Group, User, PostTerm
+
+
+class TestingSearch(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.group = Group.objects.create(
+            title='Котики',
+            slug='category-cats',
+            description='Мир котиков уникальный',
+        )
+
+        cls.often = Post.objects.create(
+            text='Котики, котики и еще раз котики',
+            author=cls.author,
+            group=cls.group
+        )
+
+        cls.once = Post.objects.create(
+            text='Про котики, собаки, хомяки, попугаи и рыбки в аквариуме',
+            author=cls.user
+        )
+
+        cls.other = Post.objects.create(
+            text='Собаки',
+            author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def found(self, query, **filters):
+        return list(search.search_posts(query, **filters))
+
+    def test_ranked_by_relevance(self):
+        """ Пост, где слово встречается чаще, выше. """
+        self.assertEqual(self.found('Котики'), [self.often, self.once])
+
+    def test_all_words_required(self):
+        """ Найдены посты со всеми словами запроса. """
+        self.assertEqual(self.found('котики собаки'), [self.once])
+        self.assertEqual(self.found('котики жирафы'), [])
+        self.assertEqual(self.found('!!!'), [])
+
+    def test_filters(self):
+        """ Поиск внутри группы и по автору. """
+        self.assertEqual(
+            self.found('котики', group=self.group), [self.often]
+        )
+        self.assertEqual(
+            self.found('котики', author=self.user), [self.once]
+        )
+
+    def test_index_follows_changes(self):
+        """ Индекс обновляется при создании, правке и удалении. """
+        post = Post.objects.create(text='Жирафы', author=self.user)
+
+        self.assertEqual(self.found('жирафы'), [post])
+
+        post.text = 'Слоны'
+        post.save()
+
+        self.assertEqual(self.found('жирафы'), [])
+        self.assertEqual(self.found('слоны'), [post])
+
+        post.delete()
+
+        self.assertEqual(self.found('слоны'), [])
+
+    def test_fallback_index(self):
+        """ Без FTS5 те же результаты дает индекс PostTerm. """
+        with mock.patch.object(search, 'uses_fts', return_value=False):
+            call_command('rebuild_search_index', stdout=StringIO())
+
+            self.assertEqual(self.found('Котики'), [self.often, self.once])
+            self.assertEqual(self.found('котики собаки'), [self.once])
+
+            post = Post.objects.create(text='Жирафы', author=self.user)
+
+            self.assertEqual(self.found('жирафы'), [post])
+
+            post.delete()
+
+            self.assertFalse(PostTerm.objects.filter(term='жирафы'))
+
+    def test_search_page_cursor_pagination(self):
+        """ Результаты листаются по курсору, запрос сохраняется. """
+        Post.objects.bulk_create(
+            Post(text=f'Слоны номер {number}', author=self.user)
+            for number in range(12)
+        )
+
+        client = Client()
+        url = reverse('posts:search')
+
+        response = client.get(url, {'q': 'слоны'})
+
+        page_obj = response.context['page_obj']
+
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, '?q=%D1%81%D0%BB%D0%BE%D0%BD%D1%8B&')
+
+        response = client.get(
+            url, {'q': 'слоны', 'after': page_obj.cursor.next}
+        )
+
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_search_page_unknown_author(self):
+        """ Неизвестный автор - ошибка формы, а не пустая выдача. """
+        response = Client().get(
+            reverse('posts:search'), {'q': 'котики', 'author': 'nobody'}
+        )
+
+        self.assertTrue(response.context['form'].errors)
+        self.assertFalse(list(response.context['page_obj']))
+
+    def test_admin_search_uses_index(self):
+        """ Поиск в админке находит посты по индексу. """
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+
+        client = Client()
+        client.force_login(admin)
+
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {self.once, self.other}
+        )
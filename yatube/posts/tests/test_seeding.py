@@ -0,0 +1,66 @@
+from django.db.models import Count
+from django.test import TestCase
+
+from posts.models import Post, Comment, FeedEntry, Follow
+from posts.seeding import Seeder
+from users.models import Profile
+
+
+class TestingSeedScale(TestCase):
+    def seed(self, prefix, processes=1):
+        seeder = Seeder(seed=7, prefix=prefix, batch_size=40,
+                        processes=processes)
+
+        seeder.users(60)
+        seeder.groups(3)
+        seeder.follows(8)
+        seeder.posts(200)
+        seeder.comments(100, hot_posts=2, hot_comments=50)
+        seeder.finish()
+
+        posts = Post.objects.filter(author__username__startswith=prefix)
+
+        return {
+            'texts': list(posts.order_by('pk').values_list('text', flat=True)),
+            'comments': sorted(
+                posts.annotate(total=Count('comments')).values_list(
+                    'total', flat=True
+                )
+            ),
+            'followers': sorted(
+                Follow.objects.filter(
+                    author__username__startswith=prefix
+                ).values('author').annotate(total=Count('id')).values_list(
+                    'total', flat=True
+                )
+            ),
+        }
+
+    def test_volumes_and_skew(self):
+        """ Объемы как заказаны, подписчики и комментарии с перекосом. """
+        seeded = self.seed('seed')
+
+        self.assertEqual(len(seeded['texts']), 200)
+        self.assertEqual(Comment.objects.count(), 200)
+
+        # Два горячих поста собрали не меньше чем по 50 комментариев
+        self.assertGreaterEqual(seeded['comments'][-2], 50)
+
+        followers = seeded['followers']
+        self.assertGreater(followers[-1], 4 * sum(followers) / len(followers))
+
+    def test_derived_data_rebuilt(self):
+        """ Счетчики и ленты обновлены после bulk_create. """
+        self.seed('seed')
+
+        self.assertEqual(
+            sum(Profile.objects.values_list('posts_count', flat=True)), 200
+        )
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)), 200
+        )
+        self.assertTrue(FeedEntry.objects.exists())
+
+    def test_deterministic_for_seed(self):
+        """ Один seed - одни данные при любом числе процессов. """
+        self.assertEqual(self.seed('first'), self.seed('second', 2))
@@ -0,0 +1,261 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.jobs import queue
+from core.sharding import shards
+from posts import counters, exporting, tasks
+from posts.models import Post, Comment, Follow, User
+from posts.resharding import reshard
+from posts.views import AMOUNT_POSTS_ON_ONE_PAGE
+
+SHARDS = ['shard0', 'shard1']
+
+
+def create_authors(per_shard):
+    """ Авторы, по per_shard на каждом шарде SHARDS. """
+    authors = {alias: [] for alias in SHARDS}
+    number = 0
+
+    while min(map(len, authors.values())) < per_shard:
+        author = User.objects.create(username=f'author{number}')
+        number += 1
+
+        alias = shards.alias_for_slot(Post.slot_for_key(author.pk), SHARDS)
+
+        if len(authors[alias]) < per_shard:
+            authors[alias].append(author)
+
+    return [author for pair in zip(*authors.values()) for author in pair]
+
+
+@override_settings(SHARDS=SHARDS)
+class TestingShardedViews(TestCase):
+    databases = {'default', *SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        """ Посты шести авторов на обоих шардах. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(username='leo')
+
+        cls.authors = create_authors(3)
+
+        for author in cls.authors[:3]:
+            Follow.objects.create(user=cls.user, author=author)
+
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.authors[number % 6]
+            )
+            for number in range(AMOUNT_POSTS_ON_ONE_PAGE + 5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def walk(self, url):
+        """ Тексты постов ленты по всем страницам. """
+        response = self.client.get(url)
+        texts = [post.text for post in response.context['page_obj']]
+
+        while response.context['page_obj'].has_next():
+            response = self.client.get(
+                url, {'after': response.context['page_obj'].cursor.next}
+            )
+            texts.extend(post.text for post in response.context['page_obj'])
+
+        return texts
+
+    def test_index_gathers_shards(self):
+        self.assertEqual(
+            len({post._state.db for post in self.posts}), len(SHARDS)
+        )
+
+        self.assertEqual(
+            self.walk(reverse('posts:index')),
+            [post.text for post in self.posts[::-1]]
+        )
+
+    def test_follow_index_gathers_shards(self):
+        followed = set(self.authors[:3])
+
+        self.assertEqual(
+            self.walk(reverse('posts:follow_index')),
+            [post.text for post in self.posts[::-1]
+             if post.author in followed]
+        )
+
+    def test_post_pages(self):
+        """ Пост, комментарий и удаление находят шард по id. """
+        post = self.posts[0]
+
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Комментарий'}
+        )
+
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+
+        self.assertEqual(response.context['post'], post)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий']
+        )
+
+        author = Client()
+        author.force_login(post.author)
+
+        author.get(reverse('posts:post_delete', kwargs={'post_id': post.pk}))
+        queue.work(burst=True)
+
+        self.assertFalse(
+            Post.objects.shard_for_pk(post.pk).filter(pk=post.pk).exists()
+        )
+
+    def test_unsharded_reads_refused(self):
+        """ Поиск, выгрузка, пересчет и API не отдают часть данных. """
+        self.user.is_staff = True
+        self.user.save()
+
+        for url, data in (
+            (reverse('posts:search'), {'q': 'Пост'}),
+            (reverse('posts:export_content'), {}),
+            (reverse('posts:api_index'), {}),
+            (reverse('posts:api_post_detail',
+                     kwargs={'post_id': self.posts[0].pk}), {}),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url, data).status_code, 501)
+
+        with self.assertRaises(shards.Unsupported):
+            exporting.export_records()
+
+        with self.assertRaises(shards.Unsupported):
+            counters.recount_posts(100)
+
+        with self.assertRaises(CommandError):
+            call_command('recount_counters', stdout=io.StringIO())
+
+
+class TestingResharding(TestCase):
+    databases = {'default', *SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        """ Посты, записанные до шардов, лежат в default. """
+        super().setUpClass()
+
+        cls.authors = create_authors(2)
+
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=author)
+            for number, author in enumerate(cls.authors)
+        ]
+
+        for post in cls.posts:
+            Comment.objects.create(
+                post=post, author=cls.authors[0], text='Комментарий'
+            )
+
+    @override_settings(SHARDS=SHARDS)
+    def test_posts_moved_from_default(self):
+        """ Пост с комментарием переезжает на шард автора с новым id. """
+        reshard()
+
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertFalse(Comment.objects.using('default').exists())
+
+        for old in self.posts:
+            slot = Post.slot_for_key(old.author_id)
+            pk = shards.make_id(old.pk, slot)
+
+            post = Post.objects.shard_for_pk(pk).get(pk=pk)
+
+            self.assertEqual(post._state.db, shards.alias_for_slot(slot))
+            self.assertEqual(post.text, old.text)
+            self.assertEqual(
+                list(post.comments.values_list('text', flat=True)),
+                ['Комментарий']
+            )
+
+        self.assertEqual(reshard(), {})
+
+        old = self.posts[0]
+        pk = shards.make_id(old.pk, Post.slot_for_key(old.author_id))
+
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': old.pk}),
+            {'page': 1}
+        )
+
+        self.assertRedirects(
+            response,
+            reverse('posts:post_detail', kwargs={'post_id': pk}) + '?page=1',
+            status_code=301
+        )
+
+        post = Post.objects.create(text='Новый', author=self.authors[0])
+
+        self.assertGreater(
+            post.pk // shards.SLOTS, max(old.pk for old in self.posts)
+        )
+
+    def test_hidden_post_deleted_not_moved(self):
+        """ Скрытый пост, который ждет удаления, не переезжает. """
+        hidden = self.posts[0]
+        tasks.remove_post(hidden)
+
+        with self.settings(SHARDS=SHARDS):
+            reshard()
+            queue.work(burst=True)
+
+        for alias in ('default', *SHARDS):
+            self.assertEqual(
+                Post.all_objects.using(alias).filter(
+                    text=hidden.text
+                ).count(),
+                0
+            )
+
+        self.assertEqual(
+            sum(Post.objects.using(alias).count() for alias in SHARDS),
+            len(self.posts) - 1
+        )
+
+    @override_settings(SHARDS=SHARDS[:1])
+    def test_new_shard(self):
+        """ С новым шардом переезжают только его посты, id те же. """
+        reshard()
+
+        ids = set(Post.objects.using('shard0').values_list('pk', flat=True))
+
+        with self.settings(SHARDS=SHARDS):
+            call_command('reshard', stdout=io.StringIO())
+
+            for alias in SHARDS:
+                for pk in Post.objects.using(alias).values_list(
+                    'pk', flat=True
+                ):
+                    self.assertEqual(shards.alias_for_pk(pk), alias)
+
+            moved = set(
+                Post.objects.using('shard1').values_list('pk', flat=True)
+            )
+
+        self.assertTrue(moved)
+        self.assertEqual(
+            moved | set(
+                Post.objects.using('shard0').values_list('pk', flat=True)
+            ),
+            ids
+        )
@@ -0,0 +1,75 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.jobs import queue
+from core.jobs.models import Job
+from posts.models import Comment, FeedEntry, Follow, Post, User
+from users.models import Profile
+
+
+class TestingPostTasks(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.author = User.objects.create(
+            username='author'
+        )
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def test_post_delete_offloaded(self):
+        """ Пост с комментариями и лентами удаляет обработчик. """
+        post = Post.objects.create(text='Удалить', author=self.author)
+
+        Comment.objects.create(post=post, author=self.user, text='Ого')
+
+        client = Client()
+        client.force_login(self.author)
+
+        response = client.get(
+            reverse('posts:post_delete', kwargs={'post_id': post.pk})
+        )
+
+        self.assertRedirects(response, reverse('posts:index'))
+        self.assertEqual(
+            Job.objects.get().task, 'posts.tasks.delete_post'
+        )
+
+        # До обработчика пост уже не виден, счетчик автора уменьшен
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertTrue(Post.all_objects.filter(pk=post.pk).exists())
+        self.assertEqual(
+            client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.pk})
+            ).status_code,
+            404
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.author).posts_count, 0
+        )
+
+        queue.work(burst=True)
+
+        self.assertFalse(Post.all_objects.filter(pk=post.pk).exists())
+        self.assertEqual(
+            Profile.objects.get(user=self.author).posts_count, 0
+        )
+        self.assertFalse(Comment.objects.filter(post_id=post.pk).exists())
+        self.assertFalse(FeedEntry.objects.filter(post_id=post.pk).exists())
+
+    def test_new_image_queues_thumbnails(self):
+        """ Миниатюры строит задача очереди. """
+        post = Post.objects.create(text='Пост', author=self.author)
+
+        post.image = 'posts/small.gif'
+        post.save()
+
+        self.assertEqual(
+            Job.objects.get().task, 'posts.thumbnails.generate'
+        )
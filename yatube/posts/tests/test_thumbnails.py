@@ -0,0 +1,227 @@
+import io
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+# Тестовая картинка из 2 пикселей в байт-коде
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestingThumbnails(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """ Создать таблицы. """
+        super().setUpClass()
+
+        cls.user = User.objects.create(
+            username='leo'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, name='small.gif', content=SMALL_GIF):
+        return Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile(name, content)
+        )
+
+    def test_new_image_scheduled(self):
+        """ Миниатюры ставятся в очередь только для новой картинки. """
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            post = self.create_post()
+
+            post.text = 'Текст изменен'
+            post.save()
+
+            Post.objects.create(text='Без картинки', author=self.user)
+
+        schedule.assert_called_once_with(post)
+
+    def test_generated_sizes_stored(self):
+        """ Адреса и размеры миниатюр сохраняются в посте. """
+        post = self.create_post()
+
+        self.assertTrue(thumbnails.generate(post.pk))
+
+        post = Post.objects.get(pk=post.pk)
+
+        card = post.thumbnail['card']
+
+        self.assertEqual((card['width'], card['height']), (740, 418))
+        self.assertTrue(card['src'].startswith(settings.MEDIA_URL))
+        self.assertEqual(card['srcset'], f'{card["src"]} 740w')
+
+    def open_variant(self, url):
+        name = url[len(settings.MEDIA_URL):]
+
+        with open(f'{TEMP_MEDIA_ROOT}/{name}', 'rb') as variant:
+            return Image.open(io.BytesIO(variant.read()))
+
+    def test_variants_oriented_and_stripped(self):
+        """ Картинка повернута по EXIF, метаданные не сохранены. """
+        # Широкая картинка, которую EXIF велит повернуть на 90 градусов:
+        # левая половина красная, правая синяя
+        picture = Image.new('RGB', (1600, 800), 'red')
+        picture.paste(Image.new('RGB', (800, 800), 'blue'), (800, 0))
+
+        exif = Image.Exif()
+        exif[0x0112] = 6
+
+        buffer = io.BytesIO()
+        picture.save(buffer, 'JPEG', exif=exif.tobytes())
+
+        post = self.create_post('photo.jpg', buffer.getvalue())
+
+        thumbnails.generate(post.pk)
+
+        card = Post.objects.get(pk=post.pk).thumbnail['card']
+
+        widths = [
+            candidate.split()[1] for candidate in card['srcset'].split(', ')
+        ]
+
+        # 1110 больше, чем осталось после обрезки повернутой картинки
+        self.assertEqual(widths, ['360w', '740w'])
+
+        variant = self.open_variant(card['src'])
+
+        self.assertEqual(variant.size, (740, 418))
+        self.assertNotIn('exif', variant.info)
+
+        # После поворота сверху красное, снизу синее
+        red, green, blue = variant.getpixel((370, 10))
+        self.assertGreater(red, blue)
+
+        red, green, blue = variant.getpixel((370, 408))
+        self.assertGreater(blue, red)
+
+    @override_settings(POST_IMAGE_FORMATS=(('NOPE', 50), ('JPEG', 80)))
+    def test_unsupported_formats_skipped(self):
+        """ Форматы, которых нет в Pillow, не мешают остальным. """
+        post = self.create_post()
+
+        thumbnails.generate(post.pk)
+
+        card = Post.objects.get(pk=post.pk).thumbnail['card']
+
+        self.assertEqual(card['sources'], [])
+        self.assertEqual(self.open_variant(card['src']).format, 'JPEG')
+
+    @override_settings(POST_IMAGE_FORMATS=(('WEBP', 75), ('JPEG', 80)))
+    def test_modern_format_in_sources(self):
+        """ WebP, если Pillow его умеет, идет в <source>. """
+        Image.init()
+
+        if 'WEBP' not in Image.SAVE:
+            self.skipTest('Pillow собран без WebP')
+
+        post = self.create_post()
+
+        thumbnails.generate(post.pk)
+
+        card = Post.objects.get(pk=post.pk).thumbnail['card']
+
+        self.assertEqual(card['sources'][0]['type'], 'image/webp')
+
+    def test_thumbnails_of_replaced_image_ignored(self):
+        """ Миниатюры прежней картинки не выводятся. """
+        post = self.create_post()
+
+        thumbnails.generate(post.pk)
+
+        post = Post.objects.get(pk=post.pk)
+        post.image = SimpleUploadedFile('other.gif', SMALL_GIF, 'image/gif')
+
+        with mock.patch.object(thumbnails, 'schedule'):
+            post.save()
+
+        post = Post.objects.get(pk=post.pk)
+
+        self.assertEqual(post.thumbnail, {})
+        self.assertTrue(post.thumbnails)
+
+    def test_command_rebuilds_outdated_thumbnails(self):
+        """ Без --all строятся и миниатюры прежнего формата. """
+        current, outdated = self.create_post(), self.create_post()
+
+        thumbnails.generate(current.pk)
+        thumbnails.generate(outdated.pk)
+
+        data = json.loads(Post.objects.get(pk=outdated.pk).thumbnails)
+        data['version'] = Post.THUMBNAILS_VERSION - 1
+
+        Post.objects.filter(pk=outdated.pk).update(
+            thumbnails=json.dumps(data)
+        )
+
+        self.assertEqual(Post.objects.get(pk=outdated.pk).thumbnail, {})
+
+        output = io.StringIO()
+        call_command('generate_thumbnails', stdout=output)
+
+        self.assertIn('Построены миниатюры 1 постов', output.getvalue())
+        self.assertTrue(Post.objects.get(pk=outdated.pk).thumbnail)
+
+    def test_pages_render_without_thumbnail_lookups(self):
+        """ Страницы выводят готовые миниатюры без sorl. """
+        post = self.create_post()
+
+        thumbnails.generate(post.pk)
+
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = Client().get(url)
+
+                self.assertContains(response, 'srcset=')
+                self.assertContains(response, 'width="740"')
+                self.assertFalse(
+                    [q for q in queries if 'thumbnail_kvstore' in q['sql']]
+                )
+
+    def test_original_image_until_generated(self):
+        """ Пока миниатюр нет, выводится исходная картинка. """
+        post = self.create_post()
+
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+
+        self.assertContains(response, post.image.url)
@@ -67,6 +67,10 @@ class TestingViews(TestCase):
 
     def setUp(self):
         """ Создать авторизированного пользователя. """
+        # Первичные ключи после отката классов повторяются,
+        # а кэш между ними не сбрасывается
+        cache.clear()
+
         self.authorized_client_other = Client()
 
         # Авторизировать пользователя, не автора поста.
@@ -409,6 +413,8 @@ class TestingViewsCheckСache(TestingViews):
         old_posts = Post.objects.all()
         old_posts.delete()
 
+        cache.clear()
+
         post_cash = Post.objects.create(
             text='Тестирование кэша',
             author=TestingViews.user,
@@ -417,7 +423,8 @@ class TestingViewsCheckСache(TestingViews):
 
         response_one = self.authorized_client.get(reverse('posts:index'))
 
-        post_cash.delete()
+        # Изменение в обход сигналов не сбрасывает кэш
+        Post.objects.filter(pk=post_cash.pk).update(text='Без сигналов')
 
         response_two = self.authorized_client.get(reverse('posts:index'))
 
@@ -426,13 +433,54 @@ class TestingViewsCheckСache(TestingViews):
             response_two.content
         )
 
-        response_three = self.authorized_client.get(self.urls['index'])
+        post_cash.delete()
 
-        cache.clear()
+        response_three = self.authorized_client.get(self.urls['index'])
 
         self.assertNotEqual(
-            response_one.context.get('page_obj').object_list,
-            response_three.context.get('page_obj').object_list
+            response_one.content,
+            response_three.content
+        )
+
+    def test_check_cache_generations(self):
+        """
+        Запись в группу сбрасывает кэш группы и главной страницы,
+        но не кэш другой группы.
+        """
+        other_group = Group.objects.create(
+            title='Лидеры',
+            slug='category-leader',
+            description='Лидеры вперед',
+        )
+
+        other_group_url = reverse(
+            'posts:group_posts',
+            kwargs={'slug': other_group.slug}
+        )
+
+        urls = (self.urls['index'], self.urls['group_posts'])
+
+        responses = {
+            url: self.authorized_client.get(url).content
+            for url in urls + (other_group_url,)
+        }
+
+        Post.objects.create(
+            text='Новый пост в группе',
+            author=TestingViews.user,
+            group=TestingViews.group
+        )
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotEqual(
+                    responses[url],
+                    self.authorized_client.get(url).content
+                )
+
+        self.assertEqual(
+            responses[other_group_url],
+            self.authorized_client.get(other_group_url).content
         )
 
 
@@ -0,0 +1,172 @@
+"""
+Миниатюры картинок постов.
+
+Миниатюры всех размеров из settings.POST_THUMBNAILS строит задача
+очереди core.jobs, поставленная при сохранении поста с новой
+картинкой. Адреса и размеры записываются в Post.thumbnails, поэтому
+шаблоны выводят картинки без обращения к файлам и к хранилищу ключей
+sorl. Пока миниатюры строятся, выводится исходная картинка.
+
+Каждый размер сохраняется в нескольких ширинах и во всех форматах
+из POST_IMAGE_FORMATS, которые поддерживает сборка Pillow (AVIF и
+WebP появятся сами, когда Pillow их умеет). Картинка поворачивается
+по EXIF, метаданные не сохраняются. Шаблоны выводят <picture> с
+srcset, и браузер сам выбирает формат и ширину.
+"""
+import hashlib
+import io
+import json
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from core.jobs.queue import task
+
+from . import fragments
+from .models import Post
+
+EXTENSIONS = {'AVIF': 'avif', 'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# Параметры кодировщиков: медленнее сжимают, зато файлы меньше
+ENCODER_OPTIONS = {
+    'AVIF': {'speed': 6},
+    'WEBP': {'method': 6},
+    'JPEG': {'optimize': True, 'progressive': True},
+}
+
+
+def schedule(post):
+    """ Поставить построение миниатюр в очередь. """
+    generate.enqueue(post.pk)
+
+
+def _open(image):
+    """ Исходная картинка, повернутая по EXIF, в RGB. """
+    with image.open('rb') as source:
+        picture = Image.open(source)
+        picture = ImageOps.exif_transpose(picture)
+        picture.load()
+
+    if picture.mode in ('RGBA', 'LA', 'P'):
+        # Прозрачность заливаем белым, как фон карточки
+        picture = picture.convert('RGBA')
+        background = Image.new('RGB', picture.size, 'white')
+        background.paste(picture, mask=picture.split()[-1])
+
+        return background
+
+    return picture.convert('RGB')
+
+
+def available_formats():
+    """ Форматы из POST_IMAGE_FORMATS, которые умеет сохранять Pillow. """
+    Image.init()
+
+    return [
+        (name, quality) for name, quality in settings.POST_IMAGE_FORMATS
+        if name in Image.SAVE
+    ]
+
+
+def _encode(picture, name, quality):
+    buffer = io.BytesIO()
+
+    # EXIF и прочие метаданные не передаются и в файл не попадают
+    picture.save(buffer, name, quality=quality, **ENCODER_OPTIONS[name])
+
+    return ContentFile(buffer.getvalue())
+
+
+def _widths(picture, size, widths):
+    """ Ширины вариантов: не больше исходной, но базовая есть всегда. """
+    width, height = size
+    largest = min(picture.width, picture.height * width // height)
+
+    return sorted(
+        {value for value in widths if value <= largest} | {width}
+    )
+
+
+def _variants(image, picture, name, size, widths):
+    """ Сохранить варианты одного размера во всех форматах. """
+    base = hashlib.sha1(image.name.encode()).hexdigest()
+    folder = f'thumbnails/{base[:2]}/{base}'
+    width, height = size
+
+    sources = []
+
+    for format_name, quality in available_formats():
+        candidates = []
+
+        for value in _widths(picture, size, widths):
+            variant = ImageOps.fit(
+                picture,
+                (value, round(value * height / width)),
+                method=Image.LANCZOS
+            )
+
+            path = f'{folder}/{name}-{value}.{EXTENSIONS[format_name]}'
+
+            default_storage.delete(path)
+            path = default_storage.save(
+                path, _encode(variant, format_name, quality)
+            )
+
+            candidates.append((value, default_storage.url(path)))
+
+        sources.append({
+            'type': Image.MIME[format_name],
+            'srcset': ', '.join(
+                f'{url} {value}w' for value, url in candidates
+            ),
+            'src': dict(candidates)[width],
+        })
+
+    # Последний формат понимают все браузеры, он идет в <img>
+    fallback = sources.pop()
+
+    return {
+        'width': width,
+        'height': height,
+        'src': fallback['src'],
+        'srcset': fallback['srcset'],
+        'sources': sources,
+    }
+
+
+@task
+def generate(post_id):
+    """ Построить варианты картинки поста и сохранить их адреса. """
+    post = Post.objects.shard_for_pk(post_id).filter(pk=post_id).only(
+        'pk', 'image', 'author_id', 'group_id'
+    ).first()
+
+    if post is None or not post.image:
+        return False
+
+    picture = _open(post.image)
+
+    sizes = {
+        name: _variants(
+            post.image, picture, name, options['size'], options['widths']
+        )
+        for name, options in settings.POST_THUMBNAILS.items()
+    }
+
+    data = json.dumps({
+        'version': Post.THUMBNAILS_VERSION,
+        'image': post.image.name,
+        'sizes': sizes,
+    })
+
+    # Картинку могли заменить, пока строились миниатюры
+    updated = Post.objects.shard_for_pk(post_id).filter(
+        pk=post_id, image=post.image.name
+    ).update(thumbnails=data)
+
+    if updated:
+        fragments.post_changed(post)
+
+    return bool(updated)
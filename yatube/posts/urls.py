@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 app_name = 'posts'
@@ -27,6 +27,67 @@ follow_post = (
     )
 )
 
+feed_fragments = (
+    path(
+        'fragments/index/',
+        views.index_fragment,
+        name='index_fragment'
+    ),
+    path(
+        'fragments/group/<slug:slug>/',
+        views.group_posts_fragment,
+        name='group_posts_fragment'
+    ),
+    path(
+        'fragments/profile/<str:username>/',
+        views.profile_fragment,
+        name='profile_fragment'
+    ),
+    path(
+        'fragments/follow/',
+        views.follow_index_fragment,
+        name='follow_index_fragment'
+    ),
+    path(
+        'fragments/follow/<str:username>/',
+        views.follow_author_fragment,
+        name='follow_author_fragment'
+    )
+)
+
+api_urls = (
+    path(
+        'api/posts/',
+        api.index,
+        name='api_index'
+    ),
+    path(
+        'api/group/<slug:slug>/',
+        api.group_posts,
+        name='api_group_posts'
+    ),
+    path(
+        'api/profile/<str:username>/',
+        api.profile,
+        name='api_profile'
+    ),
+    path(
+        'api/follow/',
+        api.follow_index,
+        name='api_follow_index'
+    ),
+    path(
+        'api/posts/<int:post_id>/',
+        api.post_detail,
+        name='api_post_detail'
+    ),
+    path(
+        'api/posts/<int:post_id>/comments/',
+        api.post_comments,
+        name='api_post_comments'
+    )
+)
+
 urlpatterns = [
     path(
         '',
@@ -48,11 +109,26 @@ urlpatterns = [
         views.post_detail,
         name='post_detail'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/edit/',
         views.post_edit,
         name='post_edit'
     ),
+    path(
+        'search/',
+        views.search,
+        name='search'
+    ),
+    path(
+        'export/',
+        views.export_content,
+        name='export_content'
+    ),
     path(
         'create/',
         views.post_create,
@@ -73,5 +149,7 @@ urlpatterns = [
         views.comment_delete,
         name='comment_delete'
     ),
-    *follow_post
+    *follow_post,
+    *feed_fragments,
+    *api_urls
 ]
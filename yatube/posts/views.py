@@ -1,59 +1,230 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest,
+    HttpResponsePermanentRedirect, StreamingHttpResponse
+)
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.views.decorators.http import condition
 
-from .models import Post, Group, User, Comment, Follow
-from .forms import PostForm, CommentForm
+from core.caching.singleflight import get_or_compute
+from core.paginators.cursor import CursorPaginator, next_cursor
+from core.paginators.merged import MergedCursorPaginator
+from core.sharding import shards
+from core.sharding.gather import ShardedCursorPaginator
+from .models import Post, Group, User, Comment, Follow, MovedPost
+from .forms import PostForm, CommentForm, SearchForm, ExportForm
+from .exporting import TYPES, export_records, gzip_stream, json_lines
+from .inbox import follow_feed
+from .search import search_posts
+from . import counters, etags, fragments, tasks
 
 
 AMOUNT_POSTS_ON_ONE_PAGE = 10
 
+AMOUNT_COMMENTS_ON_ONE_PAGE = 20
+
+# Курсор следующей страницы во фрагменте ленты
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def get_paginator(posts, amount, gathered=False, **kwargs):
+    """
+    gathered=True - лента не одного автора: с шардами она собирается
+    со всех шардов и листается только по курсору. Лента из частей
+    (MergedQuerySet) тоже листается только по курсору.
+    """
+    if gathered and shards.enabled():
+        return ShardedCursorPaginator(posts, amount)
+
+    if getattr(posts, 'parts', None):
+        return MergedCursorPaginator(posts, amount)
+
+    return CursorPaginator(posts, amount, **kwargs)
+
+
+def redirect_moved(view):
+    """
+    Старый id поста, перенесенного reshard из default на шард, ведет
+    на тот же адрес с новым id. Таблица читается только после 404.
+    """
+    @wraps(view)
+    def wrapper(request, post_id):
+        try:
+            return view(request, post_id)
+        except Http404:
+            new_id = MovedPost.objects.filter(
+                old_id=post_id
+            ).values_list('new_id', flat=True).first()
+
+            if new_id is None:
+                raise
+
+        url = reverse(
+            f'posts:{request.resolver_match.url_name}', args=(new_id,)
+        )
+        query = request.META.get('QUERY_STRING')
+
+        return HttpResponsePermanentRedirect(
+            f'{url}?{query}' if query else url
+        )
+
+    return wrapper
+
+
+def unsharded(view):
+    """ Страница читает только default: с шардами ответ 501. """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except shards.Unsupported as error:
+            return HttpResponse(str(error), status=501)
+
+    return wrapper
+
+
+def get_pagination(request, posts, amount, numbered=False, count=None,
+                   estimated=False, gathered=False):
+    """
+    Страница ленты. Следующие страницы открываются по курсору
+    ?after= / ?before=, номера страниц ?page= показываем только там,
+    где подсчет постов дешевый (numbered=True). count - известное
+    количество постов или его оценка (estimated=True), чтобы
+    пагинатор не делал COUNT(*).
+    """
+    paginator = get_paginator(
+        posts, amount, gathered=gathered, numbered=numbered, count=count,
+        estimated=estimated
+    )
+
+    return paginator.get_page(
+        request.GET.get('page'),
+        after=request.GET.get('after'),
+        before=request.GET.get('before')
+    )
+
+
+def feed_fragment(request, name, posts, generation, context=None,
+                  gathered=False):
+    """
+    Карточки страницы ленты без разметки страницы, для прокрутки.
+    Курсор следующей страницы - в заголовке X-Next-Cursor. Готовый
+    фрагмент кэшируется под ключом с поколением данных и курсором.
+    """
+    paginator = get_paginator(
+        posts, AMOUNT_POSTS_ON_ONE_PAGE, gathered=gathered
+    )
+    page_obj = paginator.get_page(after=request.GET.get('after'))
+
+    def compute():
+        html = render_to_string(
+            'includes/feed_items.html',
+            {'page_obj': page_obj, **(context or {})},
+            request
+        )
+
+        return html, next_cursor(page_obj)
 
-def get_pagination(request, posts, amount):
-    paginator = Paginator(posts, amount)
+    html, cursor = get_or_compute(
+        f'feed_fragment:{name}:{generation}:{page_obj.cursor.key}',
+        compute,
+        settings.FRAGMENT_CACHE_TIMEOUT
+    )
+
+    response = HttpResponse(html)
 
-    page_number = request.GET.get('page')
+    if cursor:
+        response[NEXT_CURSOR_HEADER] = cursor
 
-    return paginator.get_page(page_number)
+    return response
 
 
 def index(request):
     author = request.user
 
-    posts = Post.objects.select_related('group').all()
+    posts = Post.objects.feed()
 
-    page_obj = get_pagination(request, posts, AMOUNT_POSTS_ON_ONE_PAGE)
+    page_obj = get_pagination(
+        request, posts, AMOUNT_POSTS_ON_ONE_PAGE,
+        count=counters.index_posts_count, estimated=True, gathered=True
+    )
 
     context = {
         'author': author,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'show_delete': True,
+        'cache_generation': fragments.index_generation(),
+        'cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT
     }
 
     return render(request, 'posts/index.html', context)
 
 
+@condition(etag_func=etags.index_etag)
+def index_fragment(request):
+    author = request.user
+
+    # Кнопки удаления видны только автору
+    return feed_fragment(
+        request, f'index:{author.pk}', Post.objects.feed(),
+        fragments.index_generation(),
+        {'author': author, 'show_delete': True}, gathered=True
+    )
+
+
+@condition(etag_func=etags.group_posts_etag)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
 
-    posts = group.posts.all()
+    posts = group.posts.feed()
 
-    page_obj = get_pagination(request, posts, AMOUNT_POSTS_ON_ONE_PAGE)
+    page_obj = get_pagination(
+        request, posts, AMOUNT_POSTS_ON_ONE_PAGE, numbered=True,
+        count=counters.group_posts_count(group), gathered=True
+    )
 
     context = {
         'group': group,
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'cache_generation': fragments.group_generation(group),
+        'cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT
     }
 
     return render(request, 'posts/group_list.html', context)
 
 
+@condition(etag_func=etags.group_posts_etag)
+def group_posts_fragment(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+
+    return feed_fragment(
+        request, f'group:{group.pk}', group.posts.feed(),
+        fragments.group_generation(group), {'group': group},
+        gathered=True
+    )
+
+
+@condition(etag_func=etags.profile_etag)
 def profile(request, username):
 
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
 
-    posts = author.posts.all()
+    posts = author.posts.feed()
 
-    page_obj = get_pagination(request, posts, AMOUNT_POSTS_ON_ONE_PAGE)
+    post_count = counters.author_posts_count(author)
+
+    page_obj = get_pagination(
+        request, posts, AMOUNT_POSTS_ON_ONE_PAGE, numbered=True,
+        count=post_count
+    )
 
     following = User.objects.filter(following__author=author).exists()
 
@@ -61,22 +232,57 @@ def profile(request, username):
 
     context = {
         'page_obj': page_obj,
-        'post_count': page_obj.paginator.count,
+        'post_count': post_count,
         'author': author,
         'following': following,
-        'is_author': is_author
+        'is_author': is_author,
+        'cache_generation': fragments.profile_generation(author),
+        'cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+def get_comments(request, post):
+    """
+    Страница комментариев поста по курсору ?after=. Количество берется
+    из счетчика поста, COUNT(*) не выполняется.
+    """
+    paginator = CursorPaginator(
+        post.comments.listing(), AMOUNT_COMMENTS_ON_ONE_PAGE,
+        count=post.comments_count
+    )
+
+    return paginator.get_page(after=request.GET.get('after'))
+
+
+@condition(etag_func=etags.profile_etag)
+def profile_fragment(request, username):
+    author = get_object_or_404(User, username=username)
+
+    return feed_fragment(
+        request, f'profile:{author.pk}', author.posts.feed(),
+        fragments.profile_generation(author)
+    )
+
+
+@redirect_moved
+@condition(
+    etag_func=etags.post_detail_etag,
+    last_modified_func=etags.post_detail_last_modified
+)
 def post_detail(request, post_id):
 
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.shard_for_pk(post_id).related(
+            'author__profile', 'group'
+        ),
+        pk=post_id
+    )
 
-    comments = post.comments.all()
+    comments = get_comments(request, post)
 
-    post_count = post.author.posts.count()
+    post_count = counters.author_posts_count(post.author)
 
     author = request.user
 
@@ -93,6 +299,84 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@redirect_moved
+@condition(
+    etag_func=etags.post_detail_etag,
+    last_modified_func=etags.post_detail_last_modified
+)
+def post_comments(request, post_id):
+    """ Следующие комментарии поста фрагментом HTML для "Показать еще". """
+    post = get_object_or_404(
+        Post.objects.shard_for_pk(post_id).only('pk', 'comments_count'),
+        pk=post_id
+    )
+
+    context = {
+        'post': post,
+        'author': request.user,
+        'comments': get_comments(request, post)
+    }
+
+    return render(request, 'includes/comments.html', context)
+
+
+@unsharded
+def search(request):
+    form = SearchForm(request.GET or None)
+
+    posts = Post.objects.none()
+
+    if form.is_valid():
+        posts = search_posts(
+            form.cleaned_data['q'],
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author']
+        )
+
+    page_obj = get_pagination(request, posts, AMOUNT_POSTS_ON_ONE_PAGE)
+
+    # Ссылки пагинатора сохраняют запрос
+    query = request.GET.copy()
+
+    for key in ('page', 'after', 'before'):
+        query.pop(key, None)
+
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+        'page_query': query.urlencode() + '&' if query else ''
+    }
+
+    return render(request, 'posts/search.html', context)
+
+
+@unsharded
+@staff_member_required
+def export_content(request):
+    """ Выгрузка в JSON Lines с gzip, отдается по мере чтения из базы. """
+    form = ExportForm(request.GET)
+
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+
+    records = export_records(
+        types=form.cleaned_data['type'] or TYPES,
+        since=form.cleaned_data['since'],
+        until=form.cleaned_data['until'],
+        author=form.cleaned_data['author']
+    )
+
+    response = StreamingHttpResponse(
+        gzip_stream(json_lines(records)),
+        content_type='application/gzip'
+    )
+    response['Content-Disposition'] = (
+        'attachment; filename="yatube-export.jsonl.gz"'
+    )
+
+    return response
+
+
 @login_required
 def post_create(request):
 
@@ -121,11 +405,12 @@ def post_create(request):
     return redirect('posts:profile', author.username)
 
 
+@redirect_moved
 @login_required
 def post_edit(request, post_id):
     author = request.user
 
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.shard_for_pk(post_id), pk=post_id)
 
     if not post.author == author:
         return redirect('posts:post_detail', post.id)
@@ -157,7 +442,7 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.shard_for_pk(post_id), pk=post_id)
 
     form = CommentForm(request.POST or None)
 
@@ -176,10 +461,11 @@ def add_comment(request, post_id):
 def post_delete(request, post_id):
     author = request.user
 
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.shard_for_pk(post_id), pk=post_id)
 
     if post.author == author:
-        post.delete()
+        # Каскад по лентам подписчиков и комментариям удаляет обработчик
+        tasks.remove_post(post)
 
     return redirect('posts:index')
 
@@ -188,7 +474,9 @@ def post_delete(request, post_id):
 def comment_delete(request, comment_id):
     author = request.user
 
-    comment = get_object_or_404(Comment, pk=comment_id)
+    comment = get_object_or_404(
+        Comment.objects.shard_for_pk(comment_id), pk=comment_id
+    )
 
     if comment.author == author:
         comment.delete()
@@ -200,12 +488,14 @@ def comment_delete(request, comment_id):
 def follow_index(request):
     """ Избранные посты авторов. """
 
-    # В постах, у автора, узнаем на что он подписан
-    posts = Post.objects.filter(author__following__user=request.user)
+    # Посты заранее разложены по ленте подписчика
+    posts = follow_feed(request.user)
 
-    page_obj = get_pagination(request, posts, AMOUNT_POSTS_ON_ONE_PAGE)
+    page_obj = get_pagination(
+        request, posts, AMOUNT_POSTS_ON_ONE_PAGE, gathered=True
+    )
 
-    authors = User.objects.filter(following__user=request.user)
+    authors = fragments.followed_authors(request.user)
 
     context = {
         'page_obj': page_obj,
@@ -218,11 +508,15 @@ def follow_index(request):
 @login_required
 def follow_author(request, username):
     """ Перейти на посты автора. """
-    posts = Post.objects.filter(author__following__author__username=username)
+    author = get_object_or_404(User, username=username)
 
-    page_obj = get_pagination(request, posts, AMOUNT_POSTS_ON_ONE_PAGE)
+    posts = follow_feed(request.user, author)
 
-    authors = User.objects.filter(following__user=request.user)
+    page_obj = get_pagination(
+        request, posts, AMOUNT_POSTS_ON_ONE_PAGE, gathered=True
+    )
+
+    authors = fragments.followed_authors(request.user)
 
     context = {
         'page_obj': page_obj,
@@ -233,6 +527,27 @@ def follow_author(request, username):
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+@condition(etag_func=etags.follow_etag)
+def follow_index_fragment(request):
+    return feed_fragment(
+        request, f'follow:{request.user.pk}', follow_feed(request.user),
+        fragments.follow_generation(request.user), gathered=True
+    )
+
+
+@login_required
+@condition(etag_func=etags.follow_etag)
+def follow_author_fragment(request, username):
+    author = get_object_or_404(User, username=username)
+
+    return feed_fragment(
+        request, f'follow:{request.user.pk}:{author.pk}',
+        follow_feed(request.user, author),
+        fragments.follow_generation(request.user), gathered=True
+    )
+
+
 @login_required
 def profile_follow(request, username):
     """ Подписаться. """
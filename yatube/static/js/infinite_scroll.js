@@ -0,0 +1,62 @@
+// Бесконечная прокрутка лент. Список с атрибутом data-feed дописывается
+// фрагментами карточек, курсор следующей порции приходит в заголовке
+// X-Next-Cursor. Без скрипта остается обычный пагинатор.
+document.querySelectorAll('[data-feed]').forEach((list) => {
+  if (!('IntersectionObserver' in window) || !list.dataset.next) {
+    return;
+  }
+
+  const pagination = list.closest('.posts').parentNode
+    .querySelector('nav[aria-label="Page navigation"]');
+
+  if (pagination) {
+    pagination.hidden = true;
+  }
+
+  const sentinel = document.createElement('div');
+  list.after(sentinel);
+
+  let loading = false;
+
+  const observer = new IntersectionObserver((entries) => {
+    if (loading || !entries.some((entry) => entry.isIntersecting)) {
+      return;
+    }
+
+    loading = true;
+
+    const url = `${list.dataset.feed}?after=${encodeURIComponent(list.dataset.next)}`;
+
+    fetch(url, { credentials: 'same-origin' })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+
+        list.dataset.next = response.headers.get('X-Next-Cursor') || '';
+
+        return response.text();
+      })
+      .then((html) => {
+        list.insertAdjacentHTML('beforeend', html);
+
+        if (!list.dataset.next) {
+          observer.disconnect();
+          sentinel.remove();
+        }
+      })
+      .catch(() => {
+        // Вернуть пагинатор, если догрузить не вышло
+        observer.disconnect();
+
+        if (pagination) {
+          pagination.hidden = false;
+        }
+      })
+      .finally(() => {
+        loading = false;
+      });
+  }, { rootMargin: '600px' });
+
+  observer.observe(sentinel);
+});
@@ -0,0 +1,35 @@
+// Кнопка "Показать еще" с атрибутом data-load-more: следующая порция
+// загружается фрагментом HTML и встает на место кнопки. Без скрипта
+// ссылка открывает ту же порцию целой страницей.
+document.addEventListener('click', (event) => {
+  const button = event.target.closest('[data-load-more]');
+
+  if (!button) {
+    return;
+  }
+
+  event.preventDefault();
+
+  if (button.dataset.loading) {
+    return;
+  }
+
+  button.dataset.loading = 'true';
+
+  fetch(button.dataset.loadMore, { credentials: 'same-origin' })
+    .then((response) => {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+
+      return response.text();
+    })
+    .then((html) => {
+      button.insertAdjacentHTML('beforebegin', html);
+      button.remove();
+    })
+    .catch(() => {
+      // Не получилось - переходим по обычной ссылке
+      window.location.href = button.href;
+    });
+});
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_profiles(apps, schema_editor):
+    """ Завести профили уже зарегистрированным пользователям. """
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Profile = apps.get_model('users', 'Profile')
+    Post = apps.get_model('posts', 'Post')
+
+    counts = dict(
+        Post.objects.order_by().values('author').annotate(
+            total=models.Count('id')
+        ).values_list('author', 'total')
+    )
+
+    Profile.objects.bulk_create(
+        (
+            Profile(user_id=user_id, posts_count=counts.get(user_id, 0))
+            for user_id in User.objects.values_list('pk', flat=True)
+        ),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.IntegerField(default=0, editable=False, verbose_name='Количество постов')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль',
+                'verbose_name_plural': 'Профили',
+            },
+        ),
+        migrations.RunPython(create_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:40
+
+from django.db import migrations, models
+
+
+def count_follows(apps, schema_editor):
+    Profile = apps.get_model('users', 'Profile')
+    Follow = apps.get_model('posts', 'Follow')
+
+    for field, counter in (
+        ('author', 'followers_count'),
+        ('user', 'following_count'),
+    ):
+        totals = Follow.objects.order_by().values(field).annotate(
+            total=models.Count('id')
+        ).values_list(field, 'total')
+
+        for user_id, total in totals:
+            Profile.objects.filter(user_id=user_id).update(**{counter: total})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Количество подписок'),
+        ),
+        migrations.RunPython(count_follows, migrations.RunPython.noop),
+    ]
@@ -1 +1,41 @@
-# Create your models here.
+from django.db import models
+from django.contrib.auth import get_user_model
+
+from core.general_models.models import Counters
+
+User = get_user_model()
+
+
+class Profile(Counters):
+    """ Счетчики пользователя, чтобы не считать их на каждой странице. """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов'
+    )
+    followers_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+    following_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписок'
+    )
+
+    counter_fields = ('posts_count', 'followers_count', 'following_count')
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self) -> str:
+        return self.user.username
@@ -59,7 +59,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.middleware.SQLProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.routing.middleware.PinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -97,9 +99,74 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Реплика для чтения. Локально это копия основного файла, которую
+    # обновляет manage.py replicate. В тестах - зеркало default
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+    # Шарды постов и комментариев (core.sharding): SQLite без проверки
+    # внешних ключей, пользователи и группы остаются в default
+    'shard0': {
+        'ENGINE': 'core.sharding.backend',
+        'NAME': os.path.join(BASE_DIR, 'db.shard0.sqlite3'),
+    },
+    'shard1': {
+        'ENGINE': 'core.sharding.backend',
+        'NAME': os.path.join(BASE_DIR, 'db.shard1.sqlite3'),
+    },
 }
 
+DATABASE_ROUTERS = [
+    'core.sharding.router.ShardRouter',
+    'core.routing.router.PrimaryReplicaRouter',
+]
+
+# Тесты со своим кэшем во временном каталоге
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Реплики, на которые уходит чтение моделей REPLICA_APPS. Пустой
+# список - все читают из default. Чтобы включить локально:
+# manage.py replicate --interval 5 и DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+REPLICA_APPS = ('posts',)
+# Сколько секунд после записи пользователь читает из default
+READ_YOUR_WRITES_WINDOW = 10
+
+# Шарды, по которым посты и комментарии раскладываются по автору.
+# Пустой список - все в default. Чтобы включить локально:
+# SHARDS = ['shard0', 'shard1'], manage.py migrate --database для
+# каждого шарда и manage.py reshard, чтобы перенести посты из default.
+# Поиск, выгрузка, импорт, пересчет счетчиков и API с шардами не работают
+SHARDS = []
+# Приложения, таблицы которых создаются на шардах
+SHARDED_APPS = ('posts',)
+
+
+# Настройки каждого соединения с SQLite (core.sqlite.connection):
+# WAL, чтобы читатели не ждали писателей, ожидание блокировки вместо
+# "database is locked" и кэш страниц в памяти
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    # Отрицательное число - размер в КиБ
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Интервалы обслуживания (manage.py sqlite_maintenance --schedule),
+# секунды
+SQLITE_MAINTENANCE = {
+    'checkpoint': 60 * 5,
+    'analyze': 60 * 60 * 24,
+    'vacuum': 60 * 60 * 24 * 7,
+}
+# VACUUM, только если свободных страниц в файле не меньше этой доли
+SQLITE_VACUUM_FREE_RATIO = 0.2
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -144,13 +211,74 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-#  Email. Connect to filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+#  Email. Письма отправляет очередь задач через JOBS_EMAIL_BACKEND
+EMAIL_BACKEND = 'core.jobs.mail.QueuedEmailBackend'
+JOBS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # Directory save email.
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Кэш общий для всех процессов на машине: файл SQLite в режиме WAL.
+# Объем ограничен MAX_BYTES, лишнее вытесняется по LRU
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.caching.backends.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_BYTES': 64 * 1024 * 1024,
+        },
     }
 }
+
+# Лента подписок. Размер пачки при раскладке поста по лентам
+FEED_FANOUT_BATCH_SIZE = 500
+# Посты авторов с таким числом подписчиков подмешиваются при чтении
+FEED_CELEBRITY_THRESHOLD = 1000
+
+# Сколько секунд хранить оценку количества постов для главной страницы
+COUNT_ESTIMATE_TIMEOUT = 60
+
+# Кэш фрагментов лент. Сбрасывается сменой поколения при изменении
+# данных, поэтому может жить долго
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Сколько секунд отдавать устаревшую запись, пока ее пересчитывает
+# один запрос
+CACHE_STALE_GRACE = 60
+# Блокировка пересчета записи и ожидание чужого пересчета, секунды
+CACHE_LOCK_TIMEOUT = 10
+CACHE_LOCK_WAIT = 2
+# Время жизни данных представлений в кэше (@cached)
+CACHE_DATA_TIMEOUT = 60 * 5
+
+# Миниатюры картинок постов: имя -> размер и ширины для srcset.
+# Строятся в фоне при загрузке картинки
+POST_THUMBNAILS = {
+    'card': {'size': (740, 418), 'widths': (360, 740, 1110)},
+}
+# Форматы миниатюр и качество сжатия, лучший формат первым. Последний
+# выводится в <img> и должен открываться везде. Форматы, которых нет
+# в сборке Pillow, пропускаются
+POST_IMAGE_FORMATS = (('AVIF', 50), ('WEBP', 75), ('JPEG', 80))
+
+# Очередь фоновых задач core.jobs, обработчики: manage.py runworker.
+# True - выполнять задачи в том же процессе после фиксации транзакции
+JOBS_EAGER = False
+# Сколько раз пробовать задачу, пока она не станет failed
+JOBS_MAX_ATTEMPTS = 5
+# Пауза перед повтором, секунды: удваивается с каждой попыткой
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+# Сколько секунд задача закреплена за обработчиком. Если он упал,
+# задачу потом возьмет другой
+JOBS_LEASE = 60 * 5
+# Пауза обработчика, когда задач нет, секунды
+JOBS_POLL_INTERVAL = 1
+# Сколько кандидатов перебирает обработчик, пока забирает задачу
+JOBS_CLAIM_BATCH = 10
+
+# Профиль SQL по представлениям, отчет: /sql-report/.
+# Доля профилируемых запросов, 0 - выключено
+SQL_PROFILING_RATE = 0.01
+# Как часто процесс пишет накопленное в кэш, секунды
+SQL_PROFILING_FLUSH = 10
+# Сколько самых медленных и повторяющихся инструкций хранить
+SQL_PROFILING_TOP = 5
@@ -24,6 +24,10 @@ urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
     path('about/', include('about.urls', namespace='about')),
     path('admin/', admin.site.urls),
+    path(
+        'sql-report/',
+        include('core.profiling.urls', namespace='profiling')
+    ),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
 ]